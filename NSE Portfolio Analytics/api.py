@@ -0,0 +1,151 @@
+"""
+JSON HTTP API for the NSE Portfolio Analytics engine
+Run with: python api.py [--host 0.0.0.0] [--port 8000]
+
+Endpoints:
+    GET  /health                 liveness check
+    POST /analyze                {"symbols": [...], "weights": [...], "period": "1y"}
+    POST /metrics                same body, portfolio metrics only
+    POST /correlation            {"symbols": [...], "period": "1y", "method": "sample"}
+    POST /stocks                 {"symbols": [...], "period": "1y"}
+    POST /batch                  {"symbols": [...], "weights": [[...], ...], "period": "1y"}
+"""
+
+import argparse
+import json
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pandas as pd
+
+import engine
+from risk_engine import batch_portfolio_metrics
+
+
+def to_json(value):
+    """Convert engine results (NumPy/pandas values) to JSON-compatible types"""
+    if isinstance(value, dict):
+        return {str(k): to_json(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [to_json(v) for v in value]
+    if isinstance(value, pd.DataFrame):
+        orient = 'records' if isinstance(value.index, pd.RangeIndex) else 'index'
+        return to_json(value.to_dict(orient=orient))
+    if isinstance(value, pd.Series):
+        return to_json(value.to_dict())
+    if isinstance(value, np.ndarray):
+        return to_json(value.tolist())
+    if isinstance(value, (np.floating, float)):
+        return None if not np.isfinite(value) else float(value)
+    if isinstance(value, np.integer):
+        return int(value)
+    if isinstance(value, pd.Timestamp):
+        return value.isoformat()
+    return value
+
+
+def _metrics_only(metrics):
+    return {k: v for k, v in metrics.items() if k != 'portfolio_returns'}
+
+
+def handle_analyze(body):
+    result = engine.analyze_portfolio(body['symbols'], body['weights'], body.get('period', '1y'),
+                                      body.get('method', 'sample'))
+    return {
+        'metrics': _metrics_only(result['metrics']),
+        'correlation': result['correlation'],
+        'stocks': result['stock_metrics'],
+        'failures': {k: str(v) for k, v in result['failures'].items()},
+    }
+
+
+def handle_metrics(body):
+    prices, failures = engine.get_nse_data(body['symbols'], body.get('period', '1y'))
+    weights = engine.align_weights(body['weights'], body['symbols'], prices.columns)
+    metrics = engine.calculate_portfolio_metrics(prices, weights)
+    return {'metrics': _metrics_only(metrics), 'failures': {k: str(v) for k, v in failures.items()}}
+
+
+def handle_correlation(body):
+    prices, _ = engine.get_nse_data(body['symbols'], body.get('period', '1y'))
+    return engine.calculate_correlation_matrix(prices, body.get('method', 'sample'), body.get('period'))
+
+
+def handle_stocks(body):
+    prices, _ = engine.get_nse_data(body['symbols'], body.get('period', '1y'))
+    return engine.calculate_stock_metrics(prices)
+
+
+def handle_batch(body):
+    prices, _ = engine.get_nse_data(body['symbols'], body.get('period', '1y'))
+    weights = engine.align_weights(body['weights'], body['symbols'], prices.columns)
+    metrics = batch_portfolio_metrics(engine.calculate_returns(prices), np.atleast_2d(weights))
+    return {'metrics': metrics}
+
+
+ROUTES = {
+    '/analyze': handle_analyze,
+    '/metrics': handle_metrics,
+    '/correlation': handle_correlation,
+    '/stocks': handle_stocks,
+    '/batch': handle_batch,
+}
+
+
+class EngineRequestHandler(BaseHTTPRequestHandler):
+    """Routes JSON POST requests to engine functions"""
+
+    def _send(self, status, payload):
+        data = json.dumps(to_json(payload)).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path == '/health':
+            self._send(200, {'status': 'ok'})
+        else:
+            self._send(404, {'error': f"Unknown endpoint {self.path}"})
+
+    def do_POST(self):
+        handler = ROUTES.get(self.path)
+        if handler is None:
+            self._send(404, {'error': f"Unknown endpoint {self.path}"})
+            return
+
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            body = json.loads(self.rfile.read(length) or b'{}')
+        except ValueError as e:
+            self._send(400, {'error': f"Invalid JSON: {e}"})
+            return
+
+        try:
+            self._send(200, handler(body))
+        except KeyError as e:
+            self._send(400, {'error': f"Missing field: {e}"})
+        except ValueError as e:
+            self._send(400, {'error': str(e)})
+        except Exception as e:
+            self._send(500, {'error': str(e)})
+
+    def log_message(self, format, *args):
+        pass
+
+
+def create_server(host="127.0.0.1", port=8000):
+    """HTTP server for the engine API (port 0 picks a free port)"""
+    return ThreadingHTTPServer((host, port), EngineRequestHandler)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="NSE Portfolio Analytics engine API")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    args = parser.parse_args()
+
+    server = create_server(args.host, args.port)
+    print(f"🚀 Engine API listening on http://{args.host}:{server.server_port}")
+    server.serve_forever()
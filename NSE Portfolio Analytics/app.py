@@ -8,13 +8,25 @@ Run with: streamlit run app.py
 import streamlit as st
 import pandas as pd
 import numpy as np
-import yfinance as yf
 import plotly.graph_objects as go
 import plotly.express as px
 from plotly.subplots import make_subplots
 from datetime import datetime, timedelta
+import time
 import sqlite3
 from scipy import stats
+import engine
+from engine import calculate_returns, calculate_portfolio_metrics, calculate_correlation_matrix
+from var_engine import var_report
+from rolling import rolling_stats, rolling_frame
+from config import BENCHMARK_INDICES, RISK_CONFIG, SAMPLE_PORTFOLIOS
+from backtest import backtest, FREQUENCIES as REBALANCE_FREQUENCIES
+from portfolio_repository import PortfolioRepository
+from exporter import ExportManager, available_formats
+from refresh import LivePortfolio, RefreshScheduler, RefreshStats, market_is_open
+from screener import SCREEN_COLUMNS, load_universe, parse_universe
+from charts import correlation_heatmap, figure_cache, line_chart
+from correlation_structure import graph_layout
 import warnings
 warnings.filterwarnings('ignore')
 
@@ -57,17 +69,7 @@ def init_database():
     """Initialize SQLite database for storing portfolio data"""
     conn = sqlite3.connect('portfolio_data.db', check_same_thread=False)
     
-    # Create tables
-    conn.execute('''
-        CREATE TABLE IF NOT EXISTS portfolios (
-            id INTEGER PRIMARY KEY,
-            name TEXT UNIQUE,
-            symbols TEXT,
-            weights TEXT,
-            created_date TEXT
-        )
-    ''')
-    
+    # Create tables (portfolio tables are managed by PortfolioRepository)
     conn.execute('''
         CREATE TABLE IF NOT EXISTS price_data (
             symbol TEXT,
@@ -84,32 +86,62 @@ def init_database():
     conn.commit()
     return conn
 
+@st.cache_resource
+def get_portfolio_repository():
+    """Saved portfolios, cached in-process and refreshed on writes"""
+    return PortfolioRepository(init_database())
+
+def get_export_manager():
+    """Background exporter for this browser session"""
+    if 'export_manager' not in st.session_state:
+        st.session_state.export_manager = ExportManager()
+    return st.session_state.export_manager
+
+def get_live_refresh():
+    """Auto-refresh state for this browser session"""
+    if 'live_refresh' not in st.session_state:
+        st.session_state.live_refresh = {
+            'scheduler': RefreshScheduler(interval=30),
+            'stats': RefreshStats(),
+            'portfolio': None,
+            'key': None,
+        }
+    return st.session_state.live_refresh
+
+def poll_live_portfolio(live, symbols, weights, period):
+    """Poll the current session and apply new or revised bars; returns their dates"""
+    key = (tuple(symbols), tuple(weights), period)
+    if live['key'] != key or live['portfolio'] is None:
+        prices, _ = engine.get_nse_data(symbols, period)
+        live['portfolio'] = LivePortfolio(prices, weights)
+        live['key'] = key
+        return list(prices.index)
+    bars, _ = engine.get_latest_bars(symbols, live['portfolio'].last_date)
+    return live['portfolio'].apply(bars)
+
+def wait_for_refresh(delay, placeholder):
+    """Sleep until the next refresh, then rerun the script.
+
+    Sleeps in one-second slices and updates ``placeholder`` in between, so
+    any widget interaction interrupts the wait instead of queueing behind it.
+    """
+    deadline = time.monotonic() + delay
+    while (remaining := deadline - time.monotonic()) > 0:
+        placeholder.caption(f"⏱️ Next refresh in {remaining:.0f}s")
+        time.sleep(min(1.0, remaining))
+    st.rerun()
+
 # NSE Stock Data Functions
 @st.cache_data(ttl=3600)  # Cache for 1 hour
 def get_nse_data(symbols, period="1y"):
-    """Fetch NSE stock data using yfinance"""
+    """Fetch NSE stock data, reading stored history and downloading only missing days"""
     try:
-        # Add .NS suffix for NSE stocks
-        nse_symbols = [f"{symbol}.NS" for symbol in symbols]
-        
-        # Download data
-        data = yf.download(nse_symbols, period=period, group_by='ticker', progress=False)
-        
-        if len(symbols) == 1:
-            # Single stock - reshape data
-            symbol = symbols[0]
-            df = pd.DataFrame()
-            df[symbol] = data['Close']
-            return df.dropna()
-        else:
-            # Multiple stocks
-            df = pd.DataFrame()
-            for symbol in symbols:
-                try:
-                    df[symbol] = data[f"{symbol}.NS"]['Close']
-                except:
-                    st.warning(f"Could not fetch data for {symbol}")
-            return df.dropna()
+        df, failures = engine.get_nse_data(symbols, period)
+        
+        for symbol in failures:
+            st.warning(f"Could not fetch data for {symbol}")
+        
+        return df
     
     except Exception as e:
         st.error(f"Error fetching data: {e}")
@@ -119,81 +151,127 @@ def get_nse_data(symbols, period="1y"):
 def get_nifty50_data(period="1y"):
     """Fetch NIFTY 50 index data"""
     try:
-        nifty = yf.download("^NSEI", period=period, progress=False)
-        return nifty['Close'].dropna()
+        return engine.get_nifty50_data(period)
     except Exception as e:
         st.error(f"Error fetching NIFTY 50 data: {e}")
         return pd.Series()
 
-# Risk Analytics Functions
-def calculate_returns(price_data):
-    """Calculate daily returns"""
-    return price_data.pct_change().dropna()
+def get_index_returns(index, dates, period):
+    """Benchmark index returns on the holdings' calendar (aligned once and cached by the engine)"""
+    try:
+        returns = engine.get_index_returns(index, dates, period)
+        return returns if returns.notna().any() else None
+    except Exception as e:
+        st.warning(f"Could not load {index} data: {e}")
+        return None
 
-def calculate_var(returns, confidence_level=0.05):
-    """Calculate Value at Risk"""
-    if len(returns) == 0:
-        return 0
-    return np.percentile(returns, confidence_level * 100)
+@st.cache_data(ttl=3600)
+def calculate_rolling_stats(returns, benchmark_returns):
+    """Rolling 20/60/252-day metrics for every holding"""
+    return rolling_stats(returns, benchmark_returns)
 
-def calculate_portfolio_metrics(price_data, weights, risk_free_rate=0.07):
-    """Calculate comprehensive portfolio metrics"""
-    returns = calculate_returns(price_data)
+@st.cache_data(ttl=3600)
+def calculate_efficient_frontier(price_data, points=50):
+    """Efficient frontier plus max-Sharpe and min-variance portfolios"""
+    return engine.calculate_efficient_frontier(price_data, points)
+
+@st.cache_data(ttl=3600)
+def calculate_var_report(returns, weights, confidence_levels):
+    """VaR / CVaR table for every method, including the Monte Carlo simulation"""
+    return var_report(returns, list(weights), list(confidence_levels))
+
+@st.cache_data(ttl=3600)
+def run_backtests(price_data, symbols, weights, cost_bps):
+    """Current portfolio backtested under every rebalance frequency"""
+    portfolio = {'Current': {'symbols': list(symbols), 'weights': list(weights)}}
+    return {
+        frequency: backtest(price_data, portfolio, frequency, cost_bps)['Current']
+        for frequency in REBALANCE_FREQUENCIES
+    }
+
+@st.cache_data(ttl=3600)
+def run_screen(universe, period, n_clusters):
+    """Screen a whole universe against NIFTY 50 (or its own average offline)"""
+    nifty_data = get_nifty50_data(period)
+    benchmark_returns = nifty_data.pct_change().dropna() if not nifty_data.empty else None
+    index, failures = engine.screen_universe(list(universe), period, benchmark_returns, n_clusters)
+    return index, list(failures)
+
+def render_screener(universe, period):
+    """Universe screener: filter, sort and top-k over precomputed metrics"""
+    st.subheader(f"Universe Screener - {len(universe)} Stocks")
     
-    if returns.empty:
-        return {}
+    n_clusters = st.sidebar.slider("Correlation Clusters", 2, 20, 8)
+    with st.spinner(f"Screening {len(universe)} stocks..."):
+        index, failures = run_screen(tuple(universe), period, n_clusters)
     
-    # Portfolio returns
-    portfolio_returns = (returns * weights).sum(axis=1)
+    if len(index) == 0:
+        st.error("Could not fetch price data for any symbol in the universe.")
+        return
     
-    # Metrics
-    annual_return = portfolio_returns.mean() * 252
-    annual_vol = portfolio_returns.std() * np.sqrt(252)
+    st.caption(f"Screened {len(index)} stocks in {index.elapsed * 1000:.0f} ms"
+               + (f" | {len(failures)} without data" if failures else "")
+               + (f" | {len(index.skipped)} with too little history" if index.skipped else ""))
     
-    # Sharpe Ratio
-    sharpe_ratio = (annual_return - risk_free_rate) / annual_vol if annual_vol > 0 else 0
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        sort_by = st.selectbox("Sort By", SCREEN_COLUMNS, index=SCREEN_COLUMNS.index('Sharpe Ratio'))
+    with col2:
+        ascending = st.radio("Order", ["Descending", "Ascending"], horizontal=True) == "Ascending"
+    with col3:
+        top_k = st.number_input("Top K", 1, len(index), min(25, len(index)))
+    with col4:
+        max_vol = st.slider("Max Volatility", 0.0, 1.0, 1.0, step=0.05)
     
-    # VaR
-    var_95 = calculate_var(portfolio_returns, 0.05)
-    var_99 = calculate_var(portfolio_returns, 0.01)
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        sectors = st.multiselect("Sectors", index.sectors())
+    with col2:
+        clusters = st.multiselect("Clusters", index.clusters())
+    with col3:
+        min_sharpe = st.slider("Min Sharpe Ratio", -2.0, 3.0, -2.0, step=0.1)
     
-    # Maximum Drawdown
-    cumulative = (1 + portfolio_returns).cumprod()
-    rolling_max = cumulative.expanding().max()
-    drawdown = (cumulative - rolling_max) / rolling_max
-    max_drawdown = drawdown.min()
+    results = index.query(
+        sort_by, ascending, top=int(top_k), sectors=sectors, clusters=clusters,
+        filters={'Volatility': (None, max_vol if max_vol < 1.0 else None),
+                 'Sharpe Ratio': (min_sharpe if min_sharpe > -2.0 else None, None)}
+    )
     
-    return {
-        'annual_return': annual_return,
-        'annual_volatility': annual_vol,
-        'sharpe_ratio': sharpe_ratio,
-        'var_95': var_95,
-        'var_99': var_99,
-        'max_drawdown': max_drawdown,
-        'portfolio_returns': portfolio_returns
+    formats = {
+        'Annual Return': '{:.2%}',
+        'Volatility': '{:.2%}',
+        'Sharpe Ratio': '{:.3f}',
+        'Sortino Ratio': '{:.3f}',
+        'Beta': '{:.2f}',
+        'Max Drawdown': '{:.2%}',
+        'Skew': '{:.2f}',
+        'Kurtosis': '{:.2f}',
+        'Current Price': '₹{:.2f}',
     }
+    st.dataframe(results.assign(
+        **{column: results[column].map(fmt.format) for column, fmt in formats.items()}
+    ), use_container_width=True)
+    
+    col1, col2 = st.columns([2, 1])
+    with col1:
+        fig_screen = px.scatter(
+            index.table.assign(Cluster=index.table['Cluster'].astype(str)),
+            x='Volatility', y='Annual Return', color='Cluster', hover_name='Stock',
+            hover_data=['Sector', 'Sharpe Ratio', 'Beta'], title="Risk vs Return by Correlation Cluster"
+        )
+        fig_screen.update_layout(template='plotly_white', height=450)
+        st.plotly_chart(fig_screen, use_container_width=True)
+    with col2:
+        st.write("**Clusters:**")
+        st.dataframe(index.cluster_summary().round(3), use_container_width=True)
 
-def calculate_correlation_matrix(price_data):
-    """Calculate correlation matrix"""
-    returns = calculate_returns(price_data)
-    return returns.corr()
-
-# Predefined Portfolios
-SAMPLE_PORTFOLIOS = {
-    "NIFTY Top 10": {
-        "symbols": ["RELIANCE", "TCS", "HDFCBANK", "INFY", "HINDUNILVR", 
-                   "ICICIBANK", "KOTAKBANK", "BHARTIARTL", "SBIN", "LT"],
-        "weights": [0.1] * 10
-    },
-    "Banking Focus": {
-        "symbols": ["HDFCBANK", "ICICIBANK", "KOTAKBANK", "SBIN", "AXISBANK"],
-        "weights": [0.2] * 5
-    },
-    "IT Sector": {
-        "symbols": ["TCS", "INFY", "HCLTECH", "WIPRO", "TECHM"],
-        "weights": [0.2] * 5
-    }
-}
+@st.cache_data(ttl=3600)
+def run_stress_tests(portfolios, portfolio_value):
+    """Default stress scenarios applied to the current and all saved portfolios"""
+    nifty_data = get_nifty50_data("max")
+    report, failures = engine.run_stress_tests(portfolios, portfolio_value,
+                                               nifty_data if not nifty_data.empty else None)
+    return report, list(failures)
 
 # Main Application
 def main():
@@ -201,15 +279,17 @@ def main():
                 unsafe_allow_html=True)
     
     # Initialize database
-    conn = init_database()
+    repository = get_portfolio_repository()
     
     # Sidebar
     st.sidebar.title("Portfolio Configuration")
     
+    weighting = "Manual"
+    
     # Portfolio selection
     portfolio_option = st.sidebar.selectbox(
         "Choose Portfolio Type",
-        ["Sample Portfolio", "Custom Portfolio", "Load Saved Portfolio"]
+        ["Sample Portfolio", "Custom Portfolio", "Load Saved Portfolio", "Universe Screener"]
     )
     
     if portfolio_option == "Sample Portfolio":
@@ -237,38 +317,44 @@ def main():
         symbols = [s.strip().upper() for s in stock_input.split('\n') if s.strip()]
         
         if symbols:
-            st.sidebar.write("**Adjust Weights:**")
-            weights = []
-            
-            for symbol in symbols:
-                weight = st.sidebar.slider(
-                    f"{symbol}",
-                    min_value=0.0,
-                    max_value=1.0,
-                    value=1.0/len(symbols),
-                    step=0.05,
-                    key=f"weight_{symbol}"
-                )
-                weights.append(weight)
+            weighting = st.sidebar.radio(
+                "Weighting",
+                ["Manual", "Max Sharpe", "Min Variance"],
+                horizontal=True
+            )
             
-            # Normalize weights
-            total_weight = sum(weights)
-            if total_weight > 0:
-                weights = [w/total_weight for w in weights]
+            if weighting == "Manual":
+                st.sidebar.write("**Adjust Weights:**")
+                weights = []
+                
+                for symbol in symbols:
+                    weight = st.sidebar.slider(
+                        f"{symbol}",
+                        min_value=0.0,
+                        max_value=1.0,
+                        value=1.0/len(symbols),
+                        step=0.05,
+                        key=f"weight_{symbol}"
+                    )
+                    weights.append(weight)
                 
-                if abs(sum(weights) - 1.0) > 0.01:
-                    st.sidebar.warning(f"Weights sum to {sum(weights):.2f}. Auto-normalized to 1.0")
+                # Normalize weights
+                total_weight = sum(weights)
+                if total_weight > 0:
+                    weights = [w/total_weight for w in weights]
+                    
+                    if abs(sum(weights) - 1.0) > 0.01:
+                        st.sidebar.warning(f"Weights sum to {sum(weights):.2f}. Auto-normalized to 1.0")
+            else:
+                weights = [1.0/len(symbols)] * len(symbols)
+                st.sidebar.caption("Weights are optimized once price data loads, within the position limits in config.py")
             
             # Save portfolio option
             if st.sidebar.button("💾 Save Portfolio"):
                 portfolio_name = st.sidebar.text_input("Portfolio Name")
                 if portfolio_name:
                     try:
-                        conn.execute(
-                            "INSERT OR REPLACE INTO portfolios (name, symbols, weights, created_date) VALUES (?, ?, ?, ?)",
-                            (portfolio_name, ','.join(symbols), ','.join(map(str, weights)), str(datetime.now().date()))
-                        )
-                        conn.commit()
+                        repository.save(portfolio_name, symbols, weights)
                         st.sidebar.success("Portfolio saved!")
                     except Exception as e:
                         st.sidebar.error(f"Error saving portfolio: {e}")
@@ -276,23 +362,35 @@ def main():
             st.sidebar.error("Please enter at least one symbol")
             return
     
+    elif portfolio_option == "Universe Screener":
+        universe_source = st.sidebar.radio("Universe", ["NIFTY 50", "Symbol File"], horizontal=True)
+        if universe_source == "NIFTY 50":
+            universe = load_universe()
+        else:
+            uploaded = st.sidebar.file_uploader("Symbols (one per line, or CSV with a Symbol column)",
+                                                type=["txt", "csv"])
+            if uploaded is None:
+                st.info("Upload a symbol list to screen.")
+                return
+            universe = parse_universe(uploaded.getvalue().decode("utf-8"))
+            if not universe:
+                st.sidebar.error("No symbols found in the file")
+                return
+        symbols, weights = [], []
+    
     else:  # Load Saved Portfolio
         try:
-            saved_portfolios = pd.read_sql_query("SELECT name FROM portfolios", conn)
-            if not saved_portfolios.empty:
+            saved_portfolios = repository.list_names()
+            if saved_portfolios:
                 selected_saved = st.sidebar.selectbox(
                     "Select Saved Portfolio",
-                    saved_portfolios['name'].tolist()
+                    saved_portfolios
                 )
                 
-                portfolio_row = pd.read_sql_query(
-                    "SELECT * FROM portfolios WHERE name = ?", 
-                    conn, 
-                    params=[selected_saved]
-                ).iloc[0]
+                portfolio_row = repository.load(selected_saved)
                 
-                symbols = portfolio_row['symbols'].split(',')
-                weights = [float(w) for w in portfolio_row['weights'].split(',')]
+                symbols = portfolio_row['symbols']
+                weights = portfolio_row['weights']
                 
                 st.sidebar.success(f"Loaded: {selected_saved}")
                 st.sidebar.write(f"Created: {portfolio_row['created_date']}")
@@ -311,15 +409,45 @@ def main():
         index=0
     )
     
+    if portfolio_option == "Universe Screener":
+        render_screener(universe, period)
+        return
+    
+    benchmark_index = st.sidebar.selectbox("Benchmark Index", list(BENCHMARK_INDICES))
+    
     # Auto-refresh
     auto_refresh = st.sidebar.checkbox("Auto Refresh (30s)")
-    if auto_refresh:
-        st.experimental_rerun()
     
     # Main Dashboard
     if symbols and weights:
         st.subheader(f"Portfolio Analysis - {len(symbols)} Stocks")
         
+        # Fetch data
+        with st.spinner("Fetching NSE data..."):
+            price_data = get_nse_data(symbols, period)
+        
+        if price_data.empty:
+            st.error("Could not fetch price data. Please check stock symbols.")
+            return
+        
+        # Weights follow the symbols that loaded, renormalised over them
+        if list(price_data.columns) != list(symbols):
+            try:
+                weights = engine.align_weights(weights, symbols, price_data.columns).tolist()
+            except ValueError as e:
+                st.error(f"{e}.")
+                return
+            symbols = list(price_data.columns)
+        
+        # Optimized weights
+        if weighting != "Manual":
+            try:
+                _, max_sharpe, min_variance = calculate_efficient_frontier(price_data)
+                optimized = max_sharpe if weighting == "Max Sharpe" else min_variance
+                weights = optimized['weights'].reindex(symbols).fillna(0).tolist()
+            except ValueError as e:
+                st.warning(f"Could not optimize weights: {e}")
+        
         # Show portfolio composition
         portfolio_df = pd.DataFrame({
             'Stock': symbols,
@@ -331,18 +459,16 @@ def main():
             st.write("**Portfolio Composition:**")
             st.dataframe(portfolio_df, use_container_width=True)
         
-        # Fetch data
-        with st.spinner("Fetching NSE data..."):
-            price_data = get_nse_data(symbols, period)
-            nifty_data = get_nifty50_data(period)
-        
-        if price_data.empty:
-            st.error("Could not fetch price data. Please check stock symbols.")
-            return
-        
         # Calculate metrics
-        with st.spinner("Calculating risk metrics..."):
-            metrics = calculate_portfolio_metrics(price_data, weights)
+        if auto_refresh:
+            # Poll for new bars and fold them into the incremental risk state
+            live = get_live_refresh()
+            new_bars = live['stats'].measure(poll_live_portfolio, live, symbols, weights, period)
+            price_data = live['portfolio'].prices
+            metrics = live['portfolio'].metrics()
+        else:
+            with st.spinner("Calculating risk metrics..."):
+                metrics = calculate_portfolio_metrics(price_data, weights)
         
         if not metrics:
             st.error("Could not calculate portfolio metrics.")
@@ -396,65 +522,285 @@ def main():
             var_inr = abs(metrics['var_95']) * portfolio_value
             st.metric("Daily VaR (₹)", f"₹{var_inr:,.0f}")
         
+        with st.expander("VaR / CVaR by Method"):
+            var_table = calculate_var_report(calculate_returns(price_data), tuple(weights),
+                                             tuple(RISK_CONFIG['VAR_CONFIDENCE_LEVELS']))
+            var_table['VaR (₹)'] = var_table['VaR'].abs() * portfolio_value
+            var_table['CVaR (₹)'] = var_table['CVaR'].abs() * portfolio_value
+            st.dataframe(var_table.style.format({
+                'Confidence': '{:.0%}',
+                'VaR': '{:.2%}',
+                'CVaR': '{:.2%}',
+                'VaR (₹)': '₹{:,.0f}',
+                'CVaR (₹)': '₹{:,.0f}'
+            }), use_container_width=True)
+        
         # Charts Section
         st.subheader("📈 Performance Analysis")
         
-        # Performance Chart
-        fig_perf = go.Figure()
-        
-        # Portfolio cumulative returns
+        # Performance Chart: portfolio vs benchmark cumulative returns
         portfolio_returns = metrics['portfolio_returns']
-        portfolio_cumulative = (1 + portfolio_returns).cumprod()
-        
-        fig_perf.add_trace(go.Scatter(
-            x=portfolio_cumulative.index,
-            y=portfolio_cumulative.values,
-            mode='lines',
-            name='Portfolio',
-            line=dict(color='#1f77b4', width=3)
-        ))
+        performance = {'Portfolio': (1 + portfolio_returns).cumprod()}
         
-        # NIFTY 50 comparison
-        if not nifty_data.empty:
-            nifty_aligned = nifty_data.reindex(price_data.index, method='ffill')
-            nifty_returns = nifty_aligned.pct_change().dropna()
-            nifty_cumulative = (1 + nifty_returns).cumprod()
-            
-            fig_perf.add_trace(go.Scatter(
-                x=nifty_cumulative.index,
-                y=nifty_cumulative.values,
-                mode='lines',
-                name='NIFTY 50',
-                line=dict(color='#ff7f0e', width=2)
-            ))
+        index_returns = get_index_returns(benchmark_index, price_data.index, period)
+        if index_returns is not None:
+            performance[benchmark_index] = (1 + index_returns.dropna()).cumprod()
         
-        fig_perf.update_layout(
+        fig_perf = figure_cache.get('performance', performance, lambda: line_chart(
+            performance,
             title="Cumulative Returns Comparison",
-            xaxis_title="Date",
             yaxis_title="Cumulative Return",
-            hovermode='x unified',
-            template='plotly_white',
-            height=500
-        )
+            height=500,
+            styles={'Portfolio': dict(color='#1f77b4', width=3), benchmark_index: dict(color='#ff7f0e', width=2)},
+            hovermode='x unified'
+        ))
         
         st.plotly_chart(fig_perf, use_container_width=True)
         
+        # Benchmark-Relative Analytics
+        if index_returns is not None:
+            st.subheader(f"🎯 Relative to {benchmark_index}")
+            
+            beta_window = st.radio("Rolling beta window (days)", [20, 60, 252], index=1, horizontal=True)
+            relative = engine.calculate_relative_metrics(price_data, weights, index_returns, window=beta_window)
+            relative_metrics = relative['metrics']
+            
+            col1, col2 = st.columns([3, 2])
+            with col1:
+                st.dataframe(relative_metrics.style.format({
+                    'Beta': '{:.2f}',
+                    'Alpha': '{:.2%}',
+                    'Correlation': '{:.2f}',
+                    'Tracking Error': '{:.2%}',
+                    'Information Ratio': '{:.2f}',
+                    'Up Capture': '{:.0%}',
+                    'Down Capture': '{:.0%}',
+                    'Excess Return': '{:.2%}',
+                }), use_container_width=True)
+            with col2:
+                betas = relative['rolling_beta'].dropna(how='all')
+                fig_beta = figure_cache.get('rolling_beta', betas, lambda: line_chart(
+                    betas,
+                    title=f"Rolling {beta_window}-day Beta",
+                    yaxis_title="Beta",
+                    styles={column: dict(width=3) if column == 'Portfolio' else dict(width=1)
+                            for column in betas.columns}
+                ))
+                st.plotly_chart(fig_beta, use_container_width=True)
+        
+        # Efficient Frontier
+        with st.expander("🎯 Efficient Frontier"):
+            try:
+                frontier, max_sharpe, min_variance = calculate_efficient_frontier(price_data)
+                
+                fig_frontier = go.Figure()
+                fig_frontier.add_trace(go.Scatter(
+                    x=frontier['Volatility'],
+                    y=frontier['Return'],
+                    mode='lines',
+                    name='Efficient Frontier',
+                    line=dict(color='#1f77b4', width=3)
+                ))
+                
+                for label, point, color in [
+                    ('Max Sharpe', max_sharpe, '#2ca02c'),
+                    ('Min Variance', min_variance, '#9467bd'),
+                ]:
+                    fig_frontier.add_trace(go.Scatter(
+                        x=[point['annual_volatility']],
+                        y=[point['annual_return']],
+                        mode='markers',
+                        name=label,
+                        marker=dict(color=color, size=12)
+                    ))
+                
+                fig_frontier.add_trace(go.Scatter(
+                    x=[metrics['annual_volatility']],
+                    y=[metrics['annual_return']],
+                    mode='markers',
+                    name='Current Portfolio',
+                    marker=dict(color='#ff7f0e', size=12, symbol='star')
+                ))
+                
+                fig_frontier.update_layout(
+                    xaxis_title="Annual Volatility",
+                    yaxis_title="Annual Return",
+                    xaxis_tickformat='.0%',
+                    yaxis_tickformat='.0%',
+                    template='plotly_white',
+                    height=450
+                )
+                st.plotly_chart(fig_frontier, use_container_width=True)
+            
+            except ValueError as e:
+                st.info(f"Efficient frontier unavailable: {e}")
+        
+        # Rebalancing Backtest
+        with st.expander("🔁 Rebalancing Backtest"):
+            cost_bps = st.number_input("Transaction cost (bps per unit turnover)", 0, 200, 10, step=5)
+            backtests = run_backtests(price_data, symbols, weights, cost_bps)
+            
+            st.dataframe(pd.DataFrame([{
+                'Rebalance': frequency.title(),
+                'Annual Return': f"{result['annual_return']:.2%}",
+                'Volatility': f"{result['annual_volatility']:.2%}",
+                'Sharpe Ratio': f"{result['sharpe_ratio']:.3f}",
+                'Max Drawdown': f"{result['max_drawdown']:.2%}",
+                'VaR (95%)': f"{result['var_95']:.2%}",
+                'Annual Turnover': f"{result['annual_turnover']:.1%}",
+            } for frequency, result in backtests.items()]), use_container_width=True)
+            
+            growth = pd.DataFrame({
+                frequency.title(): ((1 + result['portfolio_returns']).cumprod() - 1) * 100
+                for frequency, result in backtests.items()
+            })
+            fig_backtest = figure_cache.get('backtest', growth, lambda: line_chart(
+                growth, yaxis_title="Cumulative Return (%)"
+            ))
+            st.plotly_chart(fig_backtest, use_container_width=True)
+        
+        # Stress Testing
+        with st.expander("🧨 Stress Test"):
+            stress_value = st.number_input("Portfolio value (₹)", 10_000, 1_000_000_000, 1_000_000, step=100_000)
+            stress_portfolios = {'Current Portfolio': {'symbols': list(symbols), 'weights': list(weights)}}
+            for name, saved in repository.load_many().items():
+                stress_portfolios.setdefault(name, {'symbols': saved['symbols'], 'weights': saved['weights']})
+            
+            stress_report, stress_failures = run_stress_tests(stress_portfolios, stress_value)
+            if stress_report is None:
+                st.info("No local price history available for stress testing.")
+            else:
+                st.caption(f"{len(stress_report.returns)} scenarios x {len(stress_portfolios)} portfolio(s): "
+                           "the current portfolio plus every saved one")
+                worst = stress_report.worst('Current Portfolio')
+                
+                col1, col2 = st.columns([1, 1])
+                with col1:
+                    st.write("**Worst scenarios for the current portfolio:**")
+                    st.dataframe(worst.assign(
+                        Return=worst['Return'].map('{:.2%}'.format),
+                        **{'P&L': worst['P&L'].map('₹{:,.0f}'.format)}
+                    ), use_container_width=True)
+                with col2:
+                    fig_stress = go.Figure(go.Bar(
+                        x=worst['Return'] * 100,
+                        y=worst['Scenario'],
+                        orientation='h',
+                        marker_color='#d62728'
+                    ))
+                    fig_stress.update_layout(
+                        xaxis_title="Portfolio Return (%)",
+                        yaxis=dict(autorange='reversed'),
+                        template='plotly_white',
+                        height=400
+                    )
+                    st.plotly_chart(fig_stress, use_container_width=True)
+                
+                summary = stress_report.summary()
+                st.write("**All portfolios:**")
+                st.dataframe(summary.assign(**{
+                    column: summary[column].map(fmt.format) for column, fmt in {
+                        'Worst Return': '{:.2%}',
+                        'Worst P&L': '₹{:,.0f}',
+                        'Average Return': '{:.2%}',
+                        'Worst Historical': '{:.2%}',
+                    }.items()
+                }), use_container_width=True)
+        
+        # Rolling Analytics
+        st.subheader("📉 Rolling Risk Analytics")
+        
+        benchmark_returns = index_returns if index_returns is not None else portfolio_returns
+        rolling = calculate_rolling_stats(calculate_returns(price_data), benchmark_returns)
+        
+        col1, col2 = st.columns(2)
+        with col1:
+            rolling_metric = st.selectbox(
+                "Metric",
+                ["Volatility", "Sharpe", "Beta", "Correlation"]
+            ).lower()
+        with col2:
+            rolling_window = st.radio(
+                "Window (days)",
+                rolling['windows'],
+                horizontal=True
+            )
+        
+        rolling_df = rolling_frame(rolling, rolling_metric, rolling_window).dropna(how='all')
+        
+        benchmark_name = benchmark_index if index_returns is not None else "Portfolio"
+        rolling_title = f"Rolling {rolling_window}-day {rolling_metric.title()}" \
+            + (f" vs {benchmark_name}" if rolling_metric in ("beta", "correlation") else "")
+        fig_rolling = figure_cache.get(('rolling', rolling_title), rolling_df, lambda: line_chart(
+            rolling_df,
+            title=rolling_title,
+            yaxis_title=rolling_metric.title(),
+            height=450,
+            hovermode='x unified'
+        ))
+        st.plotly_chart(fig_rolling, use_container_width=True)
+        
+        # Sector Analytics
+        st.subheader("🏭 Sector Analytics")
+        
+        sector_data = engine.calculate_sector_analytics(price_data, weights, period)
+        sector_summary = sector_data['summary']
+        
+        col1, col2 = st.columns([3, 2])
+        with col1:
+            st.dataframe(sector_summary.assign(**{
+                column: sector_summary[column].map(fmt.format) for column, fmt in {
+                    'Weight': '{:.1%}',
+                    'Annual Return': '{:.2%}',
+                    'Volatility': '{:.2%}',
+                    'Risk Contribution': '{:.2%}',
+                    'Risk Share': '{:.1%}',
+                }.items()
+            }), use_container_width=True)
+        with col2:
+            fig_sector = go.Figure()
+            for column, name in (('Weight', 'Weight'), ('Risk Share', 'Share of Risk')):
+                fig_sector.add_trace(go.Bar(x=sector_summary['Sector'], y=sector_summary[column] * 100, name=name))
+            fig_sector.update_layout(
+                barmode='group',
+                yaxis_title="%",
+                template='plotly_white',
+                height=350
+            )
+            st.plotly_chart(fig_sector, use_container_width=True)
+        
+        col1, col2 = st.columns(2)
+        with col1:
+            sector_growth = ((1 + sector_data['returns']).cumprod() - 1) * 100
+            fig_sector_returns = figure_cache.get('sector_returns', sector_growth, lambda: line_chart(
+                sector_growth,
+                title="Sector Cumulative Returns",
+                yaxis_title="Cumulative Return (%)"
+            ))
+            st.plotly_chart(fig_sector_returns, use_container_width=True)
+        with col2:
+            fig_sector_corr = figure_cache.get('sector_correlation', sector_data['correlation'], lambda: correlation_heatmap(
+                sector_data['correlation'], title="Sector Correlations"
+            ))
+            st.plotly_chart(fig_sector_corr, use_container_width=True)
+        
         # Correlation Heatmap
         col1, col2 = st.columns(2)
         
         with col1:
             st.subheader("📊 Correlation Matrix")
-            corr_matrix = calculate_correlation_matrix(price_data)
+            estimators = {
+                "Sample": "sample",
+                "Ledoit-Wolf Shrinkage": "ledoit_wolf",
+                "EWMA (λ=0.94)": "ewma",
+                "Sector Factor Model": "factor"
+            }
+            estimator = st.selectbox("Estimator", list(estimators))
+            corr_matrix = calculate_correlation_matrix(price_data, estimators[estimator], period)
             
-            fig_corr = px.imshow(
-                corr_matrix,
-                text_auto=True,
-                aspect="auto",
-                color_continuous_scale="RdBu_r",
-                color_continuous_midpoint=0,
-                title="Stock Correlations"
-            )
-            fig_corr.update_layout(height=400)
+            fig_corr = figure_cache.get('correlation', corr_matrix, lambda: correlation_heatmap(
+                corr_matrix, title="Stock Correlations", text_auto=True
+            ))
             st.plotly_chart(fig_corr, use_container_width=True)
         
         with col2:
@@ -478,64 +824,144 @@ def main():
             )
             st.plotly_chart(fig_hist, use_container_width=True)
         
+        # Correlation Structure
+        st.subheader("🕸️ Correlation Structure")
+        threshold = st.slider(
+            "Flag pairs with correlation above",
+            min_value=0.5, max_value=0.95, step=0.05,
+            value=float(RISK_CONFIG['CORRELATION_THRESHOLD'])
+        )
+        corr_matrix, structure = engine.calculate_correlation_structure(
+            price_data, estimators[estimator], period, threshold
+        )
+        holding_weights = pd.Series(weights, index=symbols).reindex(corr_matrix.columns).fillna(0)
+        
+        col1, col2 = st.columns(2)
+        with col1:
+            flagged = structure.pairs(holding_weights.to_numpy())
+            if flagged.empty:
+                st.success(f"No holdings are correlated above {threshold:.2f}")
+            else:
+                st.warning(f"{len(flagged)} holding pair(s) correlated above {threshold:.2f}")
+                st.dataframe(flagged.style.format({
+                    'Correlation': '{:.3f}',
+                    'Combined Weight': '{:.1%}',
+                }), use_container_width=True)
+            summary = structure.summary()
+            st.caption(
+                f"{summary['edges']} of {summary['symbols'] * (summary['symbols'] - 1) // 2} pairs above the threshold, "
+                f"{summary['linked_groups']} linked group(s), largest {summary['largest_group']} stocks; "
+                f"mean correlation along the spanning tree {summary['mst_mean_correlation']:.2f}"
+            )
+        with col2:
+            def build_network():
+                positions = graph_layout(corr_matrix)
+                mst = structure.mst_frame()
+                column = {symbol: j for j, symbol in enumerate(structure.symbols)}
+                edge_x, edge_y = [], []
+                for a, b in zip(mst['Stock A'], mst['Stock B']):
+                    i, j = column[a], column[b]
+                    edge_x += [positions[i, 0], positions[j, 0], None]
+                    edge_y += [positions[i, 1], positions[j, 1], None]
+                
+                fig = go.Figure()
+                fig.add_trace(go.Scatter(
+                    x=edge_x, y=edge_y, mode='lines',
+                    line=dict(color='#b0b0b0', width=1),
+                    hoverinfo='skip', showlegend=False
+                ))
+                fig.add_trace(go.Scatter(
+                    x=positions[:, 0], y=positions[:, 1],
+                    mode='markers+text' if len(structure) <= 30 else 'markers',
+                    text=structure.symbols, textposition='top center',
+                    marker=dict(
+                        size=8 + 40 * np.sqrt(holding_weights.to_numpy()),
+                        color=structure.clusters(),
+                        colorscale='Turbo',
+                        line=dict(width=1, color='white')
+                    ),
+                    hovertext=[f"{symbol}: {weight:.1%}" for symbol, weight in holding_weights.items()],
+                    hoverinfo='text', showlegend=False
+                ))
+                fig.update_layout(
+                    title="Minimum Spanning Tree",
+                    xaxis=dict(visible=False),
+                    yaxis=dict(visible=False),
+                    template='plotly_white',
+                    height=400
+                )
+                return fig
+            
+            fig_network = figure_cache.get(('correlation_network', threshold), (corr_matrix, holding_weights), build_network)
+            st.plotly_chart(fig_network, use_container_width=True)
+        
         # Individual Stock Performance
         st.subheader("📈 Individual Stock Performance")
         
         # Calculate individual stock metrics
-        individual_metrics = []
         returns_data = calculate_returns(price_data)
-        
-        for i, symbol in enumerate(symbols):
-            stock_returns = returns_data[symbol]
-            annual_ret = stock_returns.mean() * 252
-            annual_vol = stock_returns.std() * np.sqrt(252)
-            sharpe = (annual_ret - 0.07) / annual_vol if annual_vol > 0 else 0
-            
-            individual_metrics.append({
-                'Stock': symbol,
-                'Weight': f"{weights[i]:.1%}",
-                'Annual Return': f"{annual_ret:.2%}",
-                'Volatility': f"{annual_vol:.2%}",
-                'Sharpe Ratio': f"{sharpe:.3f}",
-                'Current Price': f"₹{price_data[symbol].iloc[-1]:.2f}"
-            })
-        
-        metrics_df = pd.DataFrame(individual_metrics)
+        stock_metrics = engine.calculate_stock_metrics(price_data, index_returns)
+        stock_metrics.insert(1, 'Weight', stock_metrics['Stock'].map(dict(zip(symbols, weights))).fillna(0))
+        
+        # Formatting is applied only here, at render time
+        formats = {
+            'Weight': '{:.1%}',
+            'Annual Return': '{:.2%}',
+            'Volatility': '{:.2%}',
+            'Sharpe Ratio': '{:.3f}',
+            'Sortino Ratio': '{:.3f}',
+            'Beta': '{:.2f}',
+            'Max Drawdown': '{:.2%}',
+            'Skew': '{:.2f}',
+            'Kurtosis': '{:.2f}',
+            'Current Price': '₹{:.2f}',
+        }
+        metrics_df = stock_metrics.assign(
+            **{column: stock_metrics[column].map(fmt.format) for column, fmt in formats.items()}
+        )
         st.dataframe(metrics_df, use_container_width=True)
         
         # Export Options
         st.subheader("📤 Export Data")
         
+        exports = get_export_manager()
+        export_format = st.radio("Format", available_formats(), horizontal=True,
+                                 help="Full histories are written in chunks on a background thread")
+        
         col1, col2, col3 = st.columns(3)
         
         with col1:
             if st.button("📊 Export Portfolio Data"):
-                export_data = {
-                    'Portfolio Composition': portfolio_df,
-                    'Performance Metrics': pd.DataFrame([{
-                        'Metric': k.replace('_', ' ').title(),
-                        'Value': f"{v:.2%}" if 'return' in k or 'vol' in k or 'drawdown' in k else f"{v:.3f}"
+                exports.submit('portfolio_analysis', {
+                    'portfolio_composition': pd.DataFrame({'Stock': symbols, 'Weight': weights}),
+                    'performance_metrics': pd.DataFrame([{
+                        'Metric': k.replace('_', ' ').title(), 'Value': v
                     } for k, v in metrics.items() if k != 'portfolio_returns']),
-                    'Individual Stocks': metrics_df,
-                    'Price Data': price_data.tail(10)
-                }
-                
-                # Create Excel file
-                with pd.ExcelWriter('portfolio_analysis.xlsx') as writer:
-                    for sheet_name, data in export_data.items():
-                        data.to_excel(writer, sheet_name=sheet_name, index=False)
-                
-                st.success("Data exported to portfolio_analysis.xlsx")
+                    'individual_stocks': stock_metrics,
+                    'price_data': price_data,
+                }, export_format)
         
         with col2:
             if st.button("📈 Export Price Data"):
-                price_data.to_csv('price_data.csv')
-                st.success("Price data exported to price_data.csv")
+                exports.submit('price_data', {'price_data': price_data}, export_format)
         
         with col3:
             if st.button("📊 Export Returns Data"):
-                returns_data.to_csv('returns_data.csv')
-                st.success("Returns data exported to returns_data.csv")
+                exports.submit('returns_data', {'returns_data': returns_data}, export_format)
+        
+        for col, name in zip((col1, col2, col3), ('portfolio_analysis', 'price_data', 'returns_data')):
+            status = exports.status(name)
+            with col:
+                if status == 'running':
+                    st.info("Export running...")
+                    st.button("🔄 Refresh", key=f"refresh_{name}")
+                elif status == 'failed':
+                    st.error(f"Export failed: {exports.error(name)}")
+                elif status == 'done':
+                    result = exports.result(name)
+                    st.caption(result.summary())
+                    st.download_button("⬇️ Download", result.data, file_name=result.file_name,
+                                       mime=result.mime, key=f"download_{name}")
         
         # Footer
         st.markdown("---")
@@ -545,8 +971,16 @@ def main():
         **Disclaimer:** This tool is for educational purposes only. Past performance does not guarantee future results. 
         Always consult with qualified financial advisors before making investment decisions.
         """)
-    
-    conn.close()
+        
+        if auto_refresh:
+            delay = live['scheduler'].next_delay(changed=bool(new_bars))
+            refresh_stats = live['stats'].summary()
+            st.sidebar.caption(
+                f"{'🟢 Market open' if market_is_open() else '🔴 Market closed'} | "
+                f"{len(new_bars)} new or revised bar(s) | refresh {refresh_stats['last_latency'] * 1000:.0f} ms "
+                f"(avg {refresh_stats['mean_latency'] * 1000:.0f} ms) | CPU {refresh_stats['cpu_share']:.1%}"
+            )
+            wait_for_refresh(delay, st.sidebar.empty())
 
 if __name__ == "__main__":
     main()
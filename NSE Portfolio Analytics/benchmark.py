@@ -0,0 +1,708 @@
+"""
+Offline benchmarks for NSE Portfolio Analytics
+Run with: python benchmark.py
+Scaling suite: python benchmark.py --suite [--quick]
+
+The suite times each stage of an analysis (load, returns, portfolio
+metrics, correlation, VaR, chart data) on deterministic synthetic
+universes from 10 to 2,000 symbols and 1 to 20 years, records wall time,
+throughput and peak traced memory in a JSON history, and fails when a
+stage is slower or larger than the median of recent runs on the same
+machine by more than the tolerance. Nothing touches the network.
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tempfile
+import tracemalloc
+from datetime import date, datetime
+
+import numpy as np
+import pandas as pd
+
+SYMBOLS = [f"SYM{i:03d}" for i in range(50)]
+END_DATE = date(2024, 12, 31)
+
+SUITE_SYMBOLS = (10, 100, 500, 2000)
+SUITE_YEARS = (1, 5, 20)
+QUICK_SYMBOLS = (10, 100)
+QUICK_YEARS = (1, 5)
+
+HISTORY_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_history.json")
+BASELINE_RUNS = 5
+TIME_TOLERANCE = 0.5      # fail when a stage is >50% slower than its baseline
+MEMORY_TOLERANCE = 0.25   # ... or its peak memory is >25% higher
+
+
+def timed(func, repeat=5):
+    """Return the best wall-clock time of ``repeat`` calls, in seconds"""
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def synthetic_prices(n_symbols=50, years=5, seed=42):
+    """Deterministic GBM price frame with ``years`` of business days"""
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range(end=END_DATE, periods=years * 252)
+    returns = rng.normal(0.0004, 0.018, (len(dates), n_symbols))
+    prices = 100 * np.exp(np.cumsum(returns, axis=0))
+    return pd.DataFrame(prices, index=dates, columns=[f"SYM{i:03d}" for i in range(n_symbols)])
+
+
+def random_weights(n_portfolios, n_symbols, seed=42):
+    """Long-only weight vectors that sum to one"""
+    return np.random.default_rng(seed).dirichlet(np.ones(n_symbols), n_portfolios)
+
+
+def bench_price_store():
+    """Load 10y x 50 symbols from the local price store"""
+    print("⏱️ Benchmarking price store load...")
+    
+    from price_store import PriceStore, SyntheticFetcher
+    
+    with tempfile.TemporaryDirectory() as root:
+        store = PriceStore(root, fetcher=SyntheticFetcher())
+        
+        start = time.perf_counter()
+        store.load(SYMBOLS, period="10y", end=END_DATE)
+        fill_time = time.perf_counter() - start
+        
+        load_time, (prices, _) = timed(lambda: store.load(SYMBOLS, period="10y", end=END_DATE))
+    
+    print(f"   Initial fill: {fill_time * 1000:.1f} ms")
+    print(f"   Local load:   {load_time * 1000:.1f} ms for {prices.shape[0]} x {prices.shape[1]}")
+    return True
+
+
+def bench_batch_metrics():
+    """Batch risk engine vs looping calculate_portfolio_metrics"""
+    print("⏱️ Benchmarking batch portfolio metrics...")
+    
+    from engine import calculate_portfolio_metrics, calculate_returns
+    from risk_engine import batch_portfolio_metrics
+    
+    prices = synthetic_prices(50, 5)
+    returns = calculate_returns(prices)
+    weights = random_weights(500, 50)
+    
+    loop_time, looped = timed(
+        lambda: [calculate_portfolio_metrics(prices, w) for w in weights], repeat=1
+    )
+    batch_time, batch = timed(lambda: batch_portfolio_metrics(returns, weights))
+    
+    for key in ['annual_return', 'annual_volatility', 'var_95', 'max_drawdown']:
+        expected = np.array([m[key] for m in looped])
+        if not np.allclose(batch[key], expected):
+            print(f"❌ Batch {key} differs from calculate_portfolio_metrics")
+            return False
+    
+    print(f"   Loop:  {loop_time * 1000:.1f} ms for {len(weights)} portfolios")
+    print(f"   Batch: {batch_time * 1000:.1f} ms ({loop_time / batch_time:.0f}x faster)")
+    return True
+
+
+def bench_downloader():
+    """Throughput of the chunked downloader against a stub with 50 ms latency"""
+    print("⏱️ Benchmarking chunked downloader...")
+    
+    from downloader import ChunkedDownloader, RateLimiter
+    from price_store import SyntheticFetcher
+    
+    symbols = [f"SYM{i:03d}" for i in range(200)]
+    start = date(2024, 1, 1)
+    
+    for chunk_size, workers in [(5, 1), (20, 1), (20, 8)]:
+        downloader = ChunkedDownloader(
+            SyntheticFetcher(latency=0.05), chunk_size=chunk_size, max_workers=workers,
+            limiter=RateLimiter(rate=1000, burst=100)
+        )
+        report = downloader.download(symbols, start, END_DATE)
+        if report.failures:
+            print(f"❌ {len(report.failures)} symbols failed")
+            return False
+        print(f"   chunk={chunk_size:<3} workers={workers}: {report.elapsed:.2f}s "
+              f"({len(symbols) / report.elapsed:.0f} symbols/s)")
+    return True
+
+
+def bench_monte_carlo_var():
+    """1M-path Monte Carlo VaR over 50 assets within a 64 MB scenario budget"""
+    print("⏱️ Benchmarking Monte Carlo VaR...")
+    
+    from engine import calculate_returns
+    from var_engine import monte_carlo_var
+    
+    returns = calculate_returns(synthetic_prices(50, 5)).to_numpy()
+    weights = random_weights(1, 50)[0]
+    
+    within_budget = True
+    for processes in (None, 4):
+        tracemalloc.start()
+        start = time.perf_counter()
+        results = monte_carlo_var(returns, weights, n_paths=1_000_000, memory_budget_mb=64,
+                                  processes=processes)
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        within_budget &= peak <= 64 * 2 ** 20
+        
+        print(f"   processes={processes}: {elapsed:.2f}s, peak {peak / 2 ** 20:.0f} MB, "
+              f"VaR(99%) {results[0.99][0]:.2%}")
+    return within_budget
+
+
+def bench_optimizer():
+    """50-point efficient frontier for 50 symbols"""
+    print("⏱️ Benchmarking efficient frontier...")
+    
+    from optimizer import PortfolioOptimizer
+    
+    returns = synthetic_prices(50, 5).pct_change().dropna()
+    
+    setup_time, optimizer = timed(lambda: PortfolioOptimizer(returns))
+    frontier_time, frontier = timed(lambda: optimizer.efficient_frontier(50), repeat=3)
+    sharpe_time, _ = timed(optimizer.max_sharpe)
+    
+    print(f"   Covariance setup: {setup_time * 1000:.1f} ms")
+    print(f"   Frontier ({len(frontier)} points): {frontier_time * 1000:.1f} ms")
+    print(f"   Max Sharpe: {sharpe_time * 1000:.1f} ms")
+    return frontier_time < 1.0
+
+
+def bench_rolling_stats():
+    """Rolling 20/60/252-day metrics at 10y x 50 symbols vs naive pandas"""
+    print("⏱️ Benchmarking rolling analytics...")
+    
+    from rolling import rolling_stats
+    
+    returns = synthetic_prices(50, 10).pct_change().dropna()
+    market = returns.mean(axis=1)
+    windows = (20, 60, 252)
+    
+    def pandas_builtin():
+        for window in windows:
+            rolled = returns.rolling(window)
+            rolled.std()
+            rolled.cov(market)
+            rolled.corr(market)
+    
+    def pandas_apply(columns):
+        for window in windows:
+            for symbol in columns:
+                rolled = returns[symbol].rolling(window)
+                rolled.apply(lambda x: x.std() * np.sqrt(252), raw=True)
+                rolled.apply(lambda x: np.cov(x, market.loc[x.index])[0, 1] / market.loc[x.index].var())
+    
+    engine_time, _ = timed(lambda: rolling_stats(returns, market, windows))
+    builtin_time, _ = timed(pandas_builtin, repeat=1)
+    sample = list(returns.columns[:2])
+    apply_time, _ = timed(lambda: pandas_apply(sample), repeat=1)
+    apply_time *= len(returns.columns) / len(sample)
+    
+    print(f"   Cumulative-sum engine:    {engine_time * 1000:.1f} ms")
+    print(f"   pandas rolling built-ins: {builtin_time * 1000:.1f} ms")
+    print(f"   pandas .rolling().apply:  {apply_time:.1f} s (extrapolated from {len(sample)} symbols)")
+    return True
+
+
+def bench_covariance():
+    """Sample vs sector factor covariance for a 500-symbol universe"""
+    print("⏱️ Benchmarking covariance estimators...")
+    
+    from config import SECTOR_MAPPING
+    from covariance import FactorCovariance, ledoit_wolf_covariance, sample_covariance
+    
+    returns = synthetic_prices(500, 5).pct_change().dropna()
+    sectors = sorted(set(SECTOR_MAPPING.values()))
+    mapping = {symbol: sectors[i % len(sectors)] for i, symbol in enumerate(returns.columns)}
+    weights = random_weights(1, 500)[0]
+    
+    sample_time, sample = timed(lambda: sample_covariance(returns))
+    shrink_time, _ = timed(lambda: ledoit_wolf_covariance(returns))
+    factor_time, model = timed(lambda: FactorCovariance(returns, mapping))
+    variance_time, _ = timed(lambda: model.portfolio_variance(weights))
+    
+    print(f"   Sample:      {sample_time * 1000:.1f} ms, {sample.nbytes / 2 ** 20:.1f} MB")
+    print(f"   Ledoit-Wolf: {shrink_time * 1000:.1f} ms")
+    print(f"   Factor:      {factor_time * 1000:.1f} ms, {model.nbytes() / 2 ** 20:.2f} MB "
+          f"({len(model.sectors)} factors)")
+    print(f"   Factor portfolio variance: {variance_time * 1e6:.0f} µs")
+    return True
+
+
+def bench_stock_metrics():
+    """Vectorized per-stock metrics vs the per-symbol loop at 500 symbols"""
+    print("⏱️ Benchmarking per-stock metrics...")
+    
+    from engine import calculate_returns, calculate_stock_metrics
+    
+    prices = synthetic_prices(500, 5)
+    market = calculate_returns(prices).mean(axis=1)
+    
+    def loop():
+        # The per-symbol loop main() used to run, with the same metrics added
+        rows = []
+        returns_data = calculate_returns(prices)
+        for symbol in prices.columns:
+            stock_returns = returns_data[symbol]
+            annual_ret = stock_returns.mean() * 252
+            annual_vol = stock_returns.std() * np.sqrt(252)
+            downside = np.sqrt((stock_returns.clip(upper=0) ** 2).mean()) * np.sqrt(252)
+            cumulative = (1 + stock_returns).cumprod()
+            rows.append({
+                'Stock': symbol,
+                'Annual Return': f"{annual_ret:.2%}",
+                'Volatility': f"{annual_vol:.2%}",
+                'Sharpe Ratio': f"{(annual_ret - 0.07) / annual_vol:.3f}",
+                'Sortino Ratio': f"{(annual_ret - 0.07) / downside:.3f}",
+                'Beta': f"{stock_returns.cov(market) / market.var():.2f}",
+                'Max Drawdown': f"{(cumulative / cumulative.cummax() - 1).min():.2%}",
+                'Skew': f"{stock_returns.skew():.2f}",
+                'Kurtosis': f"{stock_returns.kurt():.2f}",
+                'Current Price': f"₹{prices[symbol].iloc[-1]:.2f}",
+            })
+        return pd.DataFrame(rows)
+    
+    loop_time, _ = timed(loop, repeat=1)
+    vector_time, _ = timed(lambda: calculate_stock_metrics(prices, market))
+    
+    print(f"   Loop:       {loop_time * 1000:.1f} ms")
+    print(f"   Vectorized: {vector_time * 1000:.1f} ms ({loop_time / vector_time:.0f}x faster)")
+    return loop_time / vector_time >= 10
+
+
+def bench_backtest_sweep():
+    """Rebalance frequency x cost x portfolio sweep, serial vs process pool"""
+    print("⏱️ Benchmarking backtest sweep...")
+    
+    from backtest import FREQUENCIES, POOL_MIN_WORK, pool_size, sweep
+    
+    prices = synthetic_prices(100, 10)
+    symbols = list(prices.columns)
+    portfolios = {
+        f"P{i}": {'symbols': symbols, 'weights': list(w)}
+        for i, w in enumerate(random_weights(200, len(symbols)))
+    }
+    costs = (0, 10, 25, 50)
+    n_backtests = len(portfolios) * len(FREQUENCIES) * len(costs)
+    
+    work = (len(prices) - 1) * len(symbols) * len(portfolios) * len(FREQUENCIES)
+    
+    serial_time, table = timed(lambda: sweep(prices, portfolios, costs_bps=costs), repeat=1)
+    pool_time, _ = timed(lambda: sweep(prices, portfolios, costs_bps=costs, processes=4, min_pool_work=0),
+                         repeat=1)
+    auto_time, _ = timed(lambda: sweep(prices, portfolios, costs_bps=costs, processes=4), repeat=1)
+    
+    print(f"   {n_backtests} backtests over {len(prices)} days x {len(symbols)} symbols ({work:.1e} cells)")
+    print(f"   Serial:                {serial_time * 1000:.1f} ms ({serial_time / work * 1e9:.1f} ns/cell)")
+    print(f"   Process pool (forced): {pool_time * 1000:.1f} ms on {os.cpu_count()} CPU(s)")
+    mode = f"{pool_size(4, work)} processes" if pool_size(4, work) else "serial"
+    print(f"   processes=4:           {auto_time * 1000:.1f} ms ({mode}; pool above {POOL_MIN_WORK:.0e} cells)")
+    return len(table) == n_backtests and auto_time < serial_time * 1.5
+
+
+def bench_live_refresh():
+    """One new bar through LivePortfolio vs recomputing metrics on the full history"""
+    print("⏱️ Benchmarking live refresh...")
+    
+    from engine import calculate_portfolio_metrics
+    from refresh import LivePortfolio
+    
+    prices = synthetic_prices(50, 5)
+    weights = random_weights(1, 50)[0]
+    history, latest = prices.iloc[:-1], prices
+    
+    full_time, _ = timed(lambda: calculate_portfolio_metrics(latest, weights))
+    
+    # A poll returns the last applied session plus anything newer
+    poll = latest.iloc[-2:]
+    revised = poll * np.r_[1.0, 1.002][:, None]
+    
+    def incremental(bars):
+        live = LivePortfolio(history if bars is poll else latest, weights)
+        start = time.perf_counter()
+        live.apply(bars)
+        live.metrics()
+        return time.perf_counter() - start
+    
+    incremental_time = min(incremental(poll) for _ in range(5))
+    revised_time = min(incremental(revised) for _ in range(5))
+    live = LivePortfolio(latest, weights)
+    idle_time, added = timed(lambda: live.apply(poll))
+    
+    print(f"   Full recompute: {full_time * 1000:.2f} ms")
+    print(f"   One new bar:    {incremental_time * 1000:.2f} ms ({full_time / incremental_time:.1f}x faster)")
+    print(f"   Revised bar:    {revised_time * 1000:.2f} ms ({full_time / revised_time:.1f}x faster)")
+    print(f"   No new bars:    {idle_time * 1000:.2f} ms")
+    return added == [] and incremental_time < full_time and revised_time < full_time
+
+
+def bench_universe_screen():
+    """Screen 1,000 symbols x 5y from the local price store (target: a few seconds)"""
+    print("⏱️ Benchmarking universe screen...")
+    
+    from price_store import PriceStore, SyntheticFetcher
+    from screener import screen
+    
+    universe = [f"U{i:04d}" for i in range(1000)]
+    
+    with tempfile.TemporaryDirectory() as root:
+        store = PriceStore(root, fetcher=SyntheticFetcher())
+        store.load(universe, period="5y", end=END_DATE)
+        
+        def run():
+            prices, _ = store.load(universe, period="5y", end=END_DATE)
+            return prices, screen(prices)
+        
+        total_time, (prices, index) = timed(run, repeat=3)
+    
+    query_time, top = timed(lambda: index.query('Sharpe Ratio', top=20, filters={'Volatility': (None, 0.3)}))
+    
+    print(f"   {prices.shape[1]} symbols x {prices.shape[0]} days")
+    print(f"   Load + screen: {total_time * 1000:.1f} ms (screen {index.elapsed * 1000:.1f} ms)")
+    print(f"   Top-20 query:  {query_time * 1000:.2f} ms")
+    return len(index) == len(universe) and total_time < 5
+
+
+def bench_sector_aggregation():
+    """Aggregate 1,000 symbols x 5y into sectors, sparse matmul vs pandas groupby"""
+    print("⏱️ Benchmarking sector aggregation...")
+    
+    from sectors import SectorAnalytics
+    
+    returns = synthetic_prices(1000, 5).pct_change().dropna()
+    weights = random_weights(1, 1000)[0]
+    mapping = {symbol: f"Sector {i % 20}" for i, symbol in enumerate(returns.columns)}
+    
+    def grouped():
+        weighted = returns * weights
+        sector_of = returns.columns.map(mapping)
+        totals = pd.Series(weights, index=returns.columns).groupby(sector_of).sum()
+        return weighted.T.groupby(sector_of).sum().T / totals
+    
+    groupby_time, expected = timed(grouped)
+    sparse_time, analytics = timed(lambda: SectorAnalytics(returns, weights, mapping))
+    
+    print(f"   Pandas groupby: {groupby_time * 1000:.1f} ms")
+    print(f"   Sparse matmul:  {sparse_time * 1000:.1f} ms ({groupby_time / sparse_time:.1f}x faster)")
+    return np.allclose(analytics.returns[expected.columns].to_numpy(), expected.to_numpy())
+
+
+def bench_stress_test():
+    """500 scenarios x 500 portfolios over 1,000 symbols (target: under a second)"""
+    print("⏱️ Benchmarking stress test...")
+    
+    from stress import HISTORICAL_SCENARIOS, ScenarioSet, estimate_betas, stress_test
+    
+    prices = synthetic_prices(1000, 20)
+    symbols = list(prices.columns)
+    mapping = {symbol: f"Sector {i % 20}" for i, symbol in enumerate(symbols)}
+    portfolios = {
+        f"P{i}": {'symbols': symbols, 'weights': list(w)}
+        for i, w in enumerate(random_weights(500, len(symbols)))
+    }
+    returns = prices.iloc[-505:].pct_change().iloc[1:]
+    
+    def build():
+        scenarios = ScenarioSet(symbols, estimate_betas(returns), mapping)
+        scenarios.add_defaults(prices, sector_shocks=np.linspace(-0.3, -0.02, 15))
+        for move in np.linspace(-0.4, -0.01, 500 - len(scenarios)):
+            scenarios.add_index_shock(f"Market {move:+.1%}", move)
+        return scenarios
+    
+    build_time, scenarios = timed(build, repeat=3)
+    apply_time, report = timed(lambda: stress_test(scenarios, portfolios))
+    total_time = build_time + apply_time
+    
+    n_scenarios, n_portfolios = report.returns.shape
+    print(f"   {n_scenarios} scenarios ({len(HISTORICAL_SCENARIOS)} historical) x {n_portfolios} portfolios")
+    print(f"   Build scenarios: {build_time * 1000:.1f} ms")
+    print(f"   Evaluate:        {apply_time * 1000:.1f} ms")
+    return n_scenarios == 500 and total_time < 1.0
+
+
+def bench_chart_payloads():
+    """Plotly payload size and render time, full data vs prepared (decimated / clustered WebGL)"""
+    print("⏱️ Benchmarking chart payloads...")
+    
+    import plotly.express as px
+    import plotly.graph_objects as go
+    from charts import FigureCache, correlation_heatmap, line_chart, payload_stats
+    
+    prices = synthetic_prices(200, 20)
+    returns = prices.pct_change().iloc[1:]
+    growth = (1 + returns).cumprod()
+    lines = {
+        'Performance (2 lines)': growth.iloc[:, :2],
+        'Rolling (50 lines)': growth.iloc[:, :50],
+    }
+    correlation = returns.corr()
+    
+    def raw_lines(frame):
+        fig = go.Figure()
+        for column in frame.columns:
+            fig.add_trace(go.Scatter(x=frame.index, y=frame[column], mode='lines', name=column))
+        return fig.update_layout(template='plotly_white')
+    
+    charts = {name: (lambda f=frame: raw_lines(f), lambda f=frame: line_chart(f)) for name, frame in lines.items()}
+    charts['Heatmap (200 symbols)'] = (
+        lambda: px.imshow(correlation, text_auto=True, color_continuous_scale="RdBu_r"),
+        lambda: correlation_heatmap(correlation),
+    )
+    
+    smaller = True
+    for name, (raw, prepared) in charts.items():
+        before_time, before = timed(lambda: payload_stats(raw()), repeat=2)
+        after_time, after = timed(lambda: payload_stats(prepared()), repeat=2)
+        smaller &= after['bytes'] < before['bytes'] / 2
+        print(f"   {name}")
+        print(f"      Full:     {before['points']:>8,} points {before['bytes'] / 1024:>9.0f} KB {before_time * 1000:>8.1f} ms")
+        print(f"      Prepared: {after['points']:>8,} points {after['bytes'] / 1024:>9.0f} KB {after_time * 1000:>8.1f} ms")
+    
+    cache = FigureCache()
+    frame = lines['Performance (2 lines)']
+    cache.get('performance', frame, lambda: line_chart(frame))
+    cached_time, _ = timed(lambda: cache.get('performance', frame, lambda: line_chart(frame)))
+    print(f"   Cached rerun (fingerprint + lookup): {cached_time * 1000:.2f} ms")
+    return smaller and cache.hits > 0
+
+
+def bench_correlation_structure():
+    """Seriation, threshold graph and minimum spanning tree for a 1,000-symbol universe"""
+    print("⏱️ Benchmarking correlation structure...")
+    
+    from correlation_structure import CorrelationStructure
+    
+    returns = synthetic_prices(1000, 2).pct_change().iloc[1:]
+    correlation = returns.corr()
+    
+    for n in (100, 500, 1000):
+        corr = correlation.iloc[:n, :n]
+        elapsed, structure = timed(lambda: CorrelationStructure(corr), repeat=1)
+        summary = structure.summary()
+        print(f"   {n:>5} symbols: {elapsed * 1000:>8.1f} ms "
+              f"({summary['edges']} pairs above {summary['threshold']:.2f}, {len(structure.mst[0])} tree edges)")
+    return elapsed < 5.0
+
+
+def run_all_benchmarks():
+    """Run all benchmarks"""
+    print("🚀 NSE Portfolio Analytics - Benchmarks")
+    print("=" * 50)
+    
+    benchmarks = [
+        bench_price_store,
+        bench_batch_metrics,
+        bench_downloader,
+        bench_monte_carlo_var,
+        bench_optimizer,
+        bench_rolling_stats,
+        bench_covariance,
+        bench_stock_metrics,
+        bench_backtest_sweep,
+        bench_live_refresh,
+        bench_universe_screen,
+        bench_sector_aggregation,
+        bench_stress_test,
+        bench_chart_payloads,
+        bench_correlation_structure
+    ]
+    
+    failed = 0
+    for bench in benchmarks:
+        try:
+            if not bench():
+                failed += 1
+        except Exception as e:
+            print(f"❌ Benchmark {bench.__name__} crashed: {e}")
+            failed += 1
+        print()
+    
+    print("=" * 50)
+    return failed == 0
+
+
+# Scaling suite
+def chart_data(prices, portfolio_returns, correlation):
+    """The series the dashboard plots, as JSON-ready lists"""
+    normalized = (prices / prices.iloc[0] - 1) * 100
+    growth = (1 + portfolio_returns).cumprod()
+    drawdown = growth / growth.cummax() - 1
+    counts, edges = np.histogram(portfolio_returns, bins=50)
+    return {
+        'dates': normalized.index.strftime('%Y-%m-%d').tolist(),
+        'prices': {symbol: normalized[symbol].round(4).tolist() for symbol in normalized.columns},
+        'portfolio': ((growth - 1) * 100).round(4).tolist(),
+        'drawdown': (drawdown * 100).round(4).tolist(),
+        'histogram': {'counts': counts.tolist(), 'edges': edges.tolist()},
+        'correlation': correlation.round(3).to_numpy().tolist(),
+    }
+
+
+def measure(func, repeat):
+    """Best wall time of ``repeat`` calls plus peak traced memory of one more call"""
+    seconds, result = timed(func, repeat)
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return seconds, peak, result
+
+
+def run_suite_stages(symbol_counts=SUITE_SYMBOLS, year_counts=SUITE_YEARS):
+    """Time every stage on every universe; returns a list of result records"""
+    from covariance import estimate_covariance, to_correlation
+    from engine import calculate_portfolio_metrics, calculate_returns
+    from price_store import PriceStore, SyntheticFetcher
+    from var_engine import var_report
+    
+    results = []
+    with tempfile.TemporaryDirectory() as root:
+        store = PriceStore(root, fetcher=SyntheticFetcher())
+        
+        for n_symbols in symbol_counts:
+            universe = [f"B{i:04d}" for i in range(n_symbols)]
+            weights = random_weights(1, n_symbols)[0]
+            # Fill the store once per universe; loading below is purely local
+            store.load(universe, period=f"{max(year_counts)}y", end=END_DATE)
+            
+            for years in year_counts:
+                data = {}
+                stages = [
+                    ('load', lambda: store.load(universe, period=f"{years}y", end=END_DATE)[0]),
+                    ('returns', lambda: calculate_returns(data['load'])),
+                    ('portfolio_metrics', lambda: calculate_portfolio_metrics(data['load'], weights)),
+                    ('correlation', lambda: to_correlation(estimate_covariance(data['returns']))),
+                    ('var', lambda: var_report(data['returns'], weights, n_paths=10_000)),
+                    ('chart_data', lambda: chart_data(data['load'], data['portfolio_metrics']['portfolio_returns'],
+                                                      data['correlation'])),
+                ]
+                
+                for stage, func in stages:
+                    size = n_symbols * years * 252
+                    seconds, peak, data[stage] = measure(func, repeat=3 if size <= 1_000_000 else 1)
+                    days = len(data['load'])
+                    results.append({
+                        'stage': stage,
+                        'symbols': n_symbols,
+                        'years': years,
+                        'days': days,
+                        'seconds': seconds,
+                        'throughput': n_symbols * days / seconds if seconds > 0 else float('inf'),
+                        'peak_mb': peak / 2 ** 20,
+                    })
+                    print(f"   {stage:<18} {n_symbols:>5} x {years:>2}y  {seconds * 1000:>9.1f} ms  "
+                          f"{results[-1]['throughput'] / 1e6:>8.1f} M symbol-days/s  {results[-1]['peak_mb']:>8.1f} MB")
+    return results
+
+
+def load_history(path):
+    if not os.path.exists(path):
+        return {'runs': []}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_history(path, history):
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(history, f, indent=1)
+    os.replace(tmp, path)
+
+
+def baselines(history, machine, runs=BASELINE_RUNS):
+    """Median seconds and peak memory per (stage, symbols, years) over the last ``runs`` runs"""
+    samples = {}
+    for run in [r for r in history['runs'] if r['machine'] == machine][-runs:]:
+        for record in run['results']:
+            key = (record['stage'], record['symbols'], record['years'])
+            samples.setdefault(key, []).append((record['seconds'], record['peak_mb']))
+    return {
+        key: (float(np.median([s for s, _ in values])), float(np.median([m for _, m in values])))
+        for key, values in samples.items()
+    }
+
+
+def check_regressions(results, baseline, time_tolerance=TIME_TOLERANCE, memory_tolerance=MEMORY_TOLERANCE):
+    """Messages for every stage slower or larger than its baseline allows.
+
+    Small absolute slack (2 ms, 1 MB) keeps tiny stages from flapping on noise.
+    """
+    regressions = []
+    for record in results:
+        key = (record['stage'], record['symbols'], record['years'])
+        if key not in baseline:
+            continue
+        seconds, peak_mb = baseline[key]
+        label = f"{record['stage']} {record['symbols']} x {record['years']}y"
+        if record['seconds'] > seconds * (1 + time_tolerance) + 0.002:
+            regressions.append(f"{label}: {record['seconds'] * 1000:.1f} ms vs baseline {seconds * 1000:.1f} ms")
+        if record['peak_mb'] > peak_mb * (1 + memory_tolerance) + 1:
+            regressions.append(f"{label}: {record['peak_mb']:.1f} MB vs baseline {peak_mb:.1f} MB")
+    return regressions
+
+
+def run_suite(quick=False, history_path=HISTORY_FILE, time_tolerance=TIME_TOLERANCE,
+              memory_tolerance=MEMORY_TOLERANCE, save=True):
+    """Run the scaling suite, compare with the history and append this run"""
+    print("🚀 NSE Portfolio Analytics - Scaling Suite")
+    print("=" * 50)
+    
+    symbol_counts, year_counts = (QUICK_SYMBOLS, QUICK_YEARS) if quick else (SUITE_SYMBOLS, SUITE_YEARS)
+    results = run_suite_stages(symbol_counts, year_counts)
+    
+    machine = f"{platform.node()} {platform.machine()} {os.cpu_count()} CPU"
+    history = load_history(history_path)
+    regressions = check_regressions(results, baselines(history, machine), time_tolerance, memory_tolerance)
+    
+    print("=" * 50)
+    if regressions:
+        print(f"❌ {len(regressions)} regression(s):")
+        for message in regressions:
+            print(f"   {message}")
+    else:
+        print("✅ No regressions against the last runs on this machine")
+    
+    if save:
+        history['runs'].append({
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'machine': machine,
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'pandas': pd.__version__,
+            'quick': quick,
+            'results': results,
+        })
+        save_history(history_path, history)
+        print(f"📝 Results appended to {history_path}")
+    return not regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline benchmarks for NSE Portfolio Analytics")
+    parser.add_argument("--suite", action="store_true", help="run the scaling suite instead of the benchmarks")
+    parser.add_argument("--quick", action="store_true", help="suite on small universes only")
+    parser.add_argument("--history", default=HISTORY_FILE, help="JSON history file")
+    parser.add_argument("--tolerance", type=float, default=TIME_TOLERANCE,
+                        help="allowed slowdown vs baseline (0.5 = 50%%)")
+    parser.add_argument("--memory-tolerance", type=float, default=MEMORY_TOLERANCE,
+                        help="allowed peak memory growth vs baseline")
+    parser.add_argument("--no-save", action="store_true", help="do not append this run to the history")
+    args = parser.parse_args()
+    
+    if args.suite:
+        success = run_suite(args.quick, args.history, args.tolerance, args.memory_tolerance, not args.no_save)
+    else:
+        success = run_all_benchmarks()
+    sys.exit(0 if success else 1)
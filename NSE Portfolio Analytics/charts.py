@@ -0,0 +1,228 @@
+"""
+Render preparation for the Plotly views in NSE Portfolio Analytics
+
+Long daily histories are decimated to the chart's pixel budget before they
+reach the browser: LTTB (largest-triangle-three-buckets) for a few lines,
+where the shape matters, and min-max per bucket for many overlaid lines,
+where the extremes do. Correlation heatmaps with more than HEATMAP_LIMIT
+symbols are reordered by hierarchical clustering, drawn without cell text
+and rendered with WebGL.
+
+Prepared figures are cached by a fingerprint of the data they were built
+from, so a Streamlit rerun with unchanged data reuses the figure instead
+of decimating and rebuilding it. ``payload_stats`` reports the point
+count, JSON size and serialization time of a figure for comparisons.
+"""
+
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+
+from correlation_structure import condensed_distances, seriation
+
+# About two points per horizontal pixel of a full-width chart
+MAX_POINTS = 1500
+HEATMAP_LIMIT = 25
+METHODS = ["lttb", "minmax"]
+
+
+# Decimation
+def lttb_indices(y, n_out, x=None):
+    """Indices of the ``n_out`` points LTTB keeps from ``y`` (first and last always kept).
+
+    ``x`` defaults to the positions 0..n-1, i.e. evenly spaced sessions.
+    """
+    y = np.asarray(y, dtype=np.float64)
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    x = np.arange(n, dtype=np.float64) if x is None else np.asarray(x, dtype=np.float64)
+
+    # n_out - 2 buckets between the fixed first and last points
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    sizes = np.diff(edges)
+    next_x = np.r_[np.add.reduceat(x[1:n - 1], edges[:-1] - 1)[1:] / sizes[1:], x[-1]]
+    next_y = np.r_[np.add.reduceat(y[1:n - 1], edges[:-1] - 1)[1:] / sizes[1:], y[-1]]
+
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        # Twice the area of the triangle (previous pick, candidate, next bucket's mean)
+        area = np.abs((x[a] - next_x[i]) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (next_y[i] - y[a]))
+        a = lo + int(np.argmax(area))
+        selected[i + 1] = a
+    return selected
+
+
+def minmax_indices(y, n_out):
+    """Indices of each bucket's minimum and maximum, about ``n_out`` points in all"""
+    y = np.asarray(y, dtype=np.float64)
+    n = len(y)
+    if n_out >= n or n_out < 4:
+        return np.arange(n)
+
+    size = -(-n // ((n_out - 2) // 2))
+    buckets = -(-n // size)
+    pad = buckets * size - n
+    low = np.r_[y, np.full(pad, np.inf)].reshape(buckets, size)
+    high = np.r_[y, np.full(pad, -np.inf)].reshape(buckets, size)
+    offsets = np.arange(buckets) * size
+    return np.unique(np.r_[0, low.argmin(axis=1) + offsets, high.argmax(axis=1) + offsets, n - 1])
+
+
+def decimate(series, max_points=MAX_POINTS, method="lttb"):
+    """``series`` without NaNs, cut down to at most about ``max_points`` points"""
+    series = series.dropna()
+    if len(series) <= max_points:
+        return series
+    if method == "lttb":
+        return series.iloc[lttb_indices(series.to_numpy(), max_points)]
+    if method == "minmax":
+        return series.iloc[minmax_indices(series.to_numpy(), max_points)]
+    raise ValueError(f"Unknown decimation method: {method}")
+
+
+def decimate_frame(frame, max_points=MAX_POINTS, method=None):
+    """Each column decimated on its own, as ``{column: Series}``.
+
+    ``method`` defaults to LTTB for up to three columns and min-max above.
+    """
+    method = method or ("lttb" if frame.shape[1] <= 3 else "minmax")
+    return {column: decimate(frame[column], max_points, method) for column in frame.columns}
+
+
+# Figures
+def line_chart(lines, title=None, xaxis_title="Date", yaxis_title=None, height=400, styles=None,
+               max_points=MAX_POINTS, method=None, **layout):
+    """Line chart of ``{name: Series}`` (or a DataFrame), each line decimated to the budget.
+
+    ``styles`` maps a name to a ``line`` dict for that trace.
+    """
+    frame = lines if isinstance(lines, pd.DataFrame) else pd.DataFrame(lines)
+    styles = styles or {}
+
+    fig = go.Figure()
+    for name, series in decimate_frame(frame, max_points, method).items():
+        fig.add_trace(go.Scatter(
+            x=series.index,
+            y=series.to_numpy(),
+            mode='lines',
+            name=name,
+            line=styles.get(name)
+        ))
+    fig.update_layout(
+        title=title,
+        xaxis_title=xaxis_title,
+        yaxis_title=yaxis_title,
+        template='plotly_white',
+        height=height,
+        **layout
+    )
+    return fig
+
+
+def cluster_order(corr):
+    """Symbol order that puts correlated symbols next to each other"""
+    return seriation(condensed_distances(corr), len(corr))[1]
+
+
+def correlation_heatmap(corr, title=None, height=400, text_auto='.2f', limit=HEATMAP_LIMIT, order=None):
+    """Annotated heatmap for up to ``limit`` symbols, clustered WebGL heatmap above.
+
+    ``order`` is a precomputed seriation (e.g. ``CorrelationStructure.order``).
+    """
+    if len(corr) <= limit:
+        fig = px.imshow(
+            corr,
+            text_auto=text_auto,
+            aspect="auto",
+            color_continuous_scale="RdBu_r",
+            color_continuous_midpoint=0,
+            title=title
+        )
+    else:
+        order = cluster_order(corr) if order is None else order
+        ordered = corr.iloc[order, order]
+        fig = go.Figure(go.Heatmapgl(
+            z=np.round(ordered.to_numpy(dtype=np.float64), 3),
+            x=list(ordered.columns),
+            y=list(ordered.index),
+            colorscale="RdBu_r",
+            zmid=0,
+            zmin=-1,
+            zmax=1
+        ))
+        fig.update_layout(
+            title=f"{title} (clustered)" if title else None,
+            yaxis=dict(autorange='reversed'),
+            template='plotly_white'
+        )
+    fig.update_layout(height=height)
+    return fig
+
+
+def payload_stats(fig):
+    """Data points, JSON bytes and serialization time of a figure, as sent to the browser"""
+    points = 0
+    for trace in fig.data:
+        z = getattr(trace, 'z', None)
+        values = z if z is not None else (trace.x if trace.x is not None else trace.y)
+        points += int(np.size(values)) if values is not None else 0
+
+    start = time.perf_counter()
+    payload = fig.to_json()
+    return {'points': points, 'bytes': len(payload), 'serialize_time': time.perf_counter() - start}
+
+
+# Cache
+def fingerprint(data):
+    """Hashable summary of the data a figure is built from"""
+    if isinstance(data, dict):
+        return tuple((key, fingerprint(value)) for key, value in data.items())
+    if isinstance(data, (list, tuple)):
+        return tuple(fingerprint(value) for value in data)
+    if isinstance(data, pd.DataFrame):
+        return (data.shape, tuple(data.columns), int(pd.util.hash_pandas_object(data).sum()))
+    if isinstance(data, pd.Series):
+        return (data.shape, data.name, int(pd.util.hash_pandas_object(data).sum()))
+    return data
+
+
+class FigureCache:
+    """Prepared figures keyed by (name, fingerprint of their data)"""
+
+    def __init__(self, max_entries=64):
+        self.max_entries = max_entries
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, name, data, build):
+        """Cached figure for ``name``; ``build()`` makes it when ``data`` has changed"""
+        key = (name, fingerprint(data))
+        with self._lock:
+            if key in self._entries:
+                self.hits += 1
+                return self._entries[key]
+        self.misses += 1
+
+        fig = build()
+        with self._lock:
+            if key not in self._entries and len(self._entries) >= self.max_entries:
+                self._entries.pop(next(iter(self._entries)))
+            self._entries[key] = fig
+        return fig
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+figure_cache = FigureCache()
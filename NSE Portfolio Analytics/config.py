@@ -83,6 +83,17 @@ SECTOR_MAPPING = {
     "TRENT": "Retail"
 }
 
+# Benchmark indices (Yahoo Finance tickers), stored alongside stock prices
+BENCHMARK_INDICES = {
+    "NIFTY 50": "^NSEI",
+    "NIFTY BANK": "^NSEBANK",
+    "NIFTY IT": "^CNXIT",
+    "NIFTY PHARMA": "^CNXPHARMA",
+    "NIFTY AUTO": "^CNXAUTO",
+    "NIFTY FMCG": "^CNXFMCG",
+    "NIFTY METAL": "^CNXMETAL",
+}
+
 RISK_CONFIG = {
     'RISK_FREE_RATE': 0.07,
     'VAR_CONFIDENCE_LEVELS': [0.95, 0.99],
@@ -123,6 +134,23 @@ PORTFOLIO_TEMPLATES = {
     }
 }
 
+# Sample portfolios offered in the dashboard sidebar
+SAMPLE_PORTFOLIOS = {
+    "NIFTY Top 10": {
+        "symbols": ["RELIANCE", "TCS", "HDFCBANK", "INFY", "HINDUNILVR", 
+                   "ICICIBANK", "KOTAKBANK", "BHARTIARTL", "SBIN", "LT"],
+        "weights": [0.1] * 10
+    },
+    "Banking Focus": {
+        "symbols": ["HDFCBANK", "ICICIBANK", "KOTAKBANK", "SBIN", "AXISBANK"],
+        "weights": [0.2] * 5
+    },
+    "IT Sector": {
+        "symbols": ["TCS", "INFY", "HCLTECH", "WIPRO", "TECHM"],
+        "weights": [0.2] * 5
+    }
+}
+
 def get_portfolio_template(template_name):
     """Get a predefined portfolio template"""
     return PORTFOLIO_TEMPLATES.get(template_name, None)
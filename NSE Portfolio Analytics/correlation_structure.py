@@ -0,0 +1,212 @@
+"""
+Correlation structure for NSE Portfolio Analytics
+
+Turns a correlation matrix into structure that can be read at a glance:
+
+- a seriated order from average-linkage clustering, so correlated symbols
+  sit next to each other in a heatmap (with optimal leaf ordering up to
+  OPTIMAL_ORDERING_LIMIT symbols);
+- the threshold graph linking every pair with correlation at or above
+  RISK_CONFIG['CORRELATION_THRESHOLD'], and its connected components;
+- the minimum spanning tree, the N - 1 strongest links that connect all
+  symbols;
+- flags for highly correlated pairs among a portfolio's holdings.
+
+Everything works on the condensed upper triangle (N(N-1)/2 values) of the
+Mantegna distance sqrt(2 (1 - rho)), filled row by row from the matrix and
+transformed in place. The minimum spanning tree is Prim's algorithm over
+that array, and graph edges are kept sparse, so nothing beyond the input
+matrix is ever N x N.
+"""
+
+import numpy as np
+import pandas as pd
+from scipy.cluster.hierarchy import fcluster, leaves_list, linkage, optimal_leaf_ordering
+from scipy.linalg import eigh
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
+
+from config import RISK_CONFIG
+
+OPTIMAL_ORDERING_LIMIT = 500
+
+
+# Condensed arrays
+def _row_starts(n):
+    """``starts[i] + j`` is the condensed index of pair (i, j) for i < j"""
+    i = np.arange(n, dtype=np.int64)
+    return n * i - i * (i + 1) // 2 - i - 1
+
+
+def condensed_correlation(corr):
+    """Upper triangle of ``corr`` (row by row, without the diagonal) as a 1-D array"""
+    values = np.asarray(corr, dtype=np.float64)
+    n = len(values)
+    out = np.empty(n * (n - 1) // 2)
+    k = 0
+    for i in range(n - 1):
+        out[k:k + n - i - 1] = values[i, i + 1:]
+        k += n - i - 1
+    return out
+
+
+def correlation_distance(rho):
+    """Mantegna distance sqrt(2 (1 - rho)): 0 for identical, 2 for opposite moves"""
+    return np.sqrt(2 * (1 - rho))
+
+
+def condensed_distances(corr):
+    """Condensed Mantegna distances; missing correlations count as zero"""
+    d = np.nan_to_num(condensed_correlation(corr), copy=False)
+    np.clip(d, -1, 1, out=d)
+    np.subtract(1, d, out=d)
+    np.multiply(2, d, out=d)
+    return np.sqrt(d, out=d)
+
+
+def pair_indices(k, n):
+    """Row and column ``(i, j)``, i < j, of condensed indices ``k``"""
+    k = np.asarray(k, dtype=np.int64)
+    starts = _row_starts(n)
+    i = np.searchsorted(starts + np.arange(n) + 1, k, side='right') - 1
+    return i, k - starts[i]
+
+
+def distance_row(distances, n, i, starts=None):
+    """Distances from symbol ``i`` to every symbol (0 to itself)"""
+    starts = _row_starts(n) if starts is None else starts
+    j = np.arange(n)
+    row = distances[np.where(j < i, starts + i, starts[i] + j).clip(0, len(distances) - 1)]
+    row[i] = 0.0
+    return row
+
+
+# Structure
+def seriation(distances, n, optimal=None):
+    """Average-linkage tree and the leaf order it induces; returns ``(linkage, order)``"""
+    if n < 3:
+        return None, np.arange(n)
+    Z = linkage(distances, method='average')
+    if optimal if optimal is not None else n <= OPTIMAL_ORDERING_LIMIT:
+        Z = optimal_leaf_ordering(Z, distances)
+    return Z, leaves_list(Z)
+
+
+def minimum_spanning_tree(distances, n):
+    """Prim's algorithm on a condensed distance array; returns ``(i, j, distance)`` arrays"""
+    if n < 2:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty(0)
+
+    starts = _row_starts(n)
+    in_tree = np.zeros(n, dtype=bool)
+    in_tree[0] = True
+    best = distance_row(distances, n, 0, starts)
+    best[0] = np.inf
+    parent = np.zeros(n, dtype=np.int64)
+
+    tree_i, tree_j, tree_d = np.empty(n - 1, dtype=np.int64), np.empty(n - 1, dtype=np.int64), np.empty(n - 1)
+    for step in range(n - 1):
+        v = int(np.argmin(best))
+        tree_i[step], tree_j[step], tree_d[step] = parent[v], v, best[v]
+        in_tree[v] = True
+        best[v] = np.inf
+
+        row = distance_row(distances, n, v, starts)
+        closer = ~in_tree & (row < best)
+        best[closer] = row[closer]
+        parent[closer] = v
+    return tree_i, tree_j, tree_d
+
+
+def threshold_edges(distances, n, threshold):
+    """Pairs with correlation >= ``threshold`` as ``(i, j, correlation)`` arrays"""
+    k = np.flatnonzero(distances <= correlation_distance(threshold) + 1e-12)
+    i, j = pair_indices(k, n)
+    return i, j, 1 - distances[k] ** 2 / 2
+
+
+def graph_layout(corr):
+    """2-D positions from the 2nd and 3rd eigenvectors of the correlation matrix.
+
+    The leading eigenvector is the market mode every stock shares; the next
+    two separate groups of stocks that move together.
+    """
+    values = np.nan_to_num(np.asarray(corr, dtype=np.float64))
+    n = len(values)
+    if n < 3:
+        return np.column_stack([np.arange(n, dtype=np.float64), np.zeros(n)])
+    _, vectors = eigh(values, subset_by_index=[n - 3, n - 2])
+    return vectors[:, ::-1] * np.sqrt(n)
+
+
+class CorrelationStructure:
+    """Seriation, threshold graph and minimum spanning tree of one correlation matrix"""
+
+    def __init__(self, corr, threshold=None, optimal_ordering=None):
+        self.symbols = list(corr.columns) if isinstance(corr, pd.DataFrame) else [str(i) for i in range(len(corr))]
+        self.threshold = RISK_CONFIG['CORRELATION_THRESHOLD'] if threshold is None else threshold
+        n = len(self.symbols)
+
+        self.distances = condensed_distances(corr)
+        self.linkage, self.order = seriation(self.distances, n, optimal_ordering)
+        self.edges = threshold_edges(self.distances, n, self.threshold)
+        self.mst = minimum_spanning_tree(self.distances, n)
+
+        i, j, _ = self.edges
+        graph = coo_matrix((np.ones(len(i)), (i, j)), shape=(n, n))
+        self.n_components, self.components = connected_components(graph, directed=False)
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def clusters(self):
+        """Cluster labels cutting the tree at the threshold's distance (1 when tiny)"""
+        if self.linkage is None:
+            return np.ones(len(self), dtype=int)
+        return fcluster(self.linkage, correlation_distance(self.threshold), criterion='distance')
+
+    def ordered(self, corr):
+        """``corr`` with rows and columns in seriated order"""
+        return corr.iloc[self.order, self.order]
+
+    def _pairs(self, i, j, rho):
+        return pd.DataFrame({
+            'Stock A': np.asarray(self.symbols, dtype=object)[i],
+            'Stock B': np.asarray(self.symbols, dtype=object)[j],
+            'Correlation': rho,
+        })
+
+    def pairs(self, weights=None):
+        """Pairs at or above the threshold, strongest first.
+
+        With ``weights`` (aligned with the symbols), only pairs where both
+        are held are kept and their combined weight is added.
+        """
+        i, j, rho = self.edges
+        if weights is not None:
+            weights = np.asarray(weights, dtype=np.float64)
+            held = (weights[i] > 0) & (weights[j] > 0)
+            i, j, rho = i[held], j[held], rho[held]
+        frame = self._pairs(i, j, rho)
+        if weights is not None:
+            frame['Combined Weight'] = weights[i] + weights[j]
+        return frame.sort_values('Correlation', ascending=False).reset_index(drop=True)
+
+    def mst_frame(self):
+        """Minimum spanning tree edges with their correlations"""
+        i, j, d = self.mst
+        return self._pairs(i, j, 1 - d ** 2 / 2)
+
+    def summary(self):
+        """Headline numbers for the threshold graph and the tree"""
+        sizes = np.bincount(self.components)
+        n = len(self)
+        return {
+            'symbols': n,
+            'threshold': self.threshold,
+            'edges': len(self.edges[0]),
+            'density': len(self.edges[0]) / (n * (n - 1) / 2) if n > 1 else 0.0,
+            'linked_groups': int((sizes > 1).sum()),
+            'largest_group': int(sizes.max()) if n else 0,
+            'mst_mean_correlation': float(np.mean(1 - self.mst[2] ** 2 / 2)) if n > 1 else np.nan,
+        }
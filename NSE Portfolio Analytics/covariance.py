@@ -0,0 +1,223 @@
+"""
+Covariance estimators for NSE Portfolio Analytics
+
+Sample, Ledoit-Wolf shrinkage, EWMA and a sector factor model built from
+SECTOR_MAPPING. The factor model keeps K sector factors instead of an
+N x N matrix: fitting costs O(N*K*T) and storage O(N*K), and the dense
+matrix is only built on request.
+
+Estimates are cached by (universe, period, method). Each entry records the
+last date and row count of the returns it was built from, so an entry is
+recomputed as soon as new prices land.
+
+Returns may hold NaN for days a symbol did not trade. The sample estimate
+is pairwise-complete; the other estimators need a full matrix and count a
+missing return as the symbol's mean return.
+"""
+
+import threading
+
+import numpy as np
+import pandas as pd
+
+from config import SECTOR_MAPPING
+
+METHODS = ["sample", "ledoit_wolf", "ewma", "factor"]
+
+
+def _as_array(returns):
+    if isinstance(returns, pd.DataFrame):
+        return returns.to_numpy(dtype=np.float64)
+    return np.asarray(returns, dtype=np.float64)
+
+
+def _filled(returns):
+    """Returns with each missing value replaced by its column mean"""
+    R = _as_array(returns)
+    missing = np.isnan(R)
+    if not missing.any():
+        return R
+    with np.errstate(invalid='ignore'):
+        means = np.nanmean(np.where(missing.all(axis=0), 0.0, R), axis=0)
+    return np.where(missing, means, R)
+
+
+def sample_covariance(returns):
+    """Unbiased sample covariance of daily returns.
+
+    With missing returns each pair uses the days both symbols have, like
+    ``DataFrame.cov``, from three masked matrix products.
+    """
+    R = _as_array(returns)
+    valid = ~np.isnan(R)
+    if valid.all():
+        return np.atleast_2d(np.cov(R, rowvar=False))
+
+    # Centre first so the pairwise sums do not lose precision
+    V = valid.astype(np.float64)
+    with np.errstate(invalid='ignore'):
+        X = np.where(valid, R - np.nanmean(np.where(valid.any(axis=0), R, 0.0), axis=0), 0.0)
+    n = V.T @ V
+    sums = X.T @ V
+    with np.errstate(divide='ignore', invalid='ignore'):
+        covariance = (X.T @ X - sums * sums.T / n) / (n - 1)
+    return np.where(n > 1, covariance, np.nan)
+
+
+def ledoit_wolf_covariance(returns):
+    """Ledoit-Wolf shrinkage towards a scaled identity.
+
+    Returns ``(covariance, shrinkage)``.
+    """
+    R = _filled(returns)
+    T, N = R.shape
+    X = R - R.mean(axis=0)
+
+    S = X.T @ X / T
+    mu = np.trace(S) / N
+    delta = ((S - mu * np.eye(N)) ** 2).sum() / N
+
+    X2 = X ** 2
+    beta = ((X2.T @ X2).sum() / T - (S ** 2).sum()) / (N * T)
+    beta = min(beta, delta)
+    shrinkage = beta / delta if delta > 0 else 0.0
+
+    covariance = shrinkage * mu * np.eye(N) + (1 - shrinkage) * S
+    return covariance * T / (T - 1), shrinkage
+
+
+def ewma_covariance(returns, decay=0.94):
+    """Exponentially weighted (RiskMetrics) covariance, most recent day weighted highest"""
+    R = _filled(returns)
+    T = len(R)
+    weights = decay ** np.arange(T - 1, -1, -1)
+    weights /= weights.sum()
+
+    X = R - weights @ R
+    return (X * weights[:, None]).T @ X
+
+
+class FactorCovariance:
+    """Sector factor model: cov = B' F B + diag(specific).
+
+    Each sector factor is the equal-weighted return of its members; every
+    symbol is regressed on all K factors. ``loadings`` is (K x N),
+    ``factor_cov`` (K x K) and ``specific`` (N,).
+    """
+
+    def __init__(self, returns, sector_mapping=None):
+        mapping = SECTOR_MAPPING if sector_mapping is None else sector_mapping
+        self.symbols = list(returns.columns) if isinstance(returns, pd.DataFrame) else None
+        R = _filled(returns)
+        T, N = R.shape
+        X = R - R.mean(axis=0)
+
+        symbols = self.symbols or [str(i) for i in range(N)]
+        sectors = [mapping.get(symbol, "Other") for symbol in symbols]
+        self.sectors = sorted(set(sectors))
+        column = {sector: k for k, sector in enumerate(self.sectors)}
+
+        # Sparse membership: one sector per symbol, so each factor is a
+        # segment sum over the symbols sorted by sector
+        self.membership = np.array([column[s] for s in sectors])
+        order = np.argsort(self.membership, kind="stable")
+        counts = np.bincount(self.membership, minlength=len(self.sectors))
+        starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+        factors = np.add.reduceat(X[:, order], starts, axis=1) / counts
+
+        gram = factors.T @ factors
+        self.loadings = np.linalg.lstsq(gram, factors.T @ X, rcond=None)[0]
+        residuals = X - factors @ self.loadings
+
+        self.factor_cov = gram / (T - 1)
+        self.specific = (residuals ** 2).sum(axis=0) / (T - 1)
+
+    def matrix(self):
+        """Dense N x N covariance matrix"""
+        return self.loadings.T @ self.factor_cov @ self.loadings + np.diag(self.specific)
+
+    def portfolio_variance(self, weights):
+        """w' cov w in O(N*K) without building the dense matrix"""
+        weights = np.asarray(weights, dtype=np.float64)
+        exposure = self.loadings @ weights
+        return float(exposure @ self.factor_cov @ exposure + (weights ** 2) @ self.specific)
+
+    def nbytes(self):
+        return self.loadings.nbytes + self.factor_cov.nbytes + self.specific.nbytes
+
+
+def estimate_covariance(returns, method="sample", **kwargs):
+    """Covariance matrix of ``returns`` as a labelled DataFrame"""
+    if method == "sample":
+        matrix = sample_covariance(returns)
+    elif method == "ledoit_wolf":
+        matrix, _ = ledoit_wolf_covariance(returns)
+    elif method == "ewma":
+        matrix = ewma_covariance(returns, **kwargs)
+    elif method == "factor":
+        matrix = FactorCovariance(returns, **kwargs).matrix()
+    else:
+        raise ValueError(f"Unknown covariance method: {method}")
+    return pd.DataFrame(matrix, index=returns.columns, columns=returns.columns)
+
+
+def to_correlation(covariance):
+    """Correlation matrix from a covariance DataFrame"""
+    std = np.sqrt(np.diag(covariance))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        corr = covariance.to_numpy() / np.outer(std, std)
+    return pd.DataFrame(corr, index=covariance.index, columns=covariance.columns)
+
+
+def data_stamp(returns):
+    """Identifies the data an estimate was built from: last date, length and a content hash.
+
+    The hash catches bars that were revised in place (a re-fetched partial
+    session, a store repair) without a new date arriving.
+    """
+    if not len(returns):
+        return (None, 0, 0)
+    return (returns.index[-1], len(returns), int(pd.util.hash_pandas_object(returns).sum()))
+
+
+class CovarianceCache:
+    """Covariance estimates keyed by (universe, period, method)"""
+
+    def __init__(self, max_entries=64):
+        self.max_entries = max_entries
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, returns, method="sample", period=None):
+        """Cached ``estimate_covariance``; recomputes when rows have arrived or changed"""
+        key = (tuple(returns.columns), period, method)
+        stamp = data_stamp(returns)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == stamp:
+                self.hits += 1
+                return entry[1]
+        self.misses += 1
+
+        covariance = estimate_covariance(returns, method)
+        with self._lock:
+            if key not in self._entries and len(self._entries) >= self.max_entries:
+                self._entries.pop(next(iter(self._entries)))
+            self._entries[key] = (stamp, covariance)
+        return covariance
+
+    def invalidate(self, symbols=None):
+        """Drop entries whose universe contains any of ``symbols`` (all if None)"""
+        with self._lock:
+            if symbols is None:
+                self._entries.clear()
+                return
+            symbols = set(symbols)
+            for key in [k for k in self._entries if symbols & set(k[0])]:
+                del self._entries[key]
+
+
+covariance_cache = CovarianceCache()
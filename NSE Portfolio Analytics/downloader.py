@@ -0,0 +1,153 @@
+"""
+Parallel multi-symbol downloader for NSE Portfolio Analytics
+
+Splits a symbol list into chunks, fetches the chunks on a bounded thread
+pool with a per-host rate limit and exponential backoff, and merges the
+results into one date-aligned frame. Every symbol gets a timing and, if
+it could not be fetched, the last error.
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import pandas as pd
+
+
+class RateLimiter:
+    """Token bucket allowing ``rate`` requests per second with bursts of ``burst``"""
+
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a request may be sent"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+_host_limiters = {}
+_host_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(host, rate, burst=1):
+    """Shared limiter for a host, so concurrent downloaders respect one budget.
+
+    Asking for a registered host with a different ``rate`` or ``burst``
+    raises ValueError; pass a private ``RateLimiter`` to the downloader
+    instead.
+    """
+    with _host_limiters_lock:
+        if host not in _host_limiters:
+            _host_limiters[host] = RateLimiter(rate, burst)
+        limiter = _host_limiters[host]
+    if (limiter.rate, limiter.burst) != (rate, burst):
+        raise ValueError(
+            f"Rate limiter for {host} is already registered at {limiter.rate}/s "
+            f"(burst {limiter.burst}), not {rate}/s (burst {burst})"
+        )
+    return limiter
+
+
+class DownloadReport:
+    """Result of a download: frames per symbol plus timing and failures"""
+
+    def __init__(self):
+        self.frames = {}
+        self.timings = {}
+        self.attempts = {}
+        self.failures = {}
+        self.elapsed = 0.0
+
+    def merge(self, field="Close"):
+        """Combine ``field`` for all fetched symbols into one date-aligned frame"""
+        columns = {symbol: frame[field] for symbol, frame in self.frames.items() if not frame.empty}
+        if not columns:
+            return pd.DataFrame()
+        return pd.concat(columns, axis=1).sort_index()
+
+    def summary(self):
+        """Per-symbol timing/status table"""
+        rows = []
+        for symbol in list(self.frames) + list(self.failures):
+            rows.append({
+                'Symbol': symbol,
+                'Seconds': self.timings.get(symbol, 0.0),
+                'Attempts': self.attempts.get(symbol, 0),
+                'Rows': len(self.frames[symbol]) if symbol in self.frames else 0,
+                'Error': str(self.failures.get(symbol, '')),
+            })
+        return pd.DataFrame(rows)
+
+
+class ChunkedDownloader:
+    """Fetch many symbols through a ``PriceFetcher`` in parallel chunks.
+
+    By default requests share the limiter registered for the fetcher's
+    ``host``; pass ``limiter`` to use a private one instead.
+    """
+
+    def __init__(self, fetcher, chunk_size=20, max_workers=4, rate_limit=2.0, burst=2,
+                 max_retries=3, backoff=0.5, limiter=None):
+        self.fetcher = fetcher
+        self.chunk_size = chunk_size
+        self.max_workers = max_workers
+        self.max_retries = max_retries
+        self.backoff = backoff
+        if limiter is None:
+            limiter = get_rate_limiter(getattr(fetcher, 'host', 'default'), rate_limit, burst)
+        self.limiter = limiter
+
+    def _fetch_chunk(self, symbols, start, end):
+        """Fetch one chunk, retrying with exponential backoff"""
+        started = time.perf_counter()
+        error = None
+
+        for attempt in range(1, self.max_retries + 1):
+            self.limiter.acquire()
+            try:
+                frames = self.fetcher.fetch_many(symbols, start, end)
+                return frames, attempt, time.perf_counter() - started, None
+            except Exception as e:
+                error = e
+                if attempt < self.max_retries:
+                    time.sleep(self.backoff * 2 ** (attempt - 1))
+
+        return {}, self.max_retries, time.perf_counter() - started, error
+
+    def download(self, symbols, start, end):
+        """Fetch ``start..end`` for every symbol and return a ``DownloadReport``"""
+        report = DownloadReport()
+        started = time.perf_counter()
+
+        chunks = [symbols[i:i + self.chunk_size] for i in range(0, len(symbols), self.chunk_size)]
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            futures = {pool.submit(self._fetch_chunk, chunk, start, end): chunk for chunk in chunks}
+
+            for future in as_completed(futures):
+                chunk = futures[future]
+                frames, attempts, seconds, error = future.result()
+
+                for symbol in chunk:
+                    report.timings[symbol] = seconds
+                    report.attempts[symbol] = attempts
+                    if symbol in frames:
+                        report.frames[symbol] = frames[symbol]
+                    else:
+                        report.failures[symbol] = error or ValueError("no data returned")
+
+        report.elapsed = time.perf_counter() - started
+        return report
@@ -0,0 +1,322 @@
+"""
+Headless analytics engine for NSE Portfolio Analytics
+
+The data access and risk calculations behind the dashboard, importable
+without Streamlit or Plotly. The Streamlit page (app.py), the HTTP API
+(api.py) and batch jobs all call these functions.
+"""
+
+import threading
+
+import numpy as np
+import pandas as pd
+
+from config import BENCHMARK_INDICES, RISK_CONFIG
+from correlation_structure import CorrelationStructure
+from covariance import covariance_cache, to_correlation
+from optimizer import PortfolioOptimizer
+from price_store import PriceStore
+from relative import IndexCalendarCache, relative_metrics, rolling_beta
+from risk_engine import align_weights, masked_portfolio_returns
+from sectors import sector_cache
+from stress import ScenarioSet, estimate_betas, stress_test
+
+_price_store = None
+_price_store_lock = threading.Lock()
+index_cache = IndexCalendarCache()
+
+
+# Data
+def get_price_store():
+    """Shared local price store, created on first use"""
+    global _price_store
+    with _price_store_lock:
+        if _price_store is None:
+            _price_store = PriceStore()
+        return _price_store
+
+
+def set_price_store(store):
+    """Use ``store`` for all engine data access (e.g. a synthetic store offline)"""
+    global _price_store
+    with _price_store_lock:
+        _price_store = store
+    index_cache.invalidate()
+
+
+def get_nse_data(symbols, period="1y"):
+    """Close prices for ``symbols`` on the trading calendar; returns ``(prices, failures)``.
+
+    Each symbol keeps its full history: sessions before a late listing or
+    on a missed day are NaN instead of truncating every other column.
+    """
+    return get_price_store().load(list(symbols), period)
+
+
+def get_latest_bars(symbols, since):
+    """Closes for ``symbols`` from ``since`` to today, fetched directly for live refresh.
+
+    Returns ``(prices, failures)``; see ``PriceStore.poll``.
+    """
+    return get_price_store().poll(list(symbols), since)
+
+
+def get_price_panel(symbols, period="1y"):
+    """Closes for ``symbols`` as a ``PricePanel``; returns ``(panel, failures)``"""
+    return get_price_store().load_panel(list(symbols), period)
+
+
+def get_index_data(index="NIFTY 50", period="1y"):
+    """Closes of a benchmark index (a BENCHMARK_INDICES name or a ticker) from the price store"""
+    ticker = BENCHMARK_INDICES.get(index, index)
+    prices, _ = get_price_store().load([ticker], period)
+    if prices.empty:
+        return pd.Series(dtype=np.float64, name=index)
+    return prices[ticker].dropna().rename(index)
+
+
+def get_nifty50_data(period="1y"):
+    """NIFTY 50 index closes"""
+    return get_index_data("NIFTY 50", period)
+
+
+def get_index_returns(index="NIFTY 50", dates=None, period="1y"):
+    """Daily index returns aligned to the holdings' calendar ``dates``, cached per calendar"""
+    return index_cache.get((index, period), dates, lambda: get_index_data(index, period))
+
+
+# Risk Analytics
+def calculate_returns(price_data):
+    """Daily returns, NaN where either close is missing so gaps are never spanned"""
+    return price_data.pct_change(fill_method=None).iloc[1:].dropna(how='all')
+
+
+def calculate_var(returns, confidence_level=0.05):
+    """Calculate Value at Risk"""
+    if len(returns) == 0:
+        return 0
+    return np.percentile(returns, confidence_level * 100)
+
+
+def calculate_portfolio_metrics(price_data, weights, risk_free_rate=0.07):
+    """Calculate comprehensive portfolio metrics"""
+    returns = calculate_returns(price_data)
+
+    if returns.empty:
+        return {}
+
+    # Portfolio returns; a holding that did not trade drops out for the day
+    portfolio_returns = pd.Series(masked_portfolio_returns(returns, weights), index=returns.index).dropna()
+
+    # Metrics
+    annual_return = portfolio_returns.mean() * 252
+    annual_vol = portfolio_returns.std() * np.sqrt(252)
+
+    # Sharpe Ratio
+    sharpe_ratio = (annual_return - risk_free_rate) / annual_vol if annual_vol > 0 else 0
+
+    # VaR
+    var_95 = calculate_var(portfolio_returns, 0.05)
+    var_99 = calculate_var(portfolio_returns, 0.01)
+
+    # Maximum Drawdown
+    cumulative = (1 + portfolio_returns).cumprod()
+    rolling_max = cumulative.expanding().max()
+    drawdown = (cumulative - rolling_max) / rolling_max
+    max_drawdown = drawdown.min()
+
+    return {
+        'annual_return': annual_return,
+        'annual_volatility': annual_vol,
+        'sharpe_ratio': sharpe_ratio,
+        'var_95': var_95,
+        'var_99': var_99,
+        'max_drawdown': max_drawdown,
+        'portfolio_returns': portfolio_returns
+    }
+
+
+def calculate_correlation_matrix(price_data, method="sample", period=None):
+    """Calculate correlation matrix from a cached covariance estimate"""
+    returns = calculate_returns(price_data)
+    return to_correlation(covariance_cache.get(returns, method, period))
+
+
+def calculate_correlation_structure(price_data, method="sample", period=None, threshold=None):
+    """Correlation matrix plus its ``CorrelationStructure`` (seriation, threshold graph, MST).
+
+    ``threshold`` defaults to RISK_CONFIG['CORRELATION_THRESHOLD']. Returns
+    ``(correlation, structure)``.
+    """
+    correlation = calculate_correlation_matrix(price_data, method, period)
+    return correlation, CorrelationStructure(correlation, threshold)
+
+
+def calculate_sector_analytics(price_data, weights=None, period=None):
+    """Sector returns, risk and correlation for the holdings in ``price_data``.
+
+    Returns a dict with ``summary`` (one row per sector), ``returns`` (daily
+    sector returns) and ``correlation``. The sector aggregation and the
+    asset covariance both come from caches keyed by universe and period.
+    """
+    returns = calculate_returns(price_data)
+    analytics = sector_cache.get(returns, weights, period)
+    covariance = covariance_cache.get(returns, "sample", period)
+    return {
+        'summary': analytics.summary(covariance),
+        'returns': analytics.returns,
+        'correlation': analytics.correlation(),
+    }
+
+
+def calculate_relative_metrics(price_data, weights, benchmark_returns, risk_free_rate=0.07, window=60):
+    """Benchmark-relative metrics for every holding plus the portfolio.
+
+    Returns a dict with ``metrics`` (one row per holding and a final
+    ``Portfolio`` row) and ``rolling_beta`` (``window``-day betas).
+    """
+    returns = calculate_returns(price_data)
+    returns = returns.assign(Portfolio=masked_portfolio_returns(returns, weights))
+    return {
+        'metrics': relative_metrics(returns, benchmark_returns, risk_free_rate),
+        'rolling_beta': rolling_beta(returns, benchmark_returns, window),
+    }
+
+
+def calculate_stock_metrics(price_data, benchmark_returns=None, risk_free_rate=0.07):
+    """Per-stock metrics for every column in one vectorized pass.
+
+    Returns a numeric DataFrame with annual return, volatility, Sharpe,
+    Sortino, beta to ``benchmark_returns`` (NaN without one), max drawdown,
+    skew, excess kurtosis and the latest price. Format at render time.
+    Each column uses only the days it has a return for.
+    """
+    prices = price_data.to_numpy(dtype=np.float64)
+    R = prices[1:] / prices[:-1] - 1
+    T = len(R)
+
+    if T < 2:
+        return pd.DataFrame({'Stock': list(price_data.columns)})
+
+    valid = ~np.isnan(R)
+    n = valid.sum(axis=0)
+    X = np.where(valid, R, 0.0)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean = X.sum(axis=0) / n
+        centered = np.where(valid, R - mean, 0.0)
+        # Powers by repeated multiplication; ** 3 and ** 4 go through the slow pow()
+        c2 = centered * centered
+        m2 = c2.sum(axis=0)
+        std = np.sqrt(m2 / (n - 1))
+
+        annual_ret = mean * 252
+        annual_vol = std * np.sqrt(252)
+        losses = np.minimum(X, 0)
+        downside = np.sqrt((losses * losses).sum(axis=0) / n) * np.sqrt(252)
+
+        sharpe = np.where(annual_vol > 0, (annual_ret - risk_free_rate) / annual_vol, 0)
+        sortino = np.where(downside > 0, (annual_ret - risk_free_rate) / downside, 0)
+
+        # Bias-corrected sample skew and excess kurtosis (same as pandas)
+        m2n, m3n, m4n = m2 / n, (c2 * centered).sum(axis=0) / n, (c2 * c2).sum(axis=0) / n
+        skew = np.where(n > 2, m3n / m2n ** 1.5 * np.sqrt(n * (n - 1)) / (n - 2), np.nan)
+        kurt = np.where(n > 3, ((n + 1) * (m4n / m2n ** 2) - 3 * (n - 1)) * (n - 1) / ((n - 2) * (n - 3)),
+                        np.nan)
+
+    # Days without a return are flat for the drawdown
+    cumulative = np.cumprod(1 + X, axis=0)
+    max_dd = (cumulative / np.maximum.accumulate(cumulative, axis=0) - 1).min(axis=0)
+
+    beta = np.full_like(mean, np.nan)
+    if benchmark_returns is not None:
+        m = benchmark_returns.reindex(price_data.index[1:]).to_numpy(dtype=np.float64)
+        pairs = valid & ~np.isnan(m)[:, None]
+        k = pairs.sum(axis=0)
+        M = np.where(pairs, m[:, None], 0.0)
+        Y = np.where(pairs, R, 0.0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            m_centered = np.where(pairs, M - M.sum(axis=0) / k, 0.0)
+            r_centered = np.where(pairs, Y - Y.sum(axis=0) / k, 0.0)
+            beta = np.where(k > 1, (m_centered * r_centered).sum(axis=0) / (m_centered * m_centered).sum(axis=0),
+                            np.nan)
+
+    # Latest close each symbol actually has
+    last = len(prices) - 1 - np.argmax(~np.isnan(prices[::-1]), axis=0)
+
+    return pd.DataFrame({
+        'Stock': list(price_data.columns),
+        'Annual Return': annual_ret,
+        'Volatility': annual_vol,
+        'Sharpe Ratio': sharpe,
+        'Sortino Ratio': sortino,
+        'Beta': beta,
+        'Max Drawdown': max_dd,
+        'Skew': skew,
+        'Kurtosis': kurt,
+        'Current Price': prices[last, np.arange(prices.shape[1])],
+    })
+
+
+def calculate_efficient_frontier(price_data, points=50):
+    """Efficient frontier plus max-Sharpe and min-variance portfolios"""
+    optimizer = PortfolioOptimizer(calculate_returns(price_data))
+    return optimizer.efficient_frontier(points), optimizer.max_sharpe(), optimizer.min_variance()
+
+
+def screen_universe(symbols, period="1y", benchmark_returns=None, n_clusters=10, **kwargs):
+    """Screen every symbol in ``symbols``; returns ``(ScreenIndex, failures)``.
+
+    Prices come straight from the store without dropping rows, so a late
+    listing does not truncate the whole universe; see ``screener.screen``.
+    """
+    from screener import screen
+
+    prices, failures = get_price_store().load(list(symbols), period)
+    index = screen(prices, benchmark_returns, RISK_CONFIG['RISK_FREE_RATE'], n_clusters, **kwargs)
+    return index, failures
+
+
+def run_stress_tests(portfolios, portfolio_value=1_000_000, market=None, beta_days=504):
+    """Stress every portfolio in ``{name: {'symbols', 'weights'}}`` at once.
+
+    Loads full local histories for the union of holdings so historical
+    windows can be replayed, estimates betas over the last ``beta_days``
+    (to ``market`` index prices if given) and applies the default scenario
+    set. Returns ``(StressReport, failures)``.
+    """
+    universe = sorted({symbol for p in portfolios.values() for symbol in p['symbols']})
+    prices, failures = get_price_store().load(universe, "max")
+    if prices.empty:
+        return None, failures
+
+    returns = prices.iloc[-beta_days - 1:].pct_change(fill_method=None).iloc[1:]
+    market_returns = market.pct_change(fill_method=None) if market is not None else None
+    scenarios = ScenarioSet(list(prices.columns), estimate_betas(returns, market_returns))
+    scenarios.add_defaults(prices, market)
+    return stress_test(scenarios, portfolios, portfolio_value), failures
+
+
+# One-call analysis
+def analyze_portfolio(symbols, weights, period="1y", correlation_method="sample"):
+    """Fetch prices and compute everything the dashboard shows for one portfolio.
+
+    Returns a dict with ``prices``, ``metrics``, ``correlation``,
+    ``stock_metrics`` and ``failures``.
+    """
+    prices, failures = get_nse_data(symbols, period)
+    if prices.empty:
+        return {'prices': prices, 'metrics': {}, 'correlation': pd.DataFrame(),
+                'stock_metrics': pd.DataFrame(), 'failures': failures}
+
+    # Renormalised over the symbols that loaded, like the dashboard
+    weights = align_weights(weights, list(symbols), prices.columns)
+    risk_free_rate = RISK_CONFIG['RISK_FREE_RATE']
+
+    return {
+        'prices': prices,
+        'metrics': calculate_portfolio_metrics(prices, weights, risk_free_rate),
+        'correlation': calculate_correlation_matrix(prices, correlation_method, period),
+        'stock_metrics': calculate_stock_metrics(prices, risk_free_rate=risk_free_rate),
+        'failures': failures,
+    }
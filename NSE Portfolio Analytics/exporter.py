@@ -0,0 +1,167 @@
+"""
+Data export for NSE Portfolio Analytics
+
+Tables are written in row chunks to in-memory buffers, as Parquet (one row
+group per chunk, needs pyarrow) or gzip-compressed CSV. Several tables are
+bundled into a zip archive. ``ExportManager`` runs exports on a background
+thread so the page stays responsive, and each finished export reports the
+bytes written and the time it took.
+"""
+
+import gzip
+import io
+import threading
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+CHUNK_ROWS = 50_000
+
+FORMATS = {
+    'parquet': ('.parquet', 'application/octet-stream'),
+    'csv.gz': ('.csv.gz', 'application/gzip'),
+}
+
+
+def available_formats():
+    """Export formats usable in this environment"""
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return ['csv.gz']
+    return list(FORMATS)
+
+
+def _prepare(frame):
+    """Keep a meaningful index as a column and make column names strings"""
+    if not isinstance(frame.index, pd.RangeIndex):
+        frame = frame.reset_index()
+    frame = frame.copy(deep=False)
+    frame.columns = [str(c) for c in frame.columns]
+    return frame
+
+
+def _chunks(frame, chunk_rows):
+    for start in range(0, max(len(frame), 1), chunk_rows):
+        yield frame.iloc[start:start + chunk_rows]
+
+
+def write_parquet(frame, buffer, chunk_rows=CHUNK_ROWS):
+    """Write ``frame`` to ``buffer`` as Parquet, one row group per chunk"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    frame = _prepare(frame)
+    schema = pa.Schema.from_pandas(frame, preserve_index=False)
+    with pq.ParquetWriter(buffer, schema, compression='snappy') as writer:
+        for chunk in _chunks(frame, chunk_rows):
+            writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+
+
+def write_csv_gz(frame, buffer, chunk_rows=CHUNK_ROWS):
+    """Write ``frame`` to ``buffer`` as gzip-compressed CSV, chunk by chunk"""
+    frame = _prepare(frame)
+    with gzip.GzipFile(fileobj=buffer, mode='wb', compresslevel=6) as gz:
+        with io.TextIOWrapper(gz, encoding='utf-8', newline='') as text:
+            for i, chunk in enumerate(_chunks(frame, chunk_rows)):
+                chunk.to_csv(text, index=False, header=(i == 0))
+
+
+WRITERS = {
+    'parquet': write_parquet,
+    'csv.gz': write_csv_gz,
+}
+
+
+class ExportResult:
+    """A finished export: the file contents plus size and timing"""
+
+    def __init__(self, data, file_name, mime, rows, elapsed):
+        self.data = data
+        self.file_name = file_name
+        self.mime = mime
+        self.rows = rows
+        self.elapsed = elapsed
+
+    @property
+    def bytes_written(self):
+        return len(self.data)
+
+    def summary(self):
+        return f"{self.file_name}: {self.rows:,} rows, {self.bytes_written / 1024:,.1f} KB in {self.elapsed:.2f}s"
+
+
+def export_tables(tables, name, fmt='parquet', chunk_rows=CHUNK_ROWS):
+    """Export ``{table_name: DataFrame}`` to memory.
+
+    One table becomes a single file, several become a zip archive with one
+    file per table.
+    """
+    if fmt not in WRITERS:
+        raise ValueError(f"Unknown export format: {fmt}")
+
+    start = time.perf_counter()
+    extension, mime = FORMATS[fmt]
+    writer = WRITERS[fmt]
+    rows = sum(len(frame) for frame in tables.values())
+
+    if len(tables) == 1:
+        buffer = io.BytesIO()
+        writer(next(iter(tables.values())), buffer, chunk_rows)
+        file_name = f"{name}{extension}"
+    else:
+        buffer = io.BytesIO()
+        # Members are already compressed, so the archive only stores them
+        with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_STORED) as archive:
+            for table_name, frame in tables.items():
+                member = io.BytesIO()
+                writer(frame, member, chunk_rows)
+                archive.writestr(f"{table_name}{extension}", member.getvalue())
+        file_name, mime = f"{name}.zip", 'application/zip'
+
+    return ExportResult(buffer.getvalue(), file_name, mime, rows, time.perf_counter() - start)
+
+
+class ExportManager:
+    """Run exports on a background thread, tracked by name"""
+
+    def __init__(self, max_workers=1):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='export')
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, name, tables, fmt='parquet', chunk_rows=CHUNK_ROWS):
+        """Start exporting ``tables``; replaces any earlier export with the same name"""
+        future = self._executor.submit(export_tables, tables, name, fmt, chunk_rows)
+        with self._lock:
+            self._jobs[name] = future
+        return future
+
+    def status(self, name):
+        """``None``, ``'running'``, ``'done'`` or ``'failed'``"""
+        with self._lock:
+            future = self._jobs.get(name)
+        if future is None:
+            return None
+        if not future.done():
+            return 'running'
+        return 'failed' if future.exception() is not None else 'done'
+
+    def result(self, name, timeout=None):
+        """The ``ExportResult`` for ``name`` (waits up to ``timeout`` seconds)"""
+        with self._lock:
+            future = self._jobs[name]
+        return future.result(timeout)
+
+    def error(self, name):
+        """The exception a failed export raised, or None"""
+        with self._lock:
+            future = self._jobs.get(name)
+        if future is None or not future.done():
+            return None
+        return future.exception()
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True)
@@ -0,0 +1,199 @@
+"""
+Mean-variance optimizer for NSE Portfolio Analytics
+
+Efficient frontier, minimum-variance and maximum-Sharpe portfolios under
+the RISK_CONFIG limits. Expected returns and the covariance matrix are
+annualised once per optimizer and reused by every solve; each frontier
+point is a small quadratic program solved with SLSQP from the previous
+point's weights.
+
+A solve that SLSQP reports as failed is never clipped into a portfolio:
+``min_variance`` and ``max_sharpe`` raise ValueError and the frontier
+leaves that target out.
+
+MAX_POSITION_SIZE is a per-name upper bound. MIN_PORTFOLIO_SIZE is met by
+tightening that bound to at most 1 / MIN_PORTFOLIO_SIZE, which forces at
+least that many names to hold weight. MAX_PORTFOLIO_SIZE is applied by
+keeping the largest holdings and re-solving over them.
+"""
+
+import numpy as np
+import pandas as pd
+from scipy.optimize import minimize
+
+from config import RISK_CONFIG
+from covariance import sample_covariance
+
+TRADING_DAYS = 252
+
+
+class PortfolioOptimizer:
+    """Long-only mean-variance optimizer over a returns matrix"""
+
+    def __init__(self, returns, risk_free_rate=None, max_position=None,
+                 min_holdings=None, max_holdings=None, cov=None):
+        if isinstance(returns, pd.DataFrame):
+            self.symbols = list(returns.columns)
+            returns = returns.to_numpy(dtype=np.float64)
+        else:
+            returns = np.asarray(returns, dtype=np.float64)
+            self.symbols = [str(i) for i in range(returns.shape[1])]
+
+        self.risk_free_rate = RISK_CONFIG['RISK_FREE_RATE'] if risk_free_rate is None else risk_free_rate
+        max_position = RISK_CONFIG['MAX_POSITION_SIZE'] if max_position is None else max_position
+        self.min_holdings = RISK_CONFIG['MIN_PORTFOLIO_SIZE'] if min_holdings is None else min_holdings
+        self.max_holdings = RISK_CONFIG['MAX_PORTFOLIO_SIZE'] if max_holdings is None else max_holdings
+
+        n = returns.shape[1]
+        self.cap = min(max_position, 1.0 / max(self.min_holdings, 1))
+        if self.cap * min(n, self.max_holdings) < 1 - 1e-9:
+            raise ValueError(
+                f"{n} symbols with a {self.cap:.0%} position limit cannot be fully invested"
+            )
+
+        # Missing returns (late listings, missed days) are skipped per symbol
+        self.mu = np.nanmean(returns, axis=0) * TRADING_DAYS
+        self.cov = (sample_covariance(returns) if cov is None else np.asarray(cov)) * TRADING_DAYS
+        self.cov = self.cov.reshape(n, n)
+
+    # Helpers
+    def _stats(self, weights):
+        ret = float(weights @ self.mu)
+        vol = float(np.sqrt(max(weights @ self.cov @ weights, 0)))
+        sharpe = (ret - self.risk_free_rate) / vol if vol > 0 else 0
+        return ret, vol, sharpe
+
+    def _result(self, weights):
+        weights = np.where(weights < 1e-6, 0.0, weights)
+        weights = weights / weights.sum()
+        ret, vol, sharpe = self._stats(weights)
+        return {
+            'weights': pd.Series(weights, index=self.symbols),
+            'annual_return': ret,
+            'annual_volatility': vol,
+            'sharpe_ratio': sharpe,
+        }
+
+    def _solve(self, start, target_return=None, active=None):
+        """Minimum variance, optionally at ``target_return``, over ``active`` names"""
+        idx = np.arange(len(self.mu)) if active is None else active
+        cov = self.cov[np.ix_(idx, idx)]
+        mu = self.mu[idx]
+
+        constraints = [{'type': 'eq', 'fun': lambda w: w.sum() - 1, 'jac': lambda w: np.ones_like(w)}]
+        if target_return is not None:
+            constraints.append({'type': 'eq', 'fun': lambda w: w @ mu - target_return,
+                                'jac': lambda w: mu})
+
+        solution = minimize(
+            lambda w: w @ cov @ w,
+            start[idx] / start[idx].sum(),
+            jac=lambda w: 2 * cov @ w,
+            bounds=[(0, self.cap)] * len(idx),
+            constraints=constraints,
+            method='SLSQP',
+            options={'ftol': 1e-12, 'maxiter': 200},
+        )
+        self._check(solution, target_return)
+        weights = np.zeros(len(self.mu))
+        weights[idx] = np.clip(solution.x, 0, self.cap)
+        return weights
+
+    @staticmethod
+    def _check(solution, target_return=None):
+        """Raise ValueError if SLSQP did not converge to a feasible point"""
+        if not solution.success:
+            at = "" if target_return is None else f" at a {target_return:.2%} target return"
+            raise ValueError(f"Optimization failed{at}: {solution.message}")
+
+    def _limit_holdings(self, weights, target_return=None):
+        """Re-solve over the largest holdings if there are too many names"""
+        if np.count_nonzero(weights > 1e-6) <= self.max_holdings:
+            return weights
+        active = np.sort(np.argsort(weights)[::-1][:self.max_holdings])
+        return self._solve(weights, target_return, active)
+
+    def _equal_start(self):
+        return np.full(len(self.mu), 1.0 / len(self.mu))
+
+    def _max_return(self):
+        """Highest achievable return: fill the best names up to the cap"""
+        weights = np.zeros(len(self.mu))
+        remaining = 1.0
+        for i in np.argsort(self.mu)[::-1][:self.max_holdings]:
+            weights[i] = min(self.cap, remaining)
+            remaining -= weights[i]
+            if remaining <= 0:
+                break
+        return weights
+
+    # Public API
+    def min_variance(self):
+        """Minimum-variance portfolio"""
+        weights = self._limit_holdings(self._solve(self._equal_start()))
+        return self._result(weights)
+
+    def max_sharpe(self):
+        """Maximum-Sharpe portfolio.
+
+        Solved as a convex problem in y = w / (mu'w - rf): minimise y'Cy
+        subject to (mu - rf)'y = 1, 0 <= y <= cap * sum(y).
+        """
+        excess = self.mu - self.risk_free_rate
+        if excess.max() <= 0:
+            return self.min_variance()
+
+        n = len(self.mu)
+        cov = self.cov
+        cap = self.cap
+        constraints = [
+            {'type': 'eq', 'fun': lambda y: y @ excess - 1, 'jac': lambda y: excess},
+            {'type': 'ineq', 'fun': lambda y: cap * y.sum() - y,
+             'jac': lambda y: cap * np.ones((n, n)) - np.eye(n)},
+        ]
+        start = self._max_return()
+        start = start / max(start @ excess, 1e-12)
+
+        solution = minimize(
+            lambda y: y @ cov @ y,
+            start,
+            jac=lambda y: 2 * cov @ y,
+            bounds=[(0, None)] * n,
+            constraints=constraints,
+            method='SLSQP',
+            options={'ftol': 1e-12, 'maxiter': 200},
+        )
+        self._check(solution)
+        y = np.clip(solution.x, 0, None)
+        weights = self._limit_holdings(y / y.sum())
+        return self._result(weights)
+
+    def efficient_frontier(self, points=50):
+        """Frontier portfolios from minimum variance up to the maximum return.
+
+        Returns a DataFrame with Return, Volatility and Sharpe columns plus one
+        weight column per symbol. Targets that cannot be reached (e.g. once
+        MAX_PORTFOLIO_SIZE narrows the names) are left out.
+        """
+        low = self.min_variance()
+        high_weights = self._max_return()
+        targets = np.linspace(low['annual_return'], float(high_weights @ self.mu), points)
+
+        rows = []
+        weights = low['weights'].to_numpy()
+        for target in targets:
+            try:
+                solved = self._limit_holdings(self._solve(weights, target), target)
+            except ValueError:
+                continue
+            weights = solved
+            result = self._result(weights)
+            row = {
+                'Return': result['annual_return'],
+                'Volatility': result['annual_volatility'],
+                'Sharpe': result['sharpe_ratio'],
+            }
+            row.update(result['weights'].to_dict())
+            rows.append(row)
+
+        return pd.DataFrame(rows)
@@ -0,0 +1,224 @@
+"""
+Saved portfolio storage for NSE Portfolio Analytics
+
+Portfolios live in two tables: ``portfolios`` (one row per portfolio) and
+``holdings`` (one row per symbol, clustered on portfolio id). The
+repository keeps an in-process copy of every saved portfolio, loaded with
+one query and dropped on any write, so listing and loading portfolios in
+the sidebar does not touch the database on each rerun.
+
+Databases created with the old schema (comma-joined ``symbols`` and
+``weights`` columns on ``portfolios``) are migrated on first use.
+"""
+
+import sqlite3
+import threading
+from datetime import datetime
+
+import pandas as pd
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS portfolios (
+    id INTEGER PRIMARY KEY,
+    name TEXT UNIQUE NOT NULL,
+    created_date TEXT
+);
+
+CREATE TABLE IF NOT EXISTS holdings (
+    portfolio_id INTEGER NOT NULL REFERENCES portfolios(id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    symbol TEXT NOT NULL,
+    weight REAL NOT NULL,
+    PRIMARY KEY (portfolio_id, position)
+) WITHOUT ROWID;
+"""
+
+
+class PortfolioRepository:
+    """Load, save and diff saved portfolios"""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self._lock = threading.RLock()
+        self._cache = None
+
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA foreign_keys=ON")
+        self._migrate()
+
+    # Schema
+    def _columns(self, table):
+        return [row[1] for row in self.conn.execute(f"PRAGMA table_info({table})")]
+
+    def _migrate(self):
+        """Create the tables, converting the comma-joined layout if present"""
+        with self._lock:
+            legacy = 'symbols' in self._columns('portfolios')
+
+            # DDL does not open a transaction implicitly, so start one to keep
+            # the migration all-or-nothing
+            self.conn.execute("BEGIN")
+            try:
+                if legacy:
+                    self.conn.execute("ALTER TABLE portfolios RENAME TO portfolios_legacy")
+
+                for statement in SCHEMA.split(';'):
+                    if statement.strip():
+                        self.conn.execute(statement)
+
+                if legacy:
+                    self._copy_legacy()
+                    self.conn.execute("DROP TABLE portfolios_legacy")
+
+                self.conn.commit()
+            except Exception:
+                self.conn.rollback()
+                raise
+
+    def _copy_legacy(self):
+        rows = self.conn.execute(
+            "SELECT id, name, symbols, weights, created_date FROM portfolios_legacy"
+        ).fetchall()
+        self.conn.executemany(
+            "INSERT INTO portfolios (id, name, created_date) VALUES (?, ?, ?)",
+            [(pid, name, created) for pid, name, _, _, created in rows]
+        )
+        self.conn.executemany(
+            "INSERT INTO holdings (portfolio_id, position, symbol, weight) VALUES (?, ?, ?, ?)",
+            [
+                (pid, position, symbol, float(weight))
+                for pid, _, symbols, weights, _ in rows
+                for position, (symbol, weight) in enumerate(zip(symbols.split(','), weights.split(',')))
+            ]
+        )
+
+    # Cached view
+    def _load_cache(self):
+        with self._lock:
+            if self._cache is not None:
+                return self._cache
+
+            rows = self.conn.execute("""
+                SELECT p.name, p.created_date, h.symbol, h.weight
+                FROM portfolios p LEFT JOIN holdings h ON h.portfolio_id = p.id
+                ORDER BY p.name, h.position
+            """).fetchall()
+
+            cache = {}
+            for name, created, symbol, weight in rows:
+                entry = cache.setdefault(name, {'symbols': [], 'weights': [], 'created_date': created})
+                if symbol is not None:
+                    entry['symbols'].append(symbol)
+                    entry['weights'].append(weight)
+
+            self._cache = cache
+            return cache
+
+    def invalidate(self):
+        """Drop the in-process copy; the next read reloads it"""
+        with self._lock:
+            self._cache = None
+
+    # Reads
+    def list_names(self):
+        """Names of all saved portfolios, sorted"""
+        return list(self._load_cache().keys())
+
+    def load(self, name):
+        """Return ``{'symbols', 'weights', 'created_date'}`` for a portfolio, or None"""
+        entry = self._load_cache().get(name)
+        if entry is None:
+            return None
+        return {
+            'symbols': list(entry['symbols']),
+            'weights': list(entry['weights']),
+            'created_date': entry['created_date'],
+        }
+
+    def load_many(self, names=None):
+        """Load several portfolios (all if ``names`` is None) as a dict keyed by name"""
+        cache = self._load_cache()
+        names = cache.keys() if names is None else names
+        return {name: self.load(name) for name in names if name in cache}
+
+    # Writes
+    def save(self, name, symbols, weights, created_date=None):
+        """Create or replace one portfolio"""
+        self.save_many({name: {'symbols': symbols, 'weights': weights, 'created_date': created_date}})
+
+    def save_many(self, portfolios):
+        """Create or replace many portfolios in one transaction"""
+        today = str(datetime.now().date())
+        with self._lock, self.conn:
+            self.conn.executemany(
+                "INSERT INTO portfolios (name, created_date) VALUES (?, ?) "
+                "ON CONFLICT(name) DO UPDATE SET created_date = excluded.created_date",
+                [(name, p.get('created_date') or today) for name, p in portfolios.items()]
+            )
+            ids = self._ids(portfolios.keys())
+            self.conn.executemany(
+                "DELETE FROM holdings WHERE portfolio_id = ?", [(ids[name],) for name in portfolios]
+            )
+            self.conn.executemany(
+                "INSERT INTO holdings (portfolio_id, position, symbol, weight) VALUES (?, ?, ?, ?)",
+                [
+                    (ids[name], position, symbol, float(weight))
+                    for name, p in portfolios.items()
+                    for position, (symbol, weight) in enumerate(zip(p['symbols'], p['weights']))
+                ]
+            )
+            self._cache = None
+
+    def delete(self, name):
+        """Delete a portfolio and its holdings"""
+        with self._lock, self.conn:
+            self.conn.execute("DELETE FROM portfolios WHERE name = ?", (name,))
+            self._cache = None
+
+    def _ids(self, names):
+        names = list(names)
+        ids = {}
+        # Stay under SQLite's bound-parameter limit
+        for i in range(0, len(names), 500):
+            batch = names[i:i + 500]
+            placeholders = ','.join('?' * len(batch))
+            ids.update(self.conn.execute(
+                f"SELECT name, id FROM portfolios WHERE name IN ({placeholders})", batch
+            ).fetchall())
+        return ids
+
+    # Diffs
+    def diff(self, base, others):
+        """Weight changes from portfolio ``base`` to each portfolio in ``others``.
+
+        Returns a DataFrame with one row per (portfolio, symbol) that differs,
+        with the base weight, the other weight and the change.
+        """
+        if isinstance(others, str):
+            others = [others]
+
+        portfolios = self.load_many([base] + list(others))
+        if base not in portfolios:
+            raise KeyError(base)
+
+        base_weights = pd.Series(portfolios[base]['weights'], index=portfolios[base]['symbols'])
+        frames = []
+        for name in others:
+            if name not in portfolios:
+                continue
+            other = pd.Series(portfolios[name]['weights'], index=portfolios[name]['symbols'])
+            frame = pd.concat({'base_weight': base_weights, 'weight': other}, axis=1).fillna(0)
+            frame['change'] = frame['weight'] - frame['base_weight']
+            frame = frame[frame['change'].abs() > 1e-12]
+            frame.insert(0, 'portfolio', name)
+            frames.append(frame.rename_axis('symbol').reset_index())
+
+        if not frames:
+            return pd.DataFrame(columns=['portfolio', 'symbol', 'base_weight', 'weight', 'change'])
+        return pd.concat(frames, ignore_index=True)
+
+
+def open_repository(path):
+    """Open a repository on a SQLite file shared across threads"""
+    return PortfolioRepository(sqlite3.connect(path, check_same_thread=False))
@@ -0,0 +1,481 @@
+"""
+Local columnar price store for NSE Portfolio Analytics
+
+Each symbol is kept on disk as one .npy file per column (dates, open, high,
+low, close, volume) and read back memory-mapped, so loading a long history
+for many symbols costs a few file opens instead of a network round trip.
+Only the date ranges that have never been fetched are requested from the
+fetcher; everything else is served locally.
+
+Loading places each symbol on the NSE trading calendar: a symbol's closes
+are expanded once into a dense array over session positions (NaN on
+sessions it did not trade), so assembling a multi-symbol panel is one
+slice per symbol rather than a join on dates.
+"""
+
+import json
+import os
+import threading
+import time
+import zlib
+from datetime import date, datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from downloader import ChunkedDownloader
+from trading_calendar import PricePanel, nse_calendar
+
+COLUMNS = ["open", "high", "low", "close", "volume"]
+
+PERIOD_DAYS = {
+    "1mo": 31,
+    "3mo": 92,
+    "6mo": 183,
+    "1y": 365,
+    "2y": 730,
+    "5y": 1826,
+    "10y": 3652,
+    "20y": 7305,
+}
+
+DEFAULT_STORE_PATH = os.path.join("data", "prices")
+
+
+def period_start(period, end):
+    """Convert a yfinance-style period string into a start date (None for 'max')"""
+    if period == "max":
+        return None
+    if period not in PERIOD_DAYS:
+        raise ValueError(f"Unsupported period: {period}")
+    return end - timedelta(days=PERIOD_DAYS[period])
+
+
+def _to_day(value):
+    """Normalise a date/datetime/Timestamp to a datetime.date"""
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, pd.Timestamp):
+        return value.date()
+    return value
+
+
+# Fetchers
+class PriceFetcher:
+    """Interface for price sources used to fill the store.
+
+    ``fetch`` returns a DataFrame indexed by date with the columns
+    Open, High, Low, Close and Volume for ``start <= date <= end``.
+    ``start`` may be None, meaning "from the first available bar".
+    ``fetch_many`` returns a dict of such frames and may batch requests;
+    symbols missing from the dict are treated as failed.
+    """
+
+    host = "default"
+
+    def fetch(self, symbol, start, end):
+        raise NotImplementedError
+
+    def fetch_many(self, symbols, start, end):
+        return {symbol: self.fetch(symbol, start, end) for symbol in symbols}
+
+
+class YFinanceFetcher(PriceFetcher):
+    """Fetch daily NSE bars from Yahoo Finance"""
+
+    host = "query1.finance.yahoo.com"
+
+    def __init__(self, suffix=".NS"):
+        self.suffix = suffix
+
+    def _download(self, tickers, start, end, **kwargs):
+        import yfinance as yf
+
+        if start is None:
+            return yf.download(tickers, period="max", progress=False, **kwargs)
+        return yf.download(tickers, start=start, end=end + timedelta(days=1),
+                           progress=False, **kwargs)
+
+    def _ticker(self, symbol):
+        """Yahoo ticker for a symbol; index tickers (``^NSEI``) take no suffix"""
+        return symbol if symbol.startswith("^") else f"{symbol}{self.suffix}"
+
+    def fetch(self, symbol, start, end):
+        data = self._download(self._ticker(symbol), start, end)
+        if isinstance(data.columns, pd.MultiIndex):
+            data.columns = data.columns.get_level_values(0)
+        return data
+
+    def fetch_many(self, symbols, start, end):
+        if len(symbols) == 1:
+            return {symbols[0]: self.fetch(symbols[0], start, end)}
+
+        tickers = [self._ticker(symbol) for symbol in symbols]
+        data = self._download(tickers, start, end, group_by="ticker", threads=False)
+        if data.empty:
+            return {symbol: data for symbol in symbols}
+
+        frames = {}
+        for symbol, ticker in zip(symbols, tickers):
+            if ticker in data.columns.get_level_values(0):
+                frame = data[ticker].dropna(how="all")
+                if not frame.empty:
+                    frames[symbol] = frame
+        return frames
+
+
+class SyntheticFetcher(PriceFetcher):
+    """Deterministic geometric-Brownian-motion prices for offline use and tests.
+
+    Bars fall on NSE trading sessions. The path for a symbol depends only
+    on the symbol and ``seed``, so fetching the same dates twice (or in
+    pieces) always gives the same bars.
+    ``latency`` adds a sleep per request to mimic a remote source.
+    """
+
+    ORIGIN = date(2000, 1, 3)
+    host = "synthetic"
+
+    def __init__(self, seed=42, start_price=100.0, drift=0.0004, volatility=0.018, latency=0.0):
+        self.seed = seed
+        self.start_price = start_price
+        self.drift = drift
+        self.volatility = volatility
+        self.latency = latency
+        self.calls = []
+
+    def fetch_many(self, symbols, start, end):
+        if self.latency:
+            time.sleep(self.latency)
+        return {symbol: self._generate(symbol, start, end) for symbol in symbols}
+
+    def fetch(self, symbol, start, end):
+        return self.fetch_many([symbol], start, end)[symbol]
+
+    def _generate(self, symbol, start, end):
+        self.calls.append((symbol, start, end))
+
+        days = np.arange(np.datetime64(self.ORIGIN), np.datetime64(end) + 1, dtype="datetime64[D]")
+        dates = pd.DatetimeIndex(days[nse_calendar().is_session(days)])
+        rng = np.random.default_rng([self.seed, zlib.crc32(symbol.encode())])
+        returns = rng.normal(self.drift, self.volatility, len(dates))
+        close = self.start_price * np.exp(np.cumsum(returns))
+        open_ = close * (1 + rng.normal(0, self.volatility / 4, len(dates)))
+        spread = np.abs(rng.normal(0, self.volatility / 2, len(dates)))
+        high = np.maximum(open_, close) * (1 + spread)
+        low = np.minimum(open_, close) * (1 - spread)
+        volume = rng.integers(100_000, 5_000_000, len(dates))
+
+        df = pd.DataFrame({
+            "Open": open_,
+            "High": high,
+            "Low": low,
+            "Close": close,
+            "Volume": volume,
+        }, index=dates)
+
+        if start is not None:
+            df = df[df.index >= pd.Timestamp(start)]
+        return df
+
+
+# Store
+class PriceStore:
+    """Persistent per-symbol OHLCV store filled incrementally from a fetcher"""
+
+    def __init__(self, root=DEFAULT_STORE_PATH, fetcher=None, downloader=None, calendar=None):
+        self.root = root
+        self.fetcher = fetcher if fetcher is not None else YFinanceFetcher()
+        self.downloader = downloader if downloader is not None else ChunkedDownloader(self.fetcher)
+        self.calendar = calendar if calendar is not None else nse_calendar()
+        self._dense = {}
+        self._dense_lock = threading.Lock()
+        os.makedirs(self.root, exist_ok=True)
+
+    # Paths and metadata
+    def _symbol_dir(self, symbol):
+        return os.path.join(self.root, symbol)
+
+    def _read_meta(self, symbol):
+        path = os.path.join(self._symbol_dir(symbol), "meta.json")
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            meta = json.load(f)
+        return {
+            "start": date.fromisoformat(meta["start"]) if meta["start"] else None,
+            "end": date.fromisoformat(meta["end"]),
+        }
+
+    def _write_meta(self, symbol, start, end):
+        os.makedirs(self._symbol_dir(symbol), exist_ok=True)
+        path = os.path.join(self._symbol_dir(symbol), "meta.json")
+        tmp = path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump({
+                "start": start.isoformat() if start else None,
+                "end": end.isoformat(),
+            }, f)
+        os.replace(tmp, path)
+
+    def symbols(self):
+        """List symbols that have data in the store"""
+        return sorted(
+            name for name in os.listdir(self.root)
+            if os.path.exists(os.path.join(self.root, name, "meta.json"))
+        )
+
+    # Reading
+    def read(self, symbol, mmap=True):
+        """Return the stored columns for a symbol as a dict of arrays (or None)"""
+        directory = self._symbol_dir(symbol)
+        if not os.path.exists(os.path.join(directory, "dates.npy")):
+            return None
+        mode = "r" if mmap else None
+        arrays = {"dates": np.load(os.path.join(directory, "dates.npy"), mmap_mode=mode)}
+        for column in COLUMNS:
+            arrays[column] = np.load(os.path.join(directory, f"{column}.npy"), mmap_mode=mode)
+        return arrays
+
+    def read_frame(self, symbol):
+        """Return the stored OHLCV history for a symbol as a DataFrame"""
+        arrays = self.read(symbol)
+        if arrays is None:
+            return pd.DataFrame(columns=[c.title() for c in COLUMNS])
+        index = pd.DatetimeIndex(np.asarray(arrays["dates"]).astype("datetime64[D]"))
+        return pd.DataFrame({c.title(): np.asarray(arrays[c]) for c in COLUMNS}, index=index)
+
+    def dense(self, symbol, field="close"):
+        """``field`` for a symbol on the calendar as ``(first_position, values)``, or None.
+
+        ``values`` has one entry per session from the symbol's first bar to
+        its last, NaN on sessions without a bar. Bars on non-sessions
+        (special sessions such as Muhurat trading) are left out. Built once
+        per stored version of the symbol.
+        """
+        try:
+            stamp = os.stat(os.path.join(self._symbol_dir(symbol), "dates.npy")).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+        key = (symbol, field)
+        with self._dense_lock:
+            entry = self._dense.get(key)
+        if entry is not None and entry[0] == stamp:
+            return entry[1]
+
+        arrays = self.read(symbol)
+        days = np.asarray(arrays["dates"]).astype("datetime64[D]")
+        sessions = self.calendar.is_session(days)
+        positions = self.calendar.position(days[sessions])
+
+        dense = None
+        if len(positions):
+            first = int(positions[0])
+            values = np.full(int(positions[-1]) - first + 1, np.nan)
+            values[positions - first] = np.asarray(arrays[field], dtype=np.float64)[sessions]
+            dense = (first, values)
+
+        with self._dense_lock:
+            self._dense[key] = (stamp, dense)
+        return dense
+
+    # Writing
+    def write(self, symbol, bars):
+        """Merge a DataFrame of OHLCV bars into the stored history for a symbol"""
+        if bars is None or bars.empty:
+            return 0
+
+        new_dates = pd.DatetimeIndex(bars.index).values.astype("datetime64[D]").astype(np.int64)
+        new_cols = {c: bars[c.title()].to_numpy(dtype=np.float64) for c in COLUMNS}
+
+        existing = self.read(symbol, mmap=False)
+        if existing is not None:
+            dates = np.concatenate([existing["dates"], new_dates])
+            cols = {c: np.concatenate([existing[c], new_cols[c]]) for c in COLUMNS}
+        else:
+            dates, cols = new_dates, new_cols
+
+        # Keep the last value written for each date, sorted by date
+        order = np.argsort(dates, kind="stable")[::-1]
+        _, first = np.unique(dates[order], return_index=True)
+        keep = order[first]
+
+        directory = self._symbol_dir(symbol)
+        os.makedirs(directory, exist_ok=True)
+        self._save(directory, "dates", dates[keep])
+        for column in COLUMNS:
+            self._save(directory, column, cols[column][keep])
+
+        with self._dense_lock:
+            for key in [k for k in self._dense if k[0] == symbol]:
+                del self._dense[key]
+        return len(new_dates)
+
+    @staticmethod
+    def _save(directory, name, array):
+        path = os.path.join(directory, f"{name}.npy")
+        tmp = os.path.join(directory, f"{name}.tmp.npy")
+        np.save(tmp, np.ascontiguousarray(array))
+        os.replace(tmp, path)
+
+    # Incremental fill
+    def missing_ranges(self, symbol, start, end):
+        """Return the (start, end) ranges not yet fetched for a symbol"""
+        meta = self._read_meta(symbol)
+        if meta is None:
+            return [(start, end)]
+
+        ranges = []
+        if meta["start"] is not None and (start is None or start < meta["start"]):
+            ranges.append((start, meta["start"] - timedelta(days=1)))
+        if end > meta["end"] or end == meta["end"] == date.today():
+            # Re-fetch the last covered day too, in case it was a partial session
+            ranges.append((meta["end"], end))
+        return ranges
+
+    def _mark_covered(self, symbol, start, end):
+        """Record that ``start..end`` has been fetched for a symbol"""
+        meta = self._read_meta(symbol)
+        if meta is None:
+            covered_start, covered_end = start, end
+        else:
+            covered_start = None if start is None or meta["start"] is None else min(start, meta["start"])
+            covered_end = max(end, meta["end"])
+        self._write_meta(symbol, covered_start, covered_end)
+
+    def update_many(self, symbols, start, end):
+        """Fetch and store missing bars for several symbols in parallel chunks.
+
+        Symbols that need the same date range are downloaded together.
+        Returns a dict of symbol -> error for ranges that could not be fetched.
+        """
+        groups = {}
+        for symbol in symbols:
+            for date_range in self.missing_ranges(symbol, start, end):
+                groups.setdefault(date_range, []).append(symbol)
+
+        failures = {}
+        for (range_start, range_end), group in groups.items():
+            report = self.downloader.download(group, range_start, range_end)
+            failures.update(report.failures)
+            for symbol, bars in report.frames.items():
+                if not self._is_empty(bars):
+                    self.write(symbol, bars)
+                elif self._expects_bars(symbol, range_start, range_end):
+                    # yfinance can swallow an error and return nothing; retry next time
+                    failures[symbol] = ValueError("no data returned")
+
+        for symbol in symbols:
+            if symbol not in failures:
+                self._mark_covered(symbol, start, end)
+        return failures
+
+    @staticmethod
+    def _is_empty(bars):
+        return bars is None or bars.empty or bars["Close"].isna().all()
+
+    def _expects_bars(self, symbol, start, end):
+        """True if ``start..end`` holds a session the symbol should have traded.
+
+        A range that ends before the symbol's first stored bar (history
+        before a listing) may legitimately be empty.
+        """
+        if start is not None and not len(self.calendar.sessions(start, end)):
+            return False
+        meta = self._read_meta(symbol)
+        if meta is None:
+            return True
+        arrays = self.read(symbol)
+        return arrays is None or not len(arrays["dates"]) or \
+            np.datetime64(end, "D") >= np.asarray(arrays["dates"][:1]).astype("datetime64[D]")[0]
+
+    def update(self, symbol, start, end):
+        """Fetch and store any missing bars for one symbol"""
+        failures = self.update_many([symbol], start, end)
+        if symbol in failures:
+            raise failures[symbol]
+
+    def poll(self, symbols, start, end=None, field="close"):
+        """Fetch ``field`` for ``start..end`` straight from the source, ignoring what is covered.
+
+        For live refresh: the session in progress is fetched on every call
+        even though the store already covers it, and nothing is written
+        (the next ``load`` re-fetches today's partial session anyway).
+        Returns ``(frame, failures)`` with one row per session.
+        """
+        end = _to_day(end) or date.today()
+        report = self.downloader.download(list(symbols), _to_day(start), end)
+
+        failures = dict(report.failures)
+        columns = {}
+        for symbol in symbols:
+            bars = report.frames.get(symbol)
+            if bars is None:
+                continue
+            if self._is_empty(bars):
+                failures.setdefault(symbol, ValueError("no data returned"))
+                continue
+            column = bars[field.title()]
+            column.index = pd.DatetimeIndex(column.index).normalize()
+            columns[symbol] = column
+
+        frame = pd.DataFrame(columns).sort_index()
+        if len(frame):
+            frame = frame[self.calendar.is_session(frame.index)]
+        return frame, failures
+
+    def load_panel(self, symbols, period="1y", field="close", end=None):
+        """Load ``field`` for several symbols as a ``PricePanel`` on the trading calendar.
+
+        Missing history is fetched first. Symbols keep their own history:
+        sessions before a listing or on a missed day are invalid rather
+        than dropped, and sessions where no symbol traded are left out.
+        Returns ``(panel, failures)`` where ``failures`` maps symbols with
+        no usable data to the fetch error.
+        """
+        end = _to_day(end) or date.today()
+        start = period_start(period, end)
+
+        errors = self.update_many(symbols, start, end)
+
+        failures = {}
+        series = {}
+        for symbol in symbols:
+            dense = self.dense(symbol, field)
+            if dense is None:
+                failures[symbol] = errors.get(symbol, ValueError("no data"))
+                continue
+            series[symbol] = dense
+
+        return self._panel(series, start, end), failures
+
+    def load(self, symbols, period="1y", field="close", end=None):
+        """Load ``field`` for several symbols as a date-aligned DataFrame.
+
+        Same as ``load_panel``, with NaN where a symbol has no close.
+        """
+        panel, failures = self.load_panel(symbols, period, field, end)
+        return panel.frame(), failures
+
+    def _panel(self, series, start, end):
+        """Slice each symbol's dense history into one (session x symbol) matrix"""
+        if not series:
+            return PricePanel([], [], np.empty((0, 0)))
+
+        first = min(f for f, _ in series.values())
+        last = max(f + len(values) for f, values in series.values())
+        lo = first if start is None else max(first, int(self.calendar.position(start)))
+        hi = min(last, int(self.calendar.position(np.datetime64(end, "D") + 1)))
+        hi = max(hi, lo)
+
+        matrix = np.full((hi - lo, len(series)), np.nan)
+        for j, (f, values) in enumerate(series.values()):
+            a, b = max(lo, f), min(hi, f + len(values))
+            if b > a:
+                matrix[a - lo:b - lo, j] = values[a - f:b - f]
+
+        dates = self.calendar.session(np.arange(lo, hi))
+        return PricePanel(dates, list(series), matrix).compact()
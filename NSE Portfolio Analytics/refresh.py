@@ -0,0 +1,241 @@
+"""
+Auto-refresh for NSE Portfolio Analytics
+
+``RefreshScheduler`` decides how long to wait before the next poll: the
+base interval while the market is open, doubling (up to a cap, and never
+past the next open) while it is closed or nothing new has arrived.
+``LivePortfolio`` takes a poll of the latest bars (fetched directly, not
+through the price store's covered ranges), revises the last bar if the
+session it belongs to has moved on and appends anything newer to an
+``IncrementalRiskState``. A refresh with no new data does no risk work and
+a refresh with one new or revised bar costs one O(N^2) update. ``RefreshStats`` records wall latency and CPU time per poll
+so it is easy to check the loop is idle between refreshes.
+"""
+
+import time
+from datetime import datetime, timedelta, time as dt_time
+from zoneinfo import ZoneInfo
+
+import numpy as np
+import pandas as pd
+
+from risk_engine import IncrementalRiskState, masked_portfolio_returns
+
+MARKET_TZ = ZoneInfo("Asia/Kolkata")
+MARKET_OPEN = dt_time(9, 15)
+MARKET_CLOSE = dt_time(15, 30)
+
+
+def _market_now(now=None):
+    if now is None:
+        return datetime.now(MARKET_TZ)
+    if now.tzinfo is None:
+        return now.replace(tzinfo=MARKET_TZ)
+    return now.astimezone(MARKET_TZ)
+
+
+def market_is_open(now=None):
+    """True during NSE trading hours (Mon-Fri, 09:15-15:30 IST)"""
+    now = _market_now(now)
+    return now.weekday() < 5 and MARKET_OPEN <= now.time() < MARKET_CLOSE
+
+
+def next_market_open(now=None):
+    """Start of the next trading session after ``now``"""
+    now = _market_now(now)
+    day = now.date()
+    if now.time() >= MARKET_OPEN:
+        day += timedelta(days=1)
+    while day.weekday() >= 5:
+        day += timedelta(days=1)
+    return datetime.combine(day, MARKET_OPEN, tzinfo=MARKET_TZ)
+
+
+class RefreshScheduler:
+    """Poll interval with back-off while the market is closed or data is unchanged"""
+
+    def __init__(self, interval=30, max_interval=900):
+        self.interval = interval
+        self.max_interval = max_interval
+        self.delay = interval
+
+    def next_delay(self, changed, now=None):
+        """Seconds to wait before the next poll, given whether the last poll found new data"""
+        if changed:
+            self.delay = self.interval
+        else:
+            self.delay = min(self.delay * 2, self.max_interval)
+
+        if market_is_open(now):
+            # Live session: unchanged polls still back off, but only up to 4x
+            self.delay = min(self.delay, self.interval * 4)
+            return self.delay
+
+        until_open = (next_market_open(now) - _market_now(now)).total_seconds()
+        return max(self.interval, min(self.delay, until_open))
+
+
+class RefreshStats:
+    """Wall-clock latency and CPU time of each refresh"""
+
+    def __init__(self, history=100):
+        self.history = history
+        self.records = []
+        self.started = time.monotonic()
+        self.cpu_started = time.process_time()
+
+    def measure(self, func, *args, **kwargs):
+        """Run ``func`` and record its latency and CPU time"""
+        wall, cpu = time.perf_counter(), time.process_time()
+        result = func(*args, **kwargs)
+        self.records.append({
+            'time': time.monotonic(),
+            'latency': time.perf_counter() - wall,
+            'cpu': time.process_time() - cpu,
+        })
+        del self.records[:-self.history]
+        return result
+
+    def cpu_share(self):
+        """Fraction of wall time spent on CPU since tracking started"""
+        elapsed = time.monotonic() - self.started
+        return (time.process_time() - self.cpu_started) / elapsed if elapsed > 0 else 0.0
+
+    def summary(self):
+        if not self.records:
+            return {'refreshes': 0, 'last_latency': 0.0, 'mean_latency': 0.0, 'cpu_share': self.cpu_share()}
+        latencies = [r['latency'] for r in self.records]
+        return {
+            'refreshes': len(self.records),
+            'last_latency': latencies[-1],
+            'mean_latency': float(np.mean(latencies)),
+            'cpu_share': self.cpu_share(),
+        }
+
+
+class LivePortfolio:
+    """Price history plus incremental risk state, advanced only by new bars.
+
+    Prices and portfolio returns live in growable arrays (doubling like
+    ``SortedQuantiles``), so a new bar is one row write rather than a
+    DataFrame concat over the whole history.
+    """
+
+    def __init__(self, prices, weights, risk_free_rate=0.07):
+        self.weights = np.asarray(weights, dtype=np.float64)
+        self.risk_free_rate = risk_free_rate
+        self.rebuilds = 0
+        self._reset(prices)
+
+    def _reset(self, prices):
+        self.symbols = list(prices.columns)
+        self.state = IncrementalRiskState.from_prices(prices, self.weights, self.risk_free_rate)
+
+        capacity = max(2 * len(prices), 64)
+        self._dates = np.empty(capacity, dtype='datetime64[ns]')
+        self._prices = np.empty((capacity, len(self.symbols)))
+        self._count = len(prices)
+        self._dates[:self._count] = prices.index.to_numpy(dtype='datetime64[ns]')
+        self._prices[:self._count] = prices.to_numpy(dtype=np.float64)
+
+        # Portfolio returns, only for days that have one (dated by their close)
+        returns = masked_portfolio_returns(self._prices[1:self._count] / self._prices[:self._count - 1] - 1,
+                                           self.weights) if self._count > 1 else np.empty(0)
+        kept = ~np.isnan(returns)
+        self._return_dates = np.empty(capacity, dtype='datetime64[ns]')
+        self._returns = np.empty(capacity)
+        self._return_count = int(kept.sum())
+        self._return_dates[:self._return_count] = self._dates[1:self._count][kept]
+        self._returns[:self._return_count] = returns[kept]
+        self.rebuilds += 1
+
+    @property
+    def last_date(self):
+        return pd.Timestamp(self._dates[self._count - 1]) if self._count else None
+
+    @property
+    def prices(self):
+        return pd.DataFrame(self._prices[:self._count], index=pd.DatetimeIndex(self._dates[:self._count]),
+                            columns=self.symbols)
+
+    @property
+    def portfolio_returns(self):
+        return pd.Series(self._returns[:self._return_count],
+                         index=pd.DatetimeIndex(self._return_dates[:self._return_count]))
+
+    def _grow(self):
+        capacity = 2 * len(self._dates)
+        for name in ('_dates', '_prices', '_return_dates', '_returns'):
+            old = getattr(self, name)
+            grown = np.empty((capacity,) + old.shape[1:], dtype=old.dtype)
+            grown[:len(old)] = old
+            setattr(self, name, grown)
+
+    def _portfolio_return(self, row, previous):
+        return masked_portfolio_returns((row / previous - 1)[None, :], self.weights)[0]
+
+    def _append(self, timestamp, row):
+        if self._count == len(self._dates):
+            self._grow()
+        previous = self._prices[self._count - 1]
+        self._dates[self._count] = timestamp
+        self._prices[self._count] = row
+        self._count += 1
+        self.state.update(row, timestamp)
+
+        portfolio_return = self._portfolio_return(row, previous)
+        if not np.isnan(portfolio_return):
+            self._return_dates[self._return_count] = timestamp
+            self._returns[self._return_count] = portfolio_return
+            self._return_count += 1
+
+    def _revise(self, row):
+        """Replace the last bar: take its return back out of the state and the buffers"""
+        last = self._count - 1
+        if self._return_count and self._return_dates[self._return_count - 1] == self._dates[last]:
+            self._return_count -= 1
+        self._prices[last] = row
+        self.state.revise(row)
+
+        if last:
+            portfolio_return = self._portfolio_return(row, self._prices[last - 1])
+            if not np.isnan(portfolio_return):
+                self._return_dates[self._return_count] = self._dates[last]
+                self._returns[self._return_count] = portfolio_return
+                self._return_count += 1
+
+    def apply(self, bars):
+        """Fold the latest bars into the state; returns the dates of bars added or revised.
+
+        ``bars`` only needs to start at the last applied date (a poll of
+        the current session), though a full history works too. A changed
+        last bar (a session still in progress) is revised in place and bars
+        after it are appended; anything older is ignored.
+        """
+        if bars.empty:
+            return []
+        if not self._count:
+            self._reset(bars)
+            return list(bars.index)
+
+        last = self._dates[self._count - 1]
+        bars = bars.iloc[bars.index.searchsorted(last):]
+        if list(bars.columns) != self.symbols:
+            bars = bars.reindex(columns=self.symbols)
+
+        changed = []
+        for timestamp, row in zip(bars.index, bars.to_numpy(dtype=np.float64)):
+            if timestamp.to_datetime64() == last:
+                if not np.allclose(row, self._prices[self._count - 1], equal_nan=True):
+                    self._revise(row)
+                    changed.append(timestamp)
+            else:
+                self._append(timestamp.to_datetime64(), row)
+                changed.append(timestamp)
+        return changed
+
+    def metrics(self):
+        """Same keys as ``calculate_portfolio_metrics``, from the incremental state"""
+        metrics = self.state.metrics()
+        metrics['portfolio_returns'] = self.portfolio_returns
+        return metrics
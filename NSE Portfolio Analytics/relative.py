@@ -0,0 +1,142 @@
+"""
+Benchmark-relative analytics for NSE Portfolio Analytics
+
+Beta, Jensen's alpha, tracking error, information ratio and up/down
+capture of every holding (and the portfolio) against a benchmark index,
+computed for all columns in one vectorized pass over the returns matrix.
+
+Index prices are stored like any other symbol and aligned to the holdings'
+calendar once: ``IndexCalendarCache`` forward-fills the index onto the
+holdings' dates, keeps the resulting daily returns keyed by (index,
+calendar), and serves them until the calendar changes.
+"""
+
+import threading
+
+import numpy as np
+import pandas as pd
+
+from covariance import data_stamp
+from risk_engine import TRADING_DAYS
+from rolling import rolling_frame, rolling_stats
+
+RELATIVE_COLUMNS = ['Beta', 'Alpha', 'Correlation', 'Tracking Error', 'Information Ratio',
+                    'Up Capture', 'Down Capture', 'Excess Return']
+
+
+def align_index(index_prices, dates):
+    """Daily index returns on ``dates`` (the holdings' calendar).
+
+    The index is forward-filled onto ``dates`` so holidays that exist on
+    only one side do not shift returns; the first date has no return.
+    """
+    dates = pd.DatetimeIndex(dates)
+    if index_prices is None or len(index_prices) == 0 or len(dates) < 2:
+        return pd.Series(np.nan, index=dates[1:], dtype=np.float64)
+    combined = index_prices.index.union(dates)
+    aligned = index_prices.reindex(combined).ffill().reindex(dates)
+    return aligned.pct_change(fill_method=None).iloc[1:]
+
+
+class IndexCalendarCache:
+    """Index returns aligned to a holdings calendar, keyed by (index, calendar, index data)"""
+
+    def __init__(self, max_entries=32):
+        self.max_entries = max_entries
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _calendar(dates):
+        return (dates[0], dates[-1], len(dates)) if len(dates) else (None, None, 0)
+
+    def get(self, index, dates, load):
+        """Aligned returns for ``index`` on ``dates``; ``load()`` supplies the index prices.
+
+        The key includes a stamp of the loaded prices, so a revised index
+        bar is re-aligned even when the holdings calendar is unchanged.
+        """
+        prices = load()
+        key = (index, self._calendar(dates), data_stamp(prices))
+        with self._lock:
+            if key in self._entries:
+                self.hits += 1
+                return self._entries[key]
+        self.misses += 1
+
+        aligned = align_index(prices, dates)
+        with self._lock:
+            if key not in self._entries and len(self._entries) >= self.max_entries:
+                self._entries.pop(next(iter(self._entries)))
+            self._entries[key] = aligned
+        return aligned
+
+    def invalidate(self, index=None):
+        """Drop the aligned series for ``index`` (all if None)"""
+        with self._lock:
+            for key in [k for k in self._entries if index is None or k[0] == index]:
+                del self._entries[key]
+
+
+def relative_metrics(returns, benchmark_returns, risk_free_rate=0.07):
+    """Benchmark-relative metrics for every column of ``returns`` in one pass.
+
+    Each column uses the days where both it and the benchmark have a
+    return. Alpha is Jensen's alpha and the capture ratios compare mean
+    returns on the benchmark's up and down days; everything is annualized
+    except beta, correlation and the capture ratios. Returns a DataFrame
+    indexed by column name.
+    """
+    m = benchmark_returns.reindex(returns.index).to_numpy(dtype=np.float64)
+    R = returns.to_numpy(dtype=np.float64)
+    valid = ~np.isnan(R) & ~np.isnan(m)[:, None]
+    n = valid.sum(axis=0)
+
+    if len(R) < 2 or not (n > 1).any():
+        return pd.DataFrame(np.nan, index=returns.columns, columns=RELATIVE_COLUMNS)
+
+    rf = risk_free_rate / TRADING_DAYS
+    X = np.where(valid, R, 0.0)
+    M = np.where(valid, m[:, None], 0.0)
+    up, down = valid & (m > 0)[:, None], valid & (m < 0)[:, None]
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        n = np.where(n > 1, n, np.nan)
+        r_mean, m_mean = X.sum(axis=0) / n, M.sum(axis=0) / n
+        Xc = np.where(valid, X - r_mean, 0.0)
+        Yc = np.where(valid, M - m_mean, 0.0)
+        m_var = (Yc * Yc).sum(axis=0) / (n - 1)
+        cov = (Yc * Xc).sum(axis=0) / (n - 1)
+        r_std = np.sqrt((Xc * Xc).sum(axis=0) / (n - 1))
+
+        active = X - M
+        active_mean = active.sum(axis=0) / n
+        active_c = np.where(valid, active - active_mean, 0.0)
+        tracking_error = np.sqrt((active_c * active_c).sum(axis=0) / (n - 1)) * np.sqrt(TRADING_DAYS)
+
+        beta = cov / m_var
+        alpha = ((r_mean - rf) - beta * (m_mean - rf)) * TRADING_DAYS
+        correlation = cov / (r_std * np.sqrt(m_var))
+        information_ratio = np.where(tracking_error > 0, active_mean * TRADING_DAYS / tracking_error, np.nan)
+        # Same days on both sides, so the ratio of means is the ratio of sums
+        up_capture = (X * up).sum(axis=0) / (M * up).sum(axis=0)
+        down_capture = (X * down).sum(axis=0) / (M * down).sum(axis=0)
+
+    return pd.DataFrame({
+        'Beta': beta,
+        'Alpha': alpha,
+        'Correlation': correlation,
+        'Tracking Error': tracking_error,
+        'Information Ratio': information_ratio,
+        'Up Capture': up_capture,
+        'Down Capture': down_capture,
+        'Excess Return': active_mean * TRADING_DAYS,
+    }, index=returns.columns)
+
+
+def rolling_beta(returns, benchmark_returns, window=60):
+    """Rolling ``window``-day beta of every column as a (date x column) DataFrame"""
+    stats = rolling_stats(returns, benchmark_returns, windows=(window,))
+    return rolling_frame(stats, 'beta', window)
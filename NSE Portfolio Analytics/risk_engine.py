@@ -0,0 +1,350 @@
+"""
+Vectorized risk engine for NSE Portfolio Analytics
+
+Evaluates many weight vectors against the same returns matrix in one pass:
+portfolio returns come from a single matrix multiply and every metric is a
+column-wise NumPy reduction, so P portfolios cost about as much as one.
+IncrementalRiskState keeps the same metrics up to date one bar at a time.
+"""
+
+import numpy as np
+import pandas as pd
+
+TRADING_DAYS = 252
+
+
+def _as_array(data):
+    """Return a float64 ndarray view of a DataFrame/Series/array"""
+    if isinstance(data, (pd.DataFrame, pd.Series)):
+        return data.to_numpy(dtype=np.float64)
+    return np.asarray(data, dtype=np.float64)
+
+
+def align_weights(weights, symbols, columns):
+    """Weights given for ``symbols`` as weights over ``columns`` (the symbols that loaded).
+
+    Symbols without a column are dropped and the rest are scaled back up to
+    the original total, so a failed download does not leave the portfolio
+    partly in cash. ``weights`` is one vector or a (P x len(symbols))
+    matrix. Raises ValueError if a weighted portfolio has no loaded symbol.
+    """
+    W = np.atleast_2d(np.asarray(weights, dtype=np.float64))
+    column = {symbol: j for j, symbol in enumerate(columns)}
+    aligned = np.zeros((len(W), len(column)))
+    for i, symbol in enumerate(symbols):
+        if symbol in column:
+            aligned[:, column[symbol]] += W[:, i]
+
+    totals, loaded = W.sum(axis=1), aligned.sum(axis=1)
+    if np.any((loaded == 0) & (totals != 0)):
+        raise ValueError("None of the weighted symbols have price data")
+    with np.errstate(divide='ignore', invalid='ignore'):
+        aligned *= np.where(loaded != 0, totals / loaded, 0.0)[:, None]
+    return aligned[0] if np.ndim(weights) == 1 else aligned
+
+
+def masked_portfolio_returns(returns, weights):
+    """Daily returns of one portfolio over a (T x N) matrix that may hold NaNs.
+
+    A holding with no return on a day drops out and the remaining weights
+    are scaled back up to the portfolio's total, so the day is earned by
+    the holdings that traded. Days where none of them did are NaN.
+    """
+    R = _as_array(returns)
+    weights = _as_array(weights)
+    valid = ~np.isnan(R)
+    if valid.all():
+        return R @ weights
+
+    held = valid @ weights
+    with np.errstate(divide='ignore', invalid='ignore'):
+        scale = np.where(held != 0, weights.sum() / held, np.nan)
+    return np.where(valid, R, 0.0) @ weights * scale
+
+
+def max_drawdown(portfolio_returns):
+    """Maximum drawdown of each column of a (T x P) returns matrix"""
+    cumulative = np.cumprod(1 + portfolio_returns, axis=0)
+    running_max = np.maximum.accumulate(cumulative, axis=0)
+    return (cumulative / running_max - 1).min(axis=0)
+
+
+def return_metrics(portfolio_returns, risk_free_rate=0.07):
+    """Metrics for each column of a (T x P) matrix of daily portfolio returns.
+
+    Same keys as ``calculate_portfolio_metrics`` (without the returns), each
+    an array of length P.
+    """
+    annual_return = portfolio_returns.mean(axis=0) * TRADING_DAYS
+    annual_vol = portfolio_returns.std(axis=0, ddof=1) * np.sqrt(TRADING_DAYS)
+    var_95, var_99 = np.percentile(portfolio_returns, [5, 1], axis=0)
+
+    return {
+        'annual_return': annual_return,
+        'annual_volatility': annual_vol,
+        'sharpe_ratio': np.divide(
+            annual_return - risk_free_rate, annual_vol,
+            out=np.zeros_like(annual_vol), where=annual_vol > 0
+        ),
+        'var_95': var_95,
+        'var_99': var_99,
+        'max_drawdown': max_drawdown(portfolio_returns),
+    }
+
+
+def batch_portfolio_metrics(returns, weights, risk_free_rate=0.07, chunk_size=1024,
+                            include_returns=False):
+    """Calculate portfolio metrics for many portfolios at once.
+
+    ``returns`` is a (T x N) matrix of daily asset returns and ``weights`` a
+    (P x N) matrix with one portfolio per row. Returns a dict with the same
+    keys as ``calculate_portfolio_metrics``, each holding an array of length
+    P. Portfolios are processed ``chunk_size`` at a time to bound memory.
+    Missing (NaN) returns are handled as in ``masked_portfolio_returns``,
+    except that a day none of a portfolio's holdings traded counts as flat.
+    """
+    R = _as_array(returns)
+    W = np.atleast_2d(_as_array(weights))
+
+    if R.ndim != 2 or W.shape[1] != R.shape[1]:
+        raise ValueError(f"weights have {W.shape[1]} assets, returns have {R.shape[-1]}")
+
+    n_portfolios = W.shape[0]
+    if len(R) == 0:
+        return {}
+
+    metrics = {
+        'annual_return': np.empty(n_portfolios),
+        'annual_volatility': np.empty(n_portfolios),
+        'sharpe_ratio': np.empty(n_portfolios),
+        'var_95': np.empty(n_portfolios),
+        'var_99': np.empty(n_portfolios),
+        'max_drawdown': np.empty(n_portfolios),
+    }
+    if include_returns:
+        metrics['portfolio_returns'] = np.empty((len(R), n_portfolios))
+
+    valid = ~np.isnan(R)
+    V = None
+    if not valid.all():
+        V = valid.astype(np.float64)
+        R = np.where(valid, R, 0.0)
+
+    for start in range(0, n_portfolios, chunk_size):
+        block = slice(start, start + chunk_size)
+
+        # (T x N) @ (N x P) -> one column of daily returns per portfolio
+        portfolio_returns = R @ W[block].T
+        if V is not None:
+            held = V @ W[block].T
+            with np.errstate(divide='ignore', invalid='ignore'):
+                portfolio_returns = np.where(held != 0, portfolio_returns * W[block].sum(axis=1) / held, 0.0)
+
+        for key, values in return_metrics(portfolio_returns, risk_free_rate).items():
+            metrics[key][block] = values
+
+        if include_returns:
+            metrics['portfolio_returns'][:, block] = portfolio_returns
+
+    return metrics
+
+
+def metrics_frame(metrics, names=None):
+    """Arrange batch metrics as a DataFrame with one row per portfolio"""
+    columns = {k: v for k, v in metrics.items() if k != 'portfolio_returns'}
+    return pd.DataFrame(columns, index=names)
+
+
+# Incremental updates
+class SortedQuantiles:
+    """Exact running quantiles over a sorted buffer.
+
+    Daily histories are a few thousand points, so keeping every value sorted
+    (binary search + one memmove per insert) is cheaper than the error of an
+    approximate sketch and reproduces ``np.percentile`` exactly.
+    """
+
+    def __init__(self, capacity=1024):
+        self._values = np.empty(capacity)
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    def add(self, value):
+        if self._count == len(self._values):
+            self._values = np.concatenate([self._values, np.empty(len(self._values))])
+        i = np.searchsorted(self._values[:self._count], value)
+        self._values[i + 1:self._count + 1] = self._values[i:self._count]
+        self._values[i] = value
+        self._count += 1
+
+    def remove(self, value):
+        """Remove one occurrence of ``value`` (as previously added)"""
+        i = np.searchsorted(self._values[:self._count], value)
+        if i == self._count or self._values[i] != value:
+            raise ValueError(f"{value} is not in the buffer")
+        self._values[i:self._count - 1] = self._values[i + 1:self._count]
+        self._count -= 1
+
+    def percentile(self, q):
+        """Percentile ``q`` (0-100) with linear interpolation, like np.percentile"""
+        if self._count == 0:
+            return 0
+        position = (self._count - 1) * q / 100
+        lower = int(np.floor(position))
+        upper = min(lower + 1, self._count - 1)
+        fraction = position - lower
+        return self._values[lower] + (self._values[upper] - self._values[lower]) * fraction
+
+
+class IncrementalRiskState:
+    """Running portfolio risk state updated one price bar at a time.
+
+    Keeps Welford moments for the portfolio, a running co-moment matrix for
+    the assets, the running peak/drawdown and a quantile buffer for VaR, so
+    each new bar costs O(N^2) instead of recomputing over the full history.
+    The last bar can be revised (e.g. a session still in progress): its
+    contribution is removed by reversing the Welford step and the bar is
+    added again.
+    """
+
+    def __init__(self, symbols, weights, risk_free_rate=0.07):
+        self.symbols = list(symbols)
+        self.weights = np.asarray(weights, dtype=np.float64)
+        self.risk_free_rate = risk_free_rate
+
+        n = len(self.symbols)
+        self.last_prices = None
+        self.last_date = None
+        self.count = 0
+
+        # Enough to take the last bar back out: the prices before it and
+        # what its return changed
+        self._previous_prices = None
+        self._undo = None
+
+        # Portfolio return moments
+        self._mean = 0.0
+        self._m2 = 0.0
+
+        # Asset return moments
+        self._asset_mean = np.zeros(n)
+        self._comoment = np.zeros((n, n))
+
+        # Drawdown
+        self._cumulative = 1.0
+        self._peak = -np.inf
+        self._max_drawdown = 0.0
+
+        self._quantiles = SortedQuantiles()
+
+    @classmethod
+    def from_prices(cls, price_data, weights, risk_free_rate=0.07):
+        """Build a state by replaying a price DataFrame bar by bar"""
+        state = cls(price_data.columns, weights, risk_free_rate)
+        for timestamp, row in zip(price_data.index, price_data.to_numpy(dtype=np.float64)):
+            state.update(row, timestamp)
+        return state
+
+    def update(self, prices, timestamp=None):
+        """Add one bar of close prices (aligned with ``symbols``)"""
+        prices = np.asarray(prices, dtype=np.float64)
+
+        self._undo = None
+        if self.last_prices is not None:
+            self._add_returns(prices / self.last_prices - 1)
+
+        self._previous_prices = self.last_prices
+        self.last_prices = prices
+        self.last_date = timestamp
+
+    def revise(self, prices, timestamp=None):
+        """Replace the last bar with ``prices``, as if it had been added that way"""
+        if self._undo is not None:
+            self._remove_returns()
+        self.last_prices = self._previous_prices
+        self.update(prices, self.last_date if timestamp is None else timestamp)
+
+    def _remove_returns(self):
+        """Reverse the last ``_add_returns``"""
+        portfolio_return, asset_returns, asset_mean, drawdown = self._undo
+        n = self.count
+
+        self._comoment -= np.outer(asset_returns - asset_mean, asset_returns - self._asset_mean)
+        self._asset_mean = asset_mean
+
+        mean = (n * self._mean - portfolio_return) / (n - 1) if n > 1 else 0.0
+        self._m2 = self._m2 - (portfolio_return - mean) * (portfolio_return - self._mean) if n > 1 else 0.0
+        self._mean = mean
+        self.count -= 1
+
+        self._cumulative, self._peak, self._max_drawdown = drawdown
+        self._quantiles.remove(portfolio_return)
+        self._undo = None
+
+    def _add_returns(self, asset_returns):
+        valid = ~np.isnan(asset_returns)
+        if not valid.all():
+            # Same treatment as masked_portfolio_returns; a missing asset
+            # return counts as its running mean in the co-moments
+            held = self.weights[valid].sum()
+            if held == 0:
+                return
+            portfolio_return = float(asset_returns[valid] @ self.weights[valid]) * self.weights.sum() / held
+            asset_returns = np.where(valid, asset_returns, self._asset_mean)
+        else:
+            portfolio_return = float(asset_returns @ self.weights)
+
+        self._undo = (portfolio_return, asset_returns, self._asset_mean.copy(),
+                      (self._cumulative, self._peak, self._max_drawdown))
+        self.count += 1
+        n = self.count
+
+        # Welford update for the portfolio and the asset covariance
+        delta = portfolio_return - self._mean
+        self._mean += delta / n
+        self._m2 += delta * (portfolio_return - self._mean)
+
+        asset_delta = asset_returns - self._asset_mean
+        self._asset_mean += asset_delta / n
+        self._comoment += np.outer(asset_delta, asset_returns - self._asset_mean)
+
+        # Drawdown against the running peak of cumulative growth
+        self._cumulative *= 1 + portfolio_return
+        self._peak = max(self._peak, self._cumulative)
+        self._max_drawdown = min(self._max_drawdown, self._cumulative / self._peak - 1)
+
+        self._quantiles.add(portfolio_return)
+
+    def covariance(self):
+        """Sample covariance matrix of asset returns"""
+        if self.count < 2:
+            return pd.DataFrame(np.nan, index=self.symbols, columns=self.symbols)
+        return pd.DataFrame(self._comoment / (self.count - 1),
+                            index=self.symbols, columns=self.symbols)
+
+    def correlation(self):
+        """Correlation matrix of asset returns"""
+        cov = self.covariance().to_numpy()
+        std = np.sqrt(np.diag(cov))
+        return pd.DataFrame(cov / np.outer(std, std), index=self.symbols, columns=self.symbols)
+
+    def metrics(self):
+        """Current metrics, with the same keys as ``calculate_portfolio_metrics``"""
+        if self.count == 0:
+            return {}
+
+        annual_return = self._mean * TRADING_DAYS
+        variance = self._m2 / (self.count - 1) if self.count > 1 else np.nan
+        annual_vol = np.sqrt(variance) * np.sqrt(TRADING_DAYS)
+        sharpe_ratio = (annual_return - self.risk_free_rate) / annual_vol if annual_vol > 0 else 0
+
+        return {
+            'annual_return': annual_return,
+            'annual_volatility': annual_vol,
+            'sharpe_ratio': sharpe_ratio,
+            'var_95': self._quantiles.percentile(5),
+            'var_99': self._quantiles.percentile(1),
+            'max_drawdown': self._max_drawdown,
+        }
@@ -0,0 +1,96 @@
+"""
+Rolling-window risk analytics for NSE Portfolio Analytics
+
+Rolling volatility, Sharpe ratio, beta and correlation against a benchmark
+for every symbol and every window length. Window sums come from cumulative
+sums (S[t] - S[t - w]), so each step costs O(1) per symbol no matter how
+long the window is. Results are 3-D arrays indexed (window, date, symbol).
+Days a symbol has no return are left out of its windows.
+"""
+
+import numpy as np
+import pandas as pd
+
+TRADING_DAYS = 252
+DEFAULT_WINDOWS = (20, 60, 252)
+METRICS = ["volatility", "sharpe", "beta", "correlation"]
+
+
+def _window_sums(cumulative, window):
+    """Sum over the trailing ``window`` rows from a cumulative sum with a zero row on top"""
+    sums = np.full((len(cumulative) - 1,) + cumulative.shape[1:], np.nan)
+    sums[window - 1:] = cumulative[window:] - cumulative[:-window]
+    return sums
+
+
+def rolling_stats(returns, benchmark_returns, windows=DEFAULT_WINDOWS, risk_free_rate=0.07):
+    """Rolling metrics for all symbols and windows.
+
+    ``returns`` is a (T x N) DataFrame of daily returns and
+    ``benchmark_returns`` a Series on the same dates. Returns a dict with
+    the 3-D arrays for each name in METRICS plus the ``windows``,
+    ``index`` and ``symbols`` labelling their axes.
+    """
+    R = returns.to_numpy(dtype=np.float64)
+    # Days missing from the benchmark count as flat
+    m = np.nan_to_num(benchmark_returns.reindex(returns.index).to_numpy(dtype=np.float64))
+    valid = ~np.isnan(R)
+    complete = valid.all()
+
+    # Centre the data so the running sums of squares do not lose precision
+    with np.errstate(invalid='ignore'):
+        r_shift = R.mean(axis=0) if complete else np.nanmean(np.where(valid.any(axis=0), R, 0.0), axis=0)
+    m_shift = m.mean()
+    X = np.where(valid, R - r_shift, 0.0)
+    # With gaps the benchmark sums are taken over each symbol's own days
+    Y = (m - m_shift)[:, None] if complete else (m - m_shift)[:, None] * valid
+
+    def cumulative(values):
+        out = np.zeros((len(values) + 1,) + values.shape[1:])
+        np.cumsum(values, axis=0, out=out[1:])
+        return out
+
+    sx, sxx = cumulative(X), cumulative(X * X)
+    sy, syy = cumulative(Y), cumulative(Y * Y)
+    sxy = cumulative(X * Y)
+    counts = None if complete else cumulative(valid.astype(np.float64))
+
+    shape = (len(windows), len(R), R.shape[1])
+    result = {name: np.full(shape, np.nan) for name in METRICS}
+
+    for k, w in enumerate(windows):
+        if w < 2 or w > len(R):
+            continue
+        n = w
+        if counts is not None:
+            n = _window_sums(counts, w)
+            n[n < 2] = np.nan
+
+        mean_x = _window_sums(sx, w) / n
+        mean_y = _window_sums(sy, w) / n
+        var_x = (_window_sums(sxx, w) - n * mean_x ** 2) / (n - 1)
+        var_y = (_window_sums(syy, w) - n * mean_y ** 2) / (n - 1)
+        cov_xy = (_window_sums(sxy, w) - n * mean_x * mean_y) / (n - 1)
+
+        var_x = np.maximum(var_x, 0)
+        var_y = np.maximum(var_y, 0)
+        std_x = np.sqrt(var_x)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            annual_vol = std_x * np.sqrt(TRADING_DAYS)
+            annual_return = (mean_x + r_shift) * TRADING_DAYS
+            result['volatility'][k] = annual_vol
+            result['sharpe'][k] = np.where(annual_vol > 0, (annual_return - risk_free_rate) / annual_vol, 0)
+            result['beta'][k] = cov_xy / var_y
+            result['correlation'][k] = cov_xy / (std_x * np.sqrt(var_y))
+
+    result['windows'] = list(windows)
+    result['index'] = returns.index
+    result['symbols'] = list(returns.columns)
+    return result
+
+
+def rolling_frame(stats, metric, window):
+    """One metric for one window as a (date x symbol) DataFrame"""
+    k = stats['windows'].index(window)
+    return pd.DataFrame(stats[metric][k], index=stats['index'], columns=stats['symbols'])
@@ -0,0 +1,185 @@
+"""
+Universe screener for NSE Portfolio Analytics
+
+Screens whole universes (NIFTY 50, or 1,000+ symbols read from a file)
+rather than the handful of holdings in a portfolio. Per-stock metrics are
+computed by ``engine.calculate_stock_metrics`` over column chunks on a
+thread pool (the work is NumPy reductions, which release the GIL), and
+every symbol is assigned a correlation cluster by average-linkage
+clustering of ``1 - correlation``. The result is wrapped in a
+``ScreenIndex`` that keeps each metric column as an array with its sort
+order precomputed, so sorting, range filters and top-k queries do not
+re-sort or touch pandas.
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+from scipy.cluster.hierarchy import fcluster, linkage
+
+from config import NIFTY_50_STOCKS, SECTOR_MAPPING
+from correlation_structure import condensed_correlation
+from engine import calculate_stock_metrics
+
+SCREEN_COLUMNS = ['Annual Return', 'Volatility', 'Sharpe Ratio', 'Sortino Ratio', 'Beta',
+                  'Max Drawdown', 'Skew', 'Kurtosis', 'Current Price']
+
+
+def parse_universe(text):
+    """Symbols from one-per-line text or CSV text with a ``Symbol`` column.
+
+    Blank lines and ``#`` comments are ignored and duplicates dropped.
+    """
+    lines = [line.split('#')[0].strip() for line in text.splitlines()]
+    lines = [line for line in lines if line]
+    if lines and ',' in lines[0]:
+        header = [c.strip().lower() for c in lines[0].split(',')]
+        column = header.index('symbol') if 'symbol' in header else 0
+        lines = [line.split(',')[column].strip() for line in lines[1:]]
+
+    return list(dict.fromkeys(s.upper() for s in lines if s))
+
+
+def load_universe(path=None):
+    """Symbols from a file (see ``parse_universe``), or NIFTY 50 with no ``path``"""
+    if path is None:
+        return list(NIFTY_50_STOCKS)
+    with open(path) as f:
+        return parse_universe(f.read())
+
+
+def prepare_prices(prices, min_coverage=0.9):
+    """Fill gaps so every kept column has a full history; returns ``(prices, skipped)``.
+
+    Interior gaps are forward-filled. Symbols with fewer than
+    ``min_coverage`` of the window's days are skipped; the rest have any
+    missing leading days held at their first price (zero return).
+    """
+    coverage = prices.notna().mean()
+    skipped = list(coverage.index[coverage < min_coverage])
+    kept = prices.drop(columns=skipped).ffill().bfill()
+    return kept, skipped
+
+
+def correlation_clusters(returns, n_clusters=10):
+    """Average-linkage clusters of ``1 - correlation``, numbered 1.. by size"""
+    R = np.asarray(returns, dtype=np.float64)
+    n = R.shape[1]
+    if n < 2:
+        return np.ones(n, dtype=int)
+
+    std = R.std(axis=0, ddof=1)
+    std[std == 0] = 1.0
+    Z = (R - R.mean(axis=0)) / std
+    corr = Z.T @ Z / (len(R) - 1)
+
+    # Condensed upper triangle, the form linkage expects
+    distances = condensed_correlation(corr)
+    np.subtract(1, distances, out=distances)
+    np.clip(distances, 0, 2, out=distances)
+    labels = fcluster(linkage(distances, method='average'), min(n_clusters, n), criterion='maxclust')
+
+    # Renumber so cluster 1 is the largest
+    sizes = np.bincount(labels)
+    rank = np.empty(len(sizes), dtype=int)
+    rank[np.argsort(-sizes, kind='stable')] = np.arange(len(sizes))
+    return rank[labels] + 1
+
+
+class ScreenIndex:
+    """Screen results with per-column sort orders for fast queries"""
+
+    def __init__(self, table, skipped=(), elapsed=0.0):
+        self.table = table.reset_index(drop=True)
+        self.skipped = list(skipped)
+        self.elapsed = elapsed
+        self._values = {c: self.table[c].to_numpy(dtype=np.float64) for c in SCREEN_COLUMNS}
+        self._sectors = self.table['Sector'].to_numpy()
+        self._clusters = self.table['Cluster'].to_numpy()
+
+        # Ascending and descending orders, NaNs last in both
+        self._order = {}
+        for column, values in self._values.items():
+            ascending = np.argsort(values, kind='stable')
+            n_valid = int((~np.isnan(values)).sum())
+            descending = np.r_[ascending[:n_valid][::-1], ascending[n_valid:]]
+            self._order[column] = (ascending, descending)
+
+    def __len__(self):
+        return len(self.table)
+
+    def sectors(self):
+        return sorted(set(self._sectors))
+
+    def clusters(self):
+        return sorted(set(self._clusters.tolist()))
+
+    def mask(self, filters=None, sectors=None, clusters=None):
+        """Boolean row mask; ``filters`` maps a column to ``(low, high)``, either may be None"""
+        mask = np.ones(len(self.table), dtype=bool)
+        for column, (low, high) in (filters or {}).items():
+            values = self._values[column]
+            if low is not None:
+                mask &= values >= low
+            if high is not None:
+                mask &= values <= high
+        if sectors:
+            mask &= np.isin(self._sectors, list(sectors))
+        if clusters:
+            mask &= np.isin(self._clusters, list(clusters))
+        return mask
+
+    def query(self, sort_by='Sharpe Ratio', ascending=False, top=None, filters=None,
+              sectors=None, clusters=None):
+        """Rows passing the filters, sorted by ``sort_by``, optionally only the first ``top``"""
+        order = self._order[sort_by][0 if ascending else 1]
+        mask = self.mask(filters, sectors, clusters)
+        rows = order[mask[order]]
+        if top is not None:
+            rows = rows[:top]
+        return self.table.iloc[rows].reset_index(drop=True)
+
+    def top(self, column, k=10, ascending=False):
+        """The ``k`` best rows by ``column`` (largest first unless ``ascending``)"""
+        return self.query(column, ascending=ascending, top=k)
+
+    def cluster_summary(self):
+        """Size, sector mix and average metrics per correlation cluster"""
+        grouped = self.table.groupby('Cluster')
+        summary = grouped[['Annual Return', 'Volatility', 'Sharpe Ratio']].mean()
+        summary.insert(0, 'Stocks', grouped.size())
+        summary['Main Sector'] = grouped['Sector'].agg(lambda s: s.value_counts().index[0])
+        return summary.reset_index()
+
+
+def screen(prices, benchmark_returns=None, risk_free_rate=0.07, n_clusters=10,
+           chunk_size=250, max_workers=4, min_coverage=0.9):
+    """Metrics and correlation clusters for every column of ``prices``.
+
+    Without ``benchmark_returns``, beta is measured against the equal-
+    weighted average of the universe. Returns a ``ScreenIndex``.
+    """
+    started = time.perf_counter()
+    prices, skipped = prepare_prices(prices, min_coverage)
+    if prices.shape[1] == 0 or len(prices) < 3:
+        empty = pd.DataFrame(columns=['Stock', 'Sector', 'Cluster'] + SCREEN_COLUMNS)
+        return ScreenIndex(empty, list(skipped) + list(prices.columns), time.perf_counter() - started)
+
+    values = prices.to_numpy(dtype=np.float64)
+    returns = values[1:] / values[:-1] - 1
+    if benchmark_returns is None:
+        benchmark_returns = pd.Series(returns.mean(axis=1), index=prices.index[1:])
+
+    symbols = list(prices.columns)
+    chunks = [prices.iloc[:, i:i + chunk_size] for i in range(0, len(symbols), chunk_size)]
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        parts = list(pool.map(
+            lambda chunk: calculate_stock_metrics(chunk, benchmark_returns, risk_free_rate), chunks
+        ))
+
+    table = pd.concat(parts, ignore_index=True)
+    table.insert(1, 'Sector', [SECTOR_MAPPING.get(s, 'Other') for s in symbols])
+    table.insert(2, 'Cluster', correlation_clusters(returns, n_clusters))
+    return ScreenIndex(table, skipped, time.perf_counter() - started)
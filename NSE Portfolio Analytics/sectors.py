@@ -0,0 +1,143 @@
+"""
+Sector analytics for NSE Portfolio Analytics
+
+Symbols are rolled up into sectors with a sparse (N x S) membership matrix
+built from SECTOR_MAPPING. Scaling each column by the holdings' weights
+gives an aggregation matrix, so the sector return series for the whole
+universe is a single sparse matmul against the returns matrix, and sector
+risk contributions are the same matrix applied to the per-asset Euler
+contributions. Results are cached like covariance estimates: by
+(universe, period, weights), and rebuilt as soon as new rows arrive.
+"""
+
+import threading
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from config import SECTOR_MAPPING
+from covariance import data_stamp
+from risk_engine import TRADING_DAYS
+
+
+def sector_matrix(symbols, mapping=None):
+    """Sorted sector names and the sparse (N x S) 0/1 membership matrix"""
+    mapping = SECTOR_MAPPING if mapping is None else mapping
+    labels = [mapping.get(symbol, "Other") for symbol in symbols]
+    sectors = sorted(set(labels))
+    column = {sector: k for k, sector in enumerate(sectors)}
+    rows = np.arange(len(symbols))
+    cols = np.array([column[label] for label in labels], dtype=np.int64)
+    membership = sparse.csr_matrix((np.ones(len(symbols)), (rows, cols)),
+                                   shape=(len(symbols), len(sectors)))
+    return sectors, membership
+
+
+class SectorAnalytics:
+    """Sector return series, risk and correlation for one set of holdings.
+
+    Within a sector, members are combined by their portfolio weights (equal
+    weights when ``weights`` is None or the sector's weights are all zero),
+    rescaled on days some members have no return.
+    """
+
+    def __init__(self, returns, weights=None, mapping=None):
+        self.symbols = list(returns.columns)
+        self.sectors, self.membership = sector_matrix(self.symbols, mapping)
+
+        weights = np.ones(len(self.symbols)) if weights is None else np.asarray(weights, dtype=np.float64)
+        totals = self.membership.T @ weights
+        self.weights = weights / weights.sum()
+        self.sector_weights = pd.Series(totals / totals.sum(), index=self.sectors)
+        self.counts = pd.Series(np.asarray(self.membership.sum(axis=0)).ravel().astype(int), index=self.sectors)
+
+        # (N x S) aggregation matrix: each column holds a sector's member weights summing to one
+        within = np.where(totals[self.membership.indices] > 0, weights, 1.0)
+        aggregation = sparse.diags(within) @ self.membership @ sparse.diags(1 / (self.membership.T @ within))
+        R = returns.to_numpy(dtype=np.float64)
+        valid = ~np.isnan(R)
+        sector_returns = (aggregation.T @ np.where(valid, R, 0.0).T).T
+        if not valid.all():
+            # On days a member has no return the sector is the weighted average of the others
+            with np.errstate(divide='ignore', invalid='ignore'):
+                sector_returns = sector_returns / (aggregation.T @ valid.T.astype(np.float64)).T
+        self.returns = pd.DataFrame(sector_returns, index=returns.index, columns=self.sectors)
+
+    def annual_return(self):
+        return self.returns.mean() * TRADING_DAYS
+
+    def volatility(self):
+        return self.returns.std() * np.sqrt(TRADING_DAYS)
+
+    def correlation(self):
+        return self.returns.corr()
+
+    def risk_contribution(self, covariance):
+        """Each sector's share of portfolio volatility, given the asset covariance.
+
+        Asset Euler contributions ``w_i (Σw)_i / σ`` sum to σ; the membership
+        matrix adds them up per sector.
+        """
+        cov = np.asarray(covariance, dtype=np.float64)
+        marginal = cov @ self.weights
+        volatility = np.sqrt(self.weights @ marginal)
+        component = self.weights * marginal / volatility if volatility > 0 else np.zeros(len(self.weights))
+        return pd.Series(self.membership.T @ component * np.sqrt(TRADING_DAYS), index=self.sectors)
+
+    def summary(self, covariance):
+        """One row per sector, largest weight first"""
+        contribution = self.risk_contribution(covariance)
+        frame = pd.DataFrame({
+            'Sector': self.sectors,
+            'Stocks': self.counts.to_numpy(),
+            'Weight': self.sector_weights.to_numpy(),
+            'Annual Return': self.annual_return().to_numpy(),
+            'Volatility': self.volatility().to_numpy(),
+            'Risk Contribution': contribution.to_numpy(),
+            'Risk Share': (contribution / contribution.sum()).to_numpy(),
+        })
+        return frame.sort_values('Weight', ascending=False).reset_index(drop=True)
+
+
+class SectorCache:
+    """Sector analytics keyed by (universe, period, weights)"""
+
+    def __init__(self, max_entries=64):
+        self.max_entries = max_entries
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, returns, weights=None, period=None):
+        """Cached ``SectorAnalytics``; rebuilt when rows have arrived or changed"""
+        key = (tuple(returns.columns), period, None if weights is None else tuple(np.round(weights, 12)))
+        stamp = data_stamp(returns)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == stamp:
+                self.hits += 1
+                return entry[1]
+        self.misses += 1
+
+        analytics = SectorAnalytics(returns, weights)
+        with self._lock:
+            if key not in self._entries and len(self._entries) >= self.max_entries:
+                self._entries.pop(next(iter(self._entries)))
+            self._entries[key] = (stamp, analytics)
+        return analytics
+
+    def invalidate(self, symbols=None):
+        """Drop entries whose universe contains any of ``symbols`` (all if None)"""
+        with self._lock:
+            if symbols is None:
+                self._entries.clear()
+                return
+            symbols = set(symbols)
+            for key in [k for k in self._entries if symbols & set(k[0])]:
+                del self._entries[key]
+
+
+sector_cache = SectorCache()
@@ -0,0 +1,205 @@
+"""
+Stress testing for NSE Portfolio Analytics
+
+A scenario is a vector of instantaneous returns, one per symbol. Scenarios
+are stacked into an (S x N) shock matrix and portfolios into the (N x P)
+weight matrix used by the backtester, so the stress P&L of every scenario
+on every portfolio is one matrix product.
+
+Shocks come from three sources:
+
+- sector shocks: a return per sector, spread to its members through the
+  sparse membership matrix from ``sectors``;
+- index shocks: a market move scaled by each symbol's beta;
+- historical windows (2008, March 2020, ...) replayed from local prices,
+  with symbols that did not trade through a window proxied by
+  beta x the market's move over it.
+"""
+
+import numpy as np
+import pandas as pd
+
+from backtest import weight_matrix
+from sectors import sector_matrix
+
+# Peak-to-trough NIFTY 50 windows
+HISTORICAL_SCENARIOS = {
+    "2008 Financial Crisis": ("2008-01-08", "2008-10-27"),
+    "2011 Euro Debt Crisis": ("2010-11-05", "2011-12-20"),
+    "2013 Taper Tantrum": ("2013-05-20", "2013-08-28"),
+    "2016 Demonetisation": ("2016-11-08", "2016-12-26"),
+    "2020 COVID Crash": ("2020-01-14", "2020-03-23"),
+    "2022 Rate Hikes": ("2022-01-17", "2022-06-17"),
+}
+
+INDEX_SHOCKS = [-0.05, -0.10, -0.20, -0.30]
+SECTOR_SHOCKS = [-0.10, -0.25]
+
+
+def estimate_betas(returns, market_returns=None, min_days=20):
+    """Beta of each column to ``market_returns`` (default: the equal-weighted average).
+
+    NaNs are skipped per column; symbols with fewer than ``min_days``
+    overlapping days get a beta of 1.
+    """
+    R = returns.to_numpy(dtype=np.float64)
+    if market_returns is None:
+        m = np.nanmean(R, axis=1)
+    else:
+        m = market_returns.reindex(returns.index).to_numpy(dtype=np.float64)
+
+    valid = ~np.isnan(R) & ~np.isnan(m)[:, None]
+    M = np.where(valid, m[:, None], 0.0)
+    Y = np.where(valid, R, 0.0)
+    n = valid.sum(axis=0)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sx, sy = M.sum(axis=0), Y.sum(axis=0)
+        covariance = (M * Y).sum(axis=0) - sx * sy / n
+        variance = (M * M).sum(axis=0) - sx * sx / n
+        beta = covariance / variance
+    return pd.Series(np.where((n >= min_days) & (variance > 0), beta, 1.0), index=returns.columns)
+
+
+def window_returns(prices, start, end):
+    """Each column's return from the last close on/before ``start`` to the last on/before ``end``.
+
+    Columns without a price at both ends are NaN.
+    """
+    index = prices.index
+    lo = index.searchsorted(pd.Timestamp(start), side="right") - 1
+    hi = index.searchsorted(pd.Timestamp(end), side="right") - 1
+    if lo < 0 or hi <= lo:
+        return pd.Series(np.nan, index=prices.columns)
+    values = prices.to_numpy(dtype=np.float64)
+    return pd.Series(values[hi] / values[lo] - 1, index=prices.columns)
+
+
+class ScenarioSet:
+    """Named shock vectors over a fixed list of symbols"""
+
+    def __init__(self, symbols, betas=None, sector_mapping=None):
+        self.symbols = list(symbols)
+        self.betas = np.ones(len(self.symbols)) if betas is None else \
+            pd.Series(betas).reindex(self.symbols).fillna(1.0).to_numpy(dtype=np.float64)
+        self.sectors, self.membership = sector_matrix(self.symbols, sector_mapping)
+        self.names = []
+        self.kinds = []
+        self._shocks = []
+
+    def __len__(self):
+        return len(self.names)
+
+    def add(self, name, shocks, kind="custom"):
+        """Add a scenario from a full shock vector, or a ``{symbol: return}`` dict (others 0)"""
+        if isinstance(shocks, dict):
+            shocks = pd.Series(shocks).reindex(self.symbols).fillna(0.0)
+        vector = np.asarray(shocks, dtype=np.float64)
+        if vector.shape != (len(self.symbols),):
+            raise ValueError(f"Scenario {name!r} has {vector.size} shocks for {len(self.symbols)} symbols")
+        self.names.append(name)
+        self.kinds.append(kind)
+        self._shocks.append(vector)
+
+    def add_sector_shock(self, name, sector_shocks):
+        """Shock whole sectors, e.g. ``{"Banking": -0.2}``; other sectors are unchanged"""
+        sector_vector = np.array([sector_shocks.get(sector, 0.0) for sector in self.sectors])
+        self.add(name, self.membership @ sector_vector, kind="sector")
+
+    def add_index_shock(self, name, move):
+        """Market move of ``move``, passed through to each symbol by its beta"""
+        self.add(name, self.betas * move, kind="index")
+
+    def add_historical(self, name, prices, start, end, market_move=None):
+        """Replay the ``start``..``end`` window from ``prices``.
+
+        Symbols missing either end of the window move by beta x the market
+        move (``market_move``, or the average of the symbols that traded).
+        Returns the fraction of symbols with actual history.
+        """
+        actual = window_returns(prices, start, end).reindex(self.symbols).to_numpy()
+        covered = ~np.isnan(actual)
+        if market_move is None:
+            market_move = actual[covered].mean() if covered.any() else np.nan
+        if np.isnan(market_move):
+            return 0.0
+        self.add(name, np.where(covered, actual, self.betas * market_move), kind="historical")
+        return covered.mean()
+
+    def add_defaults(self, prices=None, market=None, index_shocks=INDEX_SHOCKS, sector_shocks=SECTOR_SHOCKS,
+                     historical=HISTORICAL_SCENARIOS):
+        """Index moves, a shock per sector and level, and historical windows from ``prices``.
+
+        ``market`` is an optional index price series used for the market
+        move of each historical window.
+        """
+        for move in index_shocks:
+            self.add_index_shock(f"Market {move:+.0%}", move)
+        for sector in self.sectors:
+            for move in sector_shocks:
+                self.add_sector_shock(f"{sector} {move:+.0%}", {sector: move})
+        if prices is not None:
+            for name, (start, end) in historical.items():
+                market_move = None
+                if market is not None:
+                    market_move = window_returns(market.to_frame(), start, end).iloc[0]
+                    market_move = None if np.isnan(market_move) else market_move
+                self.add_historical(name, prices, start, end, market_move)
+        return self
+
+    def matrix(self):
+        """(S x N) shock matrix"""
+        if not self._shocks:
+            return np.zeros((0, len(self.symbols)))
+        return np.vstack(self._shocks)
+
+    def frame(self):
+        return pd.DataFrame(self.matrix(), index=self.names, columns=self.symbols)
+
+
+class StressReport:
+    """Scenario x portfolio P&L, as returns and in rupees"""
+
+    def __init__(self, returns, kinds, portfolio_value):
+        self.returns = returns
+        self.kinds = pd.Series(kinds, index=returns.index)
+        self.portfolio_value = portfolio_value
+
+    @property
+    def pnl(self):
+        return self.returns * self.portfolio_value
+
+    def worst(self, portfolio, n=10):
+        """The ``n`` most damaging scenarios for one portfolio"""
+        column = self.returns[portfolio]
+        worst = column.nsmallest(n)
+        return pd.DataFrame({
+            'Scenario': worst.index,
+            'Type': self.kinds[worst.index].to_numpy(),
+            'Return': worst.to_numpy(),
+            'P&L': worst.to_numpy() * self.portfolio_value,
+        })
+
+    def summary(self):
+        """Worst case, average and historical worst per portfolio"""
+        R = self.returns
+        historical = R[self.kinds.to_numpy() == "historical"]
+        return pd.DataFrame({
+            'Portfolio': R.columns,
+            'Worst Scenario': R.idxmin().to_numpy(),
+            'Worst Return': R.min().to_numpy(),
+            'Worst P&L': R.min().to_numpy() * self.portfolio_value,
+            'Average Return': R.mean().to_numpy(),
+            'Worst Historical': historical.min().to_numpy() if len(historical) else np.nan,
+        }).sort_values('Worst Return').reset_index(drop=True)
+
+
+def stress_test(scenarios, portfolios, portfolio_value=1_000_000):
+    """Apply every scenario to every portfolio (``{name: {'symbols', 'weights'}}``).
+
+    Holdings outside the scenario universe get no shock.
+    """
+    W = weight_matrix(portfolios, scenarios.symbols)
+    returns = scenarios.matrix() @ W
+    frame = pd.DataFrame(returns, index=scenarios.names, columns=list(portfolios))
+    return StressReport(frame, scenarios.kinds, portfolio_value)
@@ -66,12 +66,7 @@ def test_portfolio_calculations():
         
         for stock in stocks:
             returns = np.random.normal(0.001, 0.02, len(dates))
-            prices = [100]
-            
-            for ret in returns[1:]:
-                prices.append(prices[-1] * (1 + ret))
-            
-            price_data[stock] = prices
+            price_data[stock] = 100 * np.cumprod(np.r_[1.0, 1 + returns[1:]])
         
         returns = price_data.pct_change().dropna()
         
@@ -178,6 +173,1352 @@ def test_chart_creation():
         print(f"❌ Chart creation failed: {e}")
         return False
 
+def test_price_store():
+    """Test the local price store fills incrementally from a fetcher"""
+    print("🧪 Testing price store...")
+    
+    try:
+        import os
+        import tempfile
+        from datetime import date
+        from price_store import PriceStore, SyntheticFetcher
+        
+        with tempfile.TemporaryDirectory() as root:
+            fetcher = SyntheticFetcher(seed=7)
+            store = PriceStore(root, fetcher=fetcher)
+            
+            prices, failures = store.load(['AAA', 'BBB'], period='1y', end=date(2024, 6, 28))
+            
+            if failures or list(prices.columns) != ['AAA', 'BBB']:
+                print("❌ Initial load failed")
+                return False
+            
+            first_calls = len(fetcher.calls)
+            store.load(['AAA', 'BBB'], period='1y', end=date(2024, 6, 28))
+            
+            if len(fetcher.calls) != first_calls:
+                print("❌ Cached history was fetched again")
+                return False
+            
+            extended, _ = store.load(['AAA', 'BBB'], period='1y', end=date(2024, 7, 5))
+            tail_calls = fetcher.calls[first_calls:]
+            
+            if len(tail_calls) != 2 or any(start < date(2024, 6, 28) for _, start, _ in tail_calls):
+                print("❌ Incremental update did not fetch only the missing tail")
+                return False
+            
+            direct = SyntheticFetcher(seed=7).fetch('AAA', date(2023, 7, 6), date(2024, 7, 5))
+            if not np.allclose(extended['AAA'].values, direct['Close'].values):
+                print("❌ Stored prices differ from source prices")
+                return False
+            
+            # A session covered today may have been partial, so it is fetched again
+            store.load(['AAA'], period='1mo')
+            calls = len(fetcher.calls)
+            store.load(['AAA'], period='1mo')
+            if fetcher.calls[calls:] != [('AAA', date.today(), date.today())]:
+                print("❌ Today's partial session was not re-fetched")
+                return False
+            
+            # An empty download (an error swallowed by the source) is not marked as covered
+            class FlakyFetcher(SyntheticFetcher):
+                broken = True
+                
+                def fetch_many(self, symbols, start, end):
+                    if self.broken:
+                        return {symbol: pd.DataFrame(columns=['Open', 'High', 'Low', 'Close', 'Volume'])
+                                for symbol in symbols}
+                    return super().fetch_many(symbols, start, end)
+            
+            flaky = FlakyFetcher(seed=7)
+            flaky_store = PriceStore(os.path.join(root, 'flaky'), fetcher=flaky)
+            _, failures = flaky_store.load(['CCC'], period='1y', end=date(2024, 6, 28))
+            flaky.broken = False
+            retried, _ = flaky_store.load(['CCC'], period='1y', end=date(2024, 6, 28))
+            if 'CCC' not in failures or retried.empty:
+                print("❌ Empty download was marked as covered")
+                return False
+        
+        print("✅ Price store successful")
+        print(f"   Loaded {len(extended)} rows, {len(tail_calls)} tail fetches")
+        return True
+        
+    except Exception as e:
+        print(f"❌ Price store failed: {e}")
+        return False
+
+def test_batch_metrics():
+    """Test the batch risk engine against the single-portfolio calculation"""
+    print("🧪 Testing batch portfolio metrics...")
+    
+    try:
+        from engine import align_weights, calculate_portfolio_metrics, calculate_returns
+        from risk_engine import batch_portfolio_metrics
+        
+        np.random.seed(42)
+        dates = pd.bdate_range(start='2023-01-02', periods=300)
+        prices = pd.DataFrame(
+            100 * np.exp(np.cumsum(np.random.normal(0.0005, 0.02, (len(dates), 4)), axis=0)),
+            index=dates, columns=['A', 'B', 'C', 'D']
+        )
+        weights = np.random.dirichlet(np.ones(4), 20)
+        
+        batch = batch_portfolio_metrics(calculate_returns(prices), weights, chunk_size=7)
+        
+        for i, w in enumerate(weights):
+            single = calculate_portfolio_metrics(prices, w)
+            for key in ['annual_return', 'annual_volatility', 'sharpe_ratio',
+                        'var_95', 'var_99', 'max_drawdown']:
+                if not np.isclose(batch[key][i], single[key]):
+                    print(f"❌ {key} mismatch for portfolio {i}")
+                    return False
+        
+        # A holding that failed to load drops out and the rest are renormalised
+        aligned = align_weights([0.25, 0.25, 0.5], ['A', 'X', 'B'], ['A', 'B', 'C'])
+        matrix = align_weights([[0.25, 0.25, 0.5], [0.5, 0.5, 0.0]], ['A', 'X', 'B'], ['A', 'B', 'C'])
+        if not np.allclose(aligned, [1 / 3, 2 / 3, 0]) or not np.allclose(matrix, [[1 / 3, 2 / 3, 0], [1, 0, 0]]):
+            print("❌ Weights were not renormalised over the loaded symbols")
+            return False
+        try:
+            align_weights([1.0], ['X'], ['A'])
+            print("❌ A portfolio with no loaded symbol was accepted")
+            return False
+        except ValueError:
+            pass
+        
+        print("✅ Batch portfolio metrics successful")
+        return True
+        
+    except Exception as e:
+        print(f"❌ Batch portfolio metrics failed: {e}")
+        return False
+
+def test_incremental_metrics():
+    """Test bar-by-bar risk updates match a full recalculation"""
+    print("🧪 Testing incremental risk state...")
+    
+    try:
+        from engine import calculate_portfolio_metrics, calculate_correlation_matrix
+        from risk_engine import IncrementalRiskState
+        
+        np.random.seed(7)
+        dates = pd.bdate_range(start='2022-01-03', periods=400)
+        prices = pd.DataFrame(
+            100 * np.exp(np.cumsum(np.random.normal(0.0003, 0.02, (len(dates), 5)), axis=0)),
+            index=dates, columns=['A', 'B', 'C', 'D', 'E']
+        )
+        weights = np.array([0.3, 0.25, 0.2, 0.15, 0.1])
+        
+        state = IncrementalRiskState(prices.columns, weights)
+        
+        for i, (timestamp, row) in enumerate(prices.iterrows()):
+            state.update(row.values, timestamp)
+            
+            if i in (30, 150, len(prices) - 1):
+                expected = calculate_portfolio_metrics(prices.iloc[:i + 1], weights)
+                actual = state.metrics()
+                for key, value in actual.items():
+                    if not np.isclose(value, expected[key]):
+                        print(f"❌ {key} mismatch after {i + 1} bars")
+                        return False
+        
+        if not np.allclose(state.correlation(), calculate_correlation_matrix(prices)):
+            print("❌ Correlation matrix mismatch")
+            return False
+        
+        print("✅ Incremental risk state successful")
+        return True
+        
+    except Exception as e:
+        print(f"❌ Incremental risk state failed: {e}")
+        return False
+
+def test_chunked_downloader():
+    """Test parallel chunked downloads with retries and failures"""
+    print("🧪 Testing chunked downloader...")
+    
+    try:
+        from datetime import date
+        from downloader import ChunkedDownloader, RateLimiter, get_rate_limiter
+        from price_store import SyntheticFetcher
+        from trading_calendar import nse_calendar
+        
+        class FlakyFetcher(SyntheticFetcher):
+            """Fails the first request for each chunk and never returns BAD"""
+            
+            def __init__(self):
+                super().__init__(latency=0.05)
+                self.seen = set()
+            
+            def fetch_many(self, symbols, start, end):
+                if symbols[0] not in self.seen:
+                    self.seen.add(symbols[0])
+                    raise ConnectionError("temporary failure")
+                frames = super().fetch_many(symbols, start, end)
+                frames.pop('BAD', None)
+                return frames
+        
+        symbols = [f"S{i:02d}" for i in range(39)] + ['BAD']
+        downloader = ChunkedDownloader(
+            FlakyFetcher(), chunk_size=5, max_workers=8, backoff=0.01,
+            limiter=RateLimiter(rate=1000, burst=100)
+        )
+        report = downloader.download(symbols, date(2024, 1, 1), date(2024, 3, 29))
+        
+        if set(report.failures) != {'BAD'} or len(report.frames) != 39:
+            print(f"❌ Unexpected failures: {list(report.failures)}")
+            return False
+        
+        if any(report.attempts[s] != 2 for s in symbols):
+            print("❌ Chunks were not retried exactly once")
+            return False
+        
+        merged = report.merge()
+        sessions = len(nse_calendar().sessions(date(2024, 1, 1), date(2024, 3, 29)))
+        if merged.shape != (sessions, 39) or merged.isna().any().any():
+            print(f"❌ Merged frame has unexpected shape {merged.shape}")
+            return False
+        
+        # 8 chunks x 2 attempts x 50ms would take 0.8s if run serially
+        if report.elapsed > 0.6:
+            print(f"❌ Chunks did not run concurrently ({report.elapsed:.2f}s)")
+            return False
+        
+        shared = get_rate_limiter('test.host', 5.0, 2)
+        if get_rate_limiter('test.host', 5.0, 2) is not shared:
+            print("❌ Host limiter was not shared")
+            return False
+        try:
+            get_rate_limiter('test.host', 10.0, 2)
+            print("❌ Conflicting host limiter was accepted")
+            return False
+        except ValueError:
+            pass
+        
+        print("✅ Chunked downloader successful")
+        print(f"   {len(report.frames)} symbols in {report.elapsed * 1000:.0f} ms")
+        return True
+        
+    except Exception as e:
+        print(f"❌ Chunked downloader failed: {e}")
+        return False
+
+def test_var_engine():
+    """Test historical, parametric and Monte Carlo VaR/CVaR"""
+    print("🧪 Testing VaR engine...")
+    
+    try:
+        import tracemalloc
+        from engine import calculate_var
+        from var_engine import historical_var, parametric_var, monte_carlo_var, var_report
+        
+        rng = np.random.default_rng(3)
+        cov = np.array([[4.0, 1.2, 0.8], [1.2, 2.25, 0.6], [0.8, 0.6, 1.0]]) * 1e-4
+        returns = rng.multivariate_normal([0.0005, 0.0003, 0.0002], cov, 5000)
+        weights = np.array([0.5, 0.3, 0.2])
+        portfolio = returns @ weights
+        
+        historical = historical_var(portfolio, [0.95, 0.99])
+        if not np.isclose(historical[0.95][0], calculate_var(portfolio, 0.05)):
+            print("❌ Historical VaR differs from calculate_var")
+            return False
+        
+        parametric = parametric_var(portfolio, [0.95, 0.99])
+        tracemalloc.start()
+        simulated = monte_carlo_var(returns, weights, [0.95, 0.99], n_paths=200_000,
+                                    memory_budget_mb=1)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        if peak > 2 ** 20:
+            print(f"❌ Monte Carlo VaR used {peak / 2 ** 20:.2f} MB of a 1 MB budget")
+            return False
+        
+        for level in (0.95, 0.99):
+            for expected, actual in zip(parametric[level], simulated[level]):
+                if not np.isclose(expected, actual, rtol=0.03):
+                    print(f"❌ Monte Carlo VaR disagrees with parametric at {level:.0%}")
+                    return False
+            if not simulated[level][1] < simulated[level][0] < 0:
+                print("❌ CVaR should be beyond VaR")
+                return False
+        
+        pooled = monte_carlo_var(returns, weights, [0.99], n_paths=50_000, distribution="t",
+                                 memory_budget_mb=1, processes=2)
+        serial = monte_carlo_var(returns, weights, [0.99], n_paths=50_000, distribution="t",
+                                 memory_budget_mb=1)
+        if not np.allclose(pooled[0.99], serial[0.99]):
+            print("❌ Process pool changed Monte Carlo results")
+            return False
+        
+        report = var_report(returns, weights, n_paths=20_000)
+        if len(report) != 6:
+            print("❌ VaR report missing rows")
+            return False
+        
+        print("✅ VaR engine successful")
+        print(f"   MC VaR (99%): {simulated[0.99][0]:.2%}, CVaR: {simulated[0.99][1]:.2%}")
+        return True
+        
+    except Exception as e:
+        print(f"❌ VaR engine failed: {e}")
+        return False
+
+def test_optimizer():
+    """Test efficient frontier and optimal portfolios respect the risk limits"""
+    print("🧪 Testing portfolio optimizer...")
+    
+    try:
+        from optimizer import PortfolioOptimizer
+        
+        rng = np.random.default_rng(11)
+        returns = pd.DataFrame(
+            rng.normal(rng.uniform(0.0002, 0.001, 12), rng.uniform(0.01, 0.03, 12), (750, 12)),
+            columns=[f"S{i}" for i in range(12)]
+        )
+        optimizer = PortfolioOptimizer(returns, max_position=0.25, max_holdings=8)
+        
+        frontier = optimizer.efficient_frontier(20)
+        max_sharpe = optimizer.max_sharpe()
+        min_variance = optimizer.min_variance()
+        
+        weights = frontier[returns.columns].to_numpy()
+        if not np.allclose(weights.sum(axis=1), 1) or weights.max() > 0.25 + 1e-6:
+            print("❌ Frontier weights break the budget or position limit")
+            return False
+        
+        if (np.count_nonzero(weights > 0, axis=1) > 8).any():
+            print("❌ Frontier portfolio holds more names than allowed")
+            return False
+        
+        if max_sharpe['sharpe_ratio'] < frontier['Sharpe'].max() - 1e-3:
+            print("❌ Max-Sharpe portfolio is beaten by a frontier point")
+            return False
+        
+        if min_variance['annual_volatility'] > frontier['Volatility'].min() + 1e-4:
+            print("❌ Min-variance portfolio is beaten by a frontier point")
+            return False
+        
+        # An unreachable target must fail rather than be clipped into a portfolio
+        try:
+            optimizer._solve(optimizer._equal_start(), target_return=optimizer.mu.max() * 2)
+            print("❌ Infeasible target return was accepted")
+            return False
+        except ValueError:
+            pass
+        
+        print("✅ Portfolio optimizer successful")
+        print(f"   Max Sharpe: {max_sharpe['sharpe_ratio']:.3f}, "
+              f"Min Vol: {min_variance['annual_volatility']:.2%}")
+        return True
+        
+    except Exception as e:
+        print(f"❌ Portfolio optimizer failed: {e}")
+        return False
+
+def test_rolling_stats():
+    """Test cumulative-sum rolling metrics against pandas rolling windows"""
+    print("🧪 Testing rolling analytics...")
+    
+    try:
+        from rolling import rolling_stats, rolling_frame
+        
+        rng = np.random.default_rng(5)
+        dates = pd.bdate_range(start='2020-01-01', periods=600)
+        market = pd.Series(rng.normal(0.0004, 0.012, len(dates)), index=dates)
+        returns = pd.DataFrame(
+            0.9 * market.values[:, None] + rng.normal(0.0002, 0.015, (len(dates), 4)),
+            index=dates, columns=['A', 'B', 'C', 'D']
+        )
+        
+        stats = rolling_stats(returns, market, windows=(20, 60, 252))
+        
+        if stats['volatility'].shape != (3, 600, 4):
+            print(f"❌ Unexpected result shape {stats['volatility'].shape}")
+            return False
+        
+        for window in (20, 60, 252):
+            rolled = returns.rolling(window)
+            expected = {
+                'volatility': rolled.std() * np.sqrt(252),
+                'beta': rolled.cov(market).div(market.rolling(window).var(), axis=0),
+                'correlation': rolled.corr(market),
+            }
+            for metric, frame in expected.items():
+                actual = rolling_frame(stats, metric, window)
+                if not np.allclose(actual, frame, equal_nan=True):
+                    print(f"❌ Rolling {metric} ({window}d) differs from pandas")
+                    return False
+        
+        print("✅ Rolling analytics successful")
+        return True
+        
+    except Exception as e:
+        print(f"❌ Rolling analytics failed: {e}")
+        return False
+
+def test_covariance_estimators():
+    """Test shrinkage, EWMA and factor covariance plus the estimate cache"""
+    print("🧪 Testing covariance estimators...")
+    
+    try:
+        from covariance import (CovarianceCache, FactorCovariance, estimate_covariance,
+                                ledoit_wolf_covariance)
+        
+        rng = np.random.default_rng(9)
+        symbols = ['TCS', 'INFY', 'WIPRO', 'SBIN', 'AXISBANK', 'ONGC']
+        dates = pd.bdate_range(start='2022-01-03', periods=500)
+        returns = pd.DataFrame(rng.normal(0, 0.015, (500, 6)), index=dates, columns=symbols)
+        
+        sample = estimate_covariance(returns, "sample")
+        if not np.allclose(sample, returns.cov()):
+            print("❌ Sample covariance differs from pandas")
+            return False
+        
+        shrunk, shrinkage = ledoit_wolf_covariance(returns)
+        if not 0 <= shrinkage <= 1 or np.linalg.eigvalsh(shrunk).min() <= 0:
+            print("❌ Ledoit-Wolf estimate is not a valid shrinkage")
+            return False
+        
+        model = FactorCovariance(returns)
+        weights = np.full(6, 1 / 6)
+        if len(model.sectors) != 3 or not np.isclose(
+                model.portfolio_variance(weights), weights @ model.matrix() @ weights):
+            print("❌ Factor model is inconsistent")
+            return False
+        
+        cache = CovarianceCache()
+        first = cache.get(returns, "ewma", "1y")
+        again = cache.get(returns, "ewma", "1y")
+        extended = pd.concat([returns, returns.iloc[-1:].set_axis([dates[-1] + pd.offsets.BDay()])])
+        cache.get(extended, "ewma", "1y")
+        revised = extended.copy()
+        revised.iloc[-1] *= 1.5
+        cache.get(revised, "ewma", "1y")
+        
+        if again is not first or (cache.hits, cache.misses) != (1, 3):
+            print("❌ Covariance cache did not hit, or missed new or revised prices")
+            return False
+        
+        print("✅ Covariance estimators successful")
+        print(f"   Ledoit-Wolf shrinkage: {shrinkage:.2f}")
+        return True
+        
+    except Exception as e:
+        print(f"❌ Covariance estimators failed: {e}")
+        return False
+
+def test_portfolio_repository():
+    """Test normalized portfolio storage, legacy migration and diffs"""
+    print("🧪 Testing portfolio repository...")
+    
+    try:
+        import os
+        import sqlite3
+        import tempfile
+        from portfolio_repository import PortfolioRepository
+        
+        with tempfile.TemporaryDirectory() as root:
+            path = os.path.join(root, 'portfolios.db')
+            
+            legacy = sqlite3.connect(path)
+            legacy.execute(
+                "CREATE TABLE portfolios (id INTEGER PRIMARY KEY, name TEXT UNIQUE, "
+                "symbols TEXT, weights TEXT, created_date TEXT)"
+            )
+            legacy.execute(
+                "INSERT INTO portfolios (name, symbols, weights, created_date) VALUES (?, ?, ?, ?)",
+                ("Old", "TCS,INFY", "0.6,0.4", "2024-01-01")
+            )
+            legacy.commit()
+            legacy.close()
+            
+            repository = PortfolioRepository(sqlite3.connect(path))
+            
+            old = repository.load("Old")
+            if old != {'symbols': ['TCS', 'INFY'], 'weights': [0.6, 0.4], 'created_date': '2024-01-01'}:
+                print(f"❌ Legacy portfolio not migrated: {old}")
+                return False
+            
+            repository.save_many({
+                f"P{i:04d}": {'symbols': ['TCS', 'INFY', 'SBIN'], 'weights': [0.5, 0.3, 0.2]}
+                for i in range(2000)
+            })
+            
+            if len(repository.list_names()) != 2001:
+                print("❌ Bulk save did not store every portfolio")
+                return False
+            
+            repository.save("Old", ['TCS', 'SBIN'], [0.5, 0.5])
+            if repository.load("Old")['symbols'] != ['TCS', 'SBIN']:
+                print("❌ Cached view was not invalidated on write")
+                return False
+            
+            diff = repository.diff("Old", ["P0000"]).set_index('symbol')
+            if diff['change'].round(6).to_dict() != {'SBIN': -0.3, 'INFY': 0.3}:
+                print(f"❌ Unexpected diff: {diff['change'].to_dict()}")
+                return False
+            
+            holdings = repository.conn.execute("SELECT COUNT(*) FROM holdings").fetchone()[0]
+            repository.delete("P0000")
+            if repository.conn.execute("SELECT COUNT(*) FROM holdings").fetchone()[0] != holdings - 3:
+                print("❌ Deleting a portfolio left its holdings behind")
+                return False
+            
+            journal = repository.conn.execute("PRAGMA journal_mode").fetchone()[0]
+            repository.conn.close()
+        
+        print("✅ Portfolio repository successful")
+        print(f"   Journal mode: {journal}")
+        return True
+        
+    except Exception as e:
+        print(f"❌ Portfolio repository failed: {e}")
+        return False
+
+def test_engine_api():
+    """Test the headless engine and its HTTP API without Streamlit"""
+    print("🧪 Testing engine API...")
+    
+    try:
+        import json
+        import os
+        import subprocess
+        import tempfile
+        import threading
+        import urllib.request
+        import api
+        import engine
+        from price_store import PriceStore, SyntheticFetcher
+        
+        probe = subprocess.run(
+            [sys.executable, '-c', "import sys, engine; print('streamlit' in sys.modules)"],
+            capture_output=True, text=True
+        )
+        if probe.stdout.strip() != 'False':
+            print("❌ Importing the engine pulled in Streamlit")
+            return False
+        
+        with tempfile.TemporaryDirectory() as root:
+            engine.set_price_store(PriceStore(root, fetcher=SyntheticFetcher()))
+            server = api.create_server(port=0)
+            thread = threading.Thread(target=server.serve_forever, daemon=True)
+            thread.start()
+            
+            try:
+                request = urllib.request.Request(
+                    f"http://127.0.0.1:{server.server_port}/analyze",
+                    data=json.dumps({'symbols': ['TCS', 'INFY', 'SBIN'],
+                                     'weights': [0.5, 0.3, 0.2]}).encode(),
+                    headers={'Content-Type': 'application/json'}
+                )
+                with urllib.request.urlopen(request) as response:
+                    payload = json.loads(response.read())
+            finally:
+                server.shutdown()
+                server.server_close()
+            
+            expected = engine.analyze_portfolio(['TCS', 'INFY', 'SBIN'], [0.5, 0.3, 0.2])
+            
+            # A holding that fails to load is renormalised away, not held as cash
+            class PartialFetcher(SyntheticFetcher):
+                def fetch_many(self, symbols, start, end):
+                    return {s: f for s, f in super().fetch_many(symbols, start, end).items() if s != 'MISSING'}
+            
+            engine.set_price_store(PriceStore(os.path.join(root, 'partial'), fetcher=PartialFetcher()))
+            partial = api.handle_metrics({'symbols': ['TCS', 'MISSING'], 'weights': [0.5, 0.5]})
+            alone = engine.calculate_portfolio_metrics(engine.get_nse_data(['TCS'])[0], [1.0])
+            engine.set_price_store(None)
+        
+        if not np.isclose(partial['metrics']['annual_volatility'], alone['annual_volatility']):
+            print("❌ API kept the failed holding's weight as cash")
+            return False
+        
+        if not np.isclose(payload['metrics']['sharpe_ratio'], expected['metrics']['sharpe_ratio']):
+            print("❌ API metrics differ from the engine")
+            return False
+        
+        if len(payload['stocks']) != 3 or not np.isclose(payload['correlation']['TCS']['TCS'], 1.0):
+            print("❌ API response is missing stock metrics or correlations")
+            return False
+        
+        print("✅ Engine API successful")
+        return True
+        
+    except Exception as e:
+        print(f"❌ Engine API failed: {e}")
+        return False
+
+def test_stock_metrics():
+    """Test the vectorized per-stock metrics against pandas column by column"""
+    print("🧪 Testing per-stock metrics...")
+    
+    try:
+        from engine import calculate_stock_metrics, calculate_returns
+        
+        rng = np.random.default_rng(21)
+        dates = pd.bdate_range(start='2021-01-01', periods=400)
+        market = pd.Series(rng.normal(0.0004, 0.01, len(dates)), index=dates)
+        returns = 1.2 * market.values[:, None] + rng.standard_t(4, (len(dates), 6)) * 0.01
+        prices = pd.DataFrame(100 * np.cumprod(1 + returns, axis=0), index=dates,
+                              columns=[f"S{i}" for i in range(6)])
+        
+        table = calculate_stock_metrics(prices, market).set_index('Stock')
+        daily = calculate_returns(prices)
+        
+        for symbol in prices.columns:
+            r = daily[symbol]
+            drawdown = (1 + r).cumprod() / (1 + r).cumprod().cummax() - 1
+            expected = {
+                'Annual Return': r.mean() * 252,
+                'Volatility': r.std() * np.sqrt(252),
+                'Beta': r.cov(market) / market.loc[r.index].var(),
+                'Max Drawdown': drawdown.min(),
+                'Skew': r.skew(),
+                'Kurtosis': r.kurt(),
+                'Current Price': prices[symbol].iloc[-1],
+            }
+            for column, value in expected.items():
+                if not np.isclose(table.loc[symbol, column], value):
+                    print(f"❌ {column} for {symbol} differs from pandas")
+                    return False
+        
+        print("✅ Per-stock metrics successful")
+        return True
+        
+    except Exception as e:
+        print(f"❌ Per-stock metrics failed: {e}")
+        return False
+
+def test_exporter():
+    """Test in-memory chunked exports and the background export manager"""
+    print("🧪 Testing exporter...")
+    
+    try:
+        import gzip
+        import io
+        import zipfile
+        from exporter import ExportManager, available_formats, export_tables
+        
+        dates = pd.bdate_range(start='2020-01-01', periods=1000)
+        prices = pd.DataFrame(np.random.default_rng(3).normal(100, 5, (1000, 4)),
+                              index=pd.Index(dates, name='Date'), columns=['A', 'B', 'C', 'D'])
+        
+        for fmt in available_formats():
+            result = export_tables({'prices': prices}, 'prices', fmt, chunk_rows=128)
+            if fmt == 'parquet':
+                restored = pd.read_parquet(io.BytesIO(result.data))
+            else:
+                restored = pd.read_csv(io.BytesIO(gzip.decompress(result.data)), parse_dates=['Date'])
+            restored = restored.set_index('Date')
+            if not np.allclose(restored.to_numpy(), prices.to_numpy()) or result.rows != 1000:
+                print(f"❌ {fmt} export did not round-trip")
+                return False
+            if result.bytes_written <= 0:
+                print(f"❌ {fmt} export reported no bytes")
+                return False
+        
+        bundle = export_tables({'prices': prices, 'weights': pd.DataFrame({'Stock': ['A'], 'Weight': [1.0]})},
+                               'bundle', 'csv.gz')
+        with zipfile.ZipFile(io.BytesIO(bundle.data)) as archive:
+            if sorted(archive.namelist()) != ['prices.csv.gz', 'weights.csv.gz']:
+                print("❌ Bundle has the wrong members")
+                return False
+        
+        manager = ExportManager()
+        manager.submit('prices', {'prices': prices}, 'csv.gz')
+        result = manager.result('prices', timeout=30)
+        if manager.status('prices') != 'done' or result.file_name != 'prices.csv.gz':
+            print("❌ Background export did not finish")
+            return False
+        manager.shutdown()
+        
+        print(f"✅ Exporter successful ({result.summary()})")
+        return True
+        
+    except Exception as e:
+        print(f"❌ Exporter failed: {e}")
+        return False
+
+def test_backtest():
+    """Test the vectorized backtester against a day-by-day simulation"""
+    print("🧪 Testing backtester...")
+    
+    try:
+        from backtest import backtest, pool_size, rebalance_days, simulate, sweep, FREQUENCIES, POOL_MIN_WORK
+        from engine import calculate_portfolio_metrics
+        
+        rng = np.random.default_rng(13)
+        dates = pd.bdate_range(start='2022-01-03', periods=200)
+        R = rng.normal(0.0005, 0.02, (200, 4))
+        W = rng.dirichlet(np.ones(4), 2).T
+        
+        for frequency in FREQUENCIES:
+            flags = rebalance_days(dates, frequency)
+            net, _ = simulate(R, W, flags, (25,))
+            for p in range(W.shape[1]):
+                holdings, expected = W[:, p].copy(), []
+                for t in range(len(R)):
+                    before = holdings.sum()
+                    holdings = holdings * (1 + R[t])
+                    after, cost = holdings.sum(), 0.0
+                    if flags[t]:
+                        target = W[:, p] * after
+                        cost = np.abs(holdings - target).sum() / after * 0.0025
+                        holdings = target * (1 - cost)
+                    expected.append(after / before * (1 - cost) - 1)
+                if not np.allclose(net[:, p], expected):
+                    print(f"❌ {frequency} rebalancing differs from the loop")
+                    return False
+        
+        # Daily rebalancing without costs is the static-weight portfolio
+        prices = pd.DataFrame(100 * np.cumprod(1 + R, axis=0), index=dates, columns=list("ABCD"))
+        portfolio = {'Test': {'symbols': list("ABCD"), 'weights': list(W[:, 0])}}
+        result = backtest(prices, portfolio, 'daily', cost_bps=0)['Test']
+        expected = calculate_portfolio_metrics(prices, W[:, 0])
+        for key in ['annual_return', 'annual_volatility', 'sharpe_ratio', 'var_95', 'max_drawdown']:
+            if not np.isclose(result[key], expected[key]):
+                print(f"❌ Backtest {key} differs from portfolio metrics")
+                return False
+        
+        # A holding missing from the prices is dropped and the rest renormalised
+        partial = backtest(prices, {'Test': {'symbols': ['A', 'B', 'E'], 'weights': [0.25, 0.25, 0.5]}},
+                           'monthly', cost_bps=25)['Test']
+        expected = backtest(prices, {'Test': {'symbols': ['A', 'B'], 'weights': [0.5, 0.5]}},
+                            'monthly', cost_bps=25)['Test']
+        if not all(np.isclose(partial[key], expected[key]) for key in ['annual_return', 'max_drawdown']):
+            print("❌ Missing holdings are not renormalised")
+            return False
+        
+        table = sweep(prices, {**portfolio, 'Other': {'symbols': ['A', 'B'], 'weights': [0.5, 0.5]}},
+                      costs_bps=(0, 50))
+        if len(table) != 2 * len(FREQUENCIES) * 2:
+            print("❌ Sweep has the wrong number of rows")
+            return False
+        
+        if pool_size(4, 10 ** 6) or pool_size(1, POOL_MIN_WORK):
+            print("❌ Small sweeps or a single process should stay serial")
+            return False
+        
+        print("✅ Backtester successful")
+        return True
+        
+    except Exception as e:
+        print(f"❌ Backtester failed: {e}")
+        return False
+
+def test_refresh():
+    """Test the refresh scheduler back-off and incremental live updates"""
+    print("🧪 Testing auto-refresh...")
+    
+    try:
+        from engine import calculate_portfolio_metrics
+        from refresh import LivePortfolio, RefreshScheduler, RefreshStats, market_is_open
+        
+        # Wednesday 11:00 IST is open, Saturday is closed
+        open_time = datetime(2024, 7, 3, 11, 0)
+        weekend = datetime(2024, 7, 6, 11, 0)
+        if not market_is_open(open_time) or market_is_open(weekend):
+            print("❌ Market hours are wrong")
+            return False
+        
+        scheduler = RefreshScheduler(interval=30, max_interval=900)
+        open_delays = [scheduler.next_delay(False, open_time) for _ in range(5)]
+        if open_delays != [60, 120, 120, 120, 120] or scheduler.next_delay(True, open_time) != 30:
+            print(f"❌ Market-hours delays are wrong: {open_delays}")
+            return False
+        closed_delays = [scheduler.next_delay(False, weekend) for _ in range(6)]
+        if closed_delays[-1] != 900 or closed_delays != sorted(closed_delays):
+            print(f"❌ Closed-market back-off is wrong: {closed_delays}")
+            return False
+        
+        rng = np.random.default_rng(17)
+        dates = pd.bdate_range(start='2024-01-01', periods=120)
+        prices = pd.DataFrame(100 * np.cumprod(1 + rng.normal(0.0005, 0.015, (120, 3)), axis=0),
+                              index=dates, columns=['A', 'B', 'C'])
+        weights = [0.5, 0.3, 0.2]
+        
+        live = LivePortfolio(prices.iloc[:100], weights)
+        stats = RefreshStats()
+        if stats.measure(live.apply, prices.iloc[:100]) != []:
+            print("❌ Unchanged data produced new bars")
+            return False
+        added = stats.measure(live.apply, prices)
+        if len(added) != 20 or live.rebuilds != 1:
+            print("❌ New bars were not applied incrementally")
+            return False
+        
+        expected = calculate_portfolio_metrics(prices, np.array(weights))
+        metrics = live.metrics()
+        for key in ['annual_return', 'annual_volatility', 'sharpe_ratio', 'var_95', 'var_99', 'max_drawdown']:
+            if not np.isclose(metrics[key], expected[key]):
+                print(f"❌ Live {key} differs from a full recompute")
+                return False
+        if not np.allclose(metrics['portfolio_returns'].to_numpy(), expected['portfolio_returns'].to_numpy()):
+            print("❌ Live portfolio returns differ")
+            return False
+        
+        # A poll of the session in progress revises the last bar without a rebuild
+        revised = prices.copy()
+        revised.iloc[-1] *= 1.01
+        if stats.measure(live.apply, revised.iloc[-2:]) != [dates[-1]] or live.rebuilds != 1:
+            print("❌ Revised bar was not applied incrementally")
+            return False
+        expected = calculate_portfolio_metrics(revised, np.array(weights))
+        metrics = live.metrics()
+        for key in ['annual_return', 'annual_volatility', 'var_95', 'max_drawdown']:
+            if not np.isclose(metrics[key], expected[key]):
+                print(f"❌ Revised {key} differs from a full recompute")
+                return False
+        if not np.allclose(live.state.covariance(), revised.pct_change().iloc[1:].cov()) or \
+                stats.summary()['refreshes'] != 3:
+            print("❌ Revised bar left stale co-moments")
+            return False
+        
+        # Polling goes to the source even when the store already covers today
+        import tempfile
+        from datetime import date
+        from price_store import PriceStore, SyntheticFetcher
+        with tempfile.TemporaryDirectory() as root:
+            fetcher = SyntheticFetcher(seed=3)
+            store = PriceStore(root, fetcher=fetcher)
+            history, _ = store.load(['A', 'B'], period='1mo', end=date(2024, 7, 5))
+            calls = len(fetcher.calls)
+            bars, failures = store.poll(['A', 'B'], history.index[-1], end=date(2024, 7, 5))
+            if failures or len(fetcher.calls) != calls + 2 or list(bars.index) != [history.index[-1]] or \
+                    not np.allclose(bars.to_numpy(), history.iloc[-1:].to_numpy()):
+                print("❌ Polling did not fetch the covered session")
+                return False
+        
+        print("✅ Auto-refresh successful")
+        return True
+        
+    except Exception as e:
+        print(f"❌ Auto-refresh failed: {e}")
+        return False
+
+def test_screener():
+    """Test the universe screener index and correlation clusters"""
+    print("🧪 Testing universe screener...")
+    
+    try:
+        from engine import calculate_stock_metrics
+        from screener import parse_universe, screen
+        
+        if parse_universe("Symbol,Name\ntcs,Tata\n# comment\nINFY,Infosys\nTCS,Tata\n") != ['TCS', 'INFY']:
+            print("❌ Universe file not parsed")
+            return False
+        
+        # Three blocks of stocks driven by three independent factors
+        rng = np.random.default_rng(18)
+        factors = rng.normal(0, 0.015, (500, 3))
+        returns = np.repeat(factors, 20, axis=1) + rng.normal(0, 0.005, (500, 60))
+        dates = pd.bdate_range(start='2022-01-03', periods=501)
+        prices = pd.DataFrame(100 * np.cumprod(np.vstack([np.ones(60), 1 + returns]), axis=0),
+                              index=dates, columns=[f"S{i:02d}" for i in range(60)])
+        prices.iloc[:400, 0] = np.nan  # listed too late to screen
+        
+        index = screen(prices, n_clusters=3, chunk_size=7)
+        if len(index) != 59 or index.skipped != ['S00']:
+            print("❌ Short history was not skipped")
+            return False
+        
+        expected = calculate_stock_metrics(prices.drop(columns='S00'),
+                                           prices.drop(columns='S00').pct_change().mean(axis=1))
+        table = index.table.set_index('Stock').loc[expected['Stock']]
+        if not np.allclose(table['Sharpe Ratio'], expected['Sharpe Ratio']) or not np.allclose(table['Beta'], expected['Beta']):
+            print("❌ Chunked metrics differ from a single pass")
+            return False
+        
+        clusters = index.table['Cluster'].to_numpy()
+        blocks = np.arange(1, 60) // 20
+        if any(len(set(clusters[blocks == b])) != 1 for b in range(3)) or len(set(clusters)) != 3:
+            print("❌ Correlation clusters do not match the factor blocks")
+            return False
+        
+        top = index.query('Sharpe Ratio', top=5, filters={'Volatility': (None, 0.3)}, clusters=[1])
+        full = index.table[(index.table['Volatility'] <= 0.3) & (index.table['Cluster'] == 1)]
+        if top['Stock'].tolist() != full.nlargest(5, 'Sharpe Ratio')['Stock'].tolist():
+            print("❌ Top-k query does not match pandas")
+            return False
+        
+        print("✅ Universe screener successful")
+        return True
+        
+    except Exception as e:
+        print(f"❌ Universe screener failed: {e}")
+        return False
+
+def test_sectors():
+    """Test sparse sector aggregation against per-sector pandas sums"""
+    print("🧪 Testing sector analytics...")
+    
+    try:
+        from engine import calculate_sector_analytics
+        from sectors import SectorAnalytics, sector_cache
+        
+        symbols = ["TCS", "INFY", "WIPRO", "HDFCBANK", "SBIN", "RELIANCE", "UNKNOWN"]
+        weights = np.array([0.2, 0.1, 0.1, 0.25, 0.15, 0.2, 0.0])
+        rng = np.random.default_rng(19)
+        dates = pd.bdate_range(start='2024-01-01', periods=250)
+        returns = pd.DataFrame(rng.normal(0.0005, 0.015, (250, 7)), index=dates, columns=symbols)
+        
+        analytics = SectorAnalytics(returns, weights)
+        it = returns[["TCS", "INFY", "WIPRO"]] @ np.array([0.5, 0.25, 0.25])
+        if not np.allclose(analytics.returns["Information Technology"], it):
+            print("❌ Sector returns are not weight-averaged")
+            return False
+        if not np.allclose(analytics.returns["Other"], returns["UNKNOWN"]):
+            print("❌ Zero-weight sector did not fall back to equal weights")
+            return False
+        
+        covariance = np.cov(returns.to_numpy(), rowvar=False)
+        portfolio_vol = np.sqrt(weights @ covariance @ weights) * np.sqrt(252)
+        if not np.isclose(analytics.risk_contribution(covariance).sum(), portfolio_vol):
+            print("❌ Sector risk contributions do not add up to portfolio volatility")
+            return False
+        
+        prices = 100 * (1 + returns).cumprod()
+        first = calculate_sector_analytics(prices, weights, "1y")
+        hits = sector_cache.hits
+        second = calculate_sector_analytics(prices, weights, "1y")
+        if sector_cache.hits != hits + 1 or not first['summary'].equals(second['summary']):
+            print("❌ Sector analytics were not cached")
+            return False
+        revised = prices.copy()
+        revised.iloc[-1] *= 1.1
+        if calculate_sector_analytics(revised, weights, "1y")['summary'].equals(first['summary']):
+            print("❌ Revised prices were served from the sector cache")
+            return False
+        if not np.isclose(first['summary']['Weight'].sum(), 1) or not np.isclose(first['summary']['Risk Share'].sum(), 1):
+            print("❌ Sector weights or risk shares do not sum to one")
+            return False
+        
+        print("✅ Sector analytics successful")
+        return True
+        
+    except Exception as e:
+        print(f"❌ Sector analytics failed: {e}")
+        return False
+
+def test_stress():
+    """Test stress scenarios against hand-computed portfolio returns"""
+    print("🧪 Testing stress scenarios...")
+    
+    try:
+        from stress import ScenarioSet, estimate_betas, stress_test, window_returns
+        
+        symbols = ["TCS", "INFY", "HDFCBANK", "SBIN", "NEWCO"]
+        dates = pd.bdate_range(start='2020-01-01', end='2020-06-30')
+        rng = np.random.default_rng(20)
+        market = rng.normal(0, 0.01, len(dates))
+        betas = np.array([0.8, 1.0, 1.2, 1.5, 1.0])
+        returns = pd.DataFrame(market[:, None] * betas + rng.normal(0, 0.001, (len(dates), 5)),
+                               index=dates, columns=symbols)
+        prices = 100 * (1 + returns).cumprod()
+        prices.loc[:'2020-04-30', 'NEWCO'] = np.nan  # listed after the crash window
+        
+        estimated = estimate_betas(returns, pd.Series(market, index=dates))
+        if not np.allclose(estimated, betas, atol=0.05):
+            print(f"❌ Betas not recovered: {estimated.round(2).tolist()}")
+            return False
+        
+        scenarios = ScenarioSet(symbols, estimated)
+        scenarios.add_sector_shock("Banks -20%", {"Banking": -0.2})
+        scenarios.add_index_shock("Market -10%", -0.1)
+        coverage = scenarios.add_historical("Crash", prices, '2020-02-14', '2020-03-20')
+        if not np.isclose(coverage, 0.8):
+            print("❌ Historical coverage is wrong")
+            return False
+        
+        portfolios = {
+            'Banks': {'symbols': ["HDFCBANK", "SBIN"], 'weights': [0.5, 0.5]},
+            'Mixed': {'symbols': ["TCS", "SBIN", "NEWCO"], 'weights': [0.5, 0.3, 0.2]},
+        }
+        report = stress_test(scenarios, portfolios, portfolio_value=1_000_000)
+        
+        window = window_returns(prices, '2020-02-14', '2020-03-20')
+        proxy = estimated['NEWCO'] * window.drop('NEWCO').mean()
+        expected_crash = 0.5 * window['TCS'] + 0.3 * window['SBIN'] + 0.2 * proxy
+        if not np.isclose(report.returns.loc['Banks -20%', 'Banks'], -0.2) or \
+                not np.isclose(report.returns.loc['Banks -20%', 'Mixed'], -0.06):
+            print("❌ Sector shock P&L is wrong")
+            return False
+        if not np.isclose(report.returns.loc['Market -10%', 'Mixed'], -0.1 * (estimated[['TCS', 'SBIN', 'NEWCO']] @ [0.5, 0.3, 0.2])):
+            print("❌ Index shock P&L is wrong")
+            return False
+        if not np.isclose(report.returns.loc['Crash', 'Mixed'], expected_crash):
+            print("❌ Historical replay P&L is wrong")
+            return False
+        if not np.isclose(report.pnl.loc['Banks -20%', 'Banks'], -200_000):
+            print("❌ Rupee P&L is wrong")
+            return False
+        
+        print("✅ Stress scenarios successful")
+        return True
+        
+    except Exception as e:
+        print(f"❌ Stress scenarios failed: {e}")
+        return False
+
+def test_benchmark_history():
+    """Test the benchmark suite's baselines and regression thresholds"""
+    print("🧪 Testing benchmark history...")
+    
+    try:
+        import os
+        import tempfile
+        from benchmark import baselines, check_regressions, load_history, save_history
+        
+        def record(seconds, peak_mb, stage='returns'):
+            return {'stage': stage, 'symbols': 100, 'years': 5, 'seconds': seconds, 'peak_mb': peak_mb}
+        
+        with tempfile.TemporaryDirectory() as root:
+            path = os.path.join(root, 'history.json')
+            history = load_history(path)
+            for seconds in (0.10, 0.12, 0.11, 0.50):
+                history['runs'].append({'machine': 'A', 'results': [record(seconds, 10.0)]})
+            history['runs'].append({'machine': 'B', 'results': [record(5.0, 10.0)]})
+            save_history(path, history)
+            history = load_history(path)
+        
+        baseline = baselines(history, 'A')
+        if not np.isclose(baseline[('returns', 100, 5)][0], 0.115):
+            print("❌ Baseline is not the median of this machine's runs")
+            return False
+        
+        if check_regressions([record(0.15, 11.0), record(1.0, 1.0, stage='var')], baseline):
+            print("❌ Run within tolerance flagged as a regression")
+            return False
+        if len(check_regressions([record(0.2, 10.0)], baseline)) != 1 or \
+                len(check_regressions([record(0.1, 20.0)], baseline)) != 1:
+            print("❌ Slow or large stage not flagged")
+            return False
+        
+        print("✅ Benchmark history successful")
+        return True
+        
+    except Exception as e:
+        print(f"❌ Benchmark history failed: {e}")
+        return False
+
+def test_relative():
+    """Test benchmark-relative metrics and index calendar alignment"""
+    print("🧪 Testing benchmark-relative analytics...")
+    
+    try:
+        from price_store import YFinanceFetcher
+        from relative import IndexCalendarCache, align_index, relative_metrics, rolling_beta
+        
+        if YFinanceFetcher()._ticker('^NSEI') != '^NSEI' or YFinanceFetcher()._ticker('TCS') != 'TCS.NS':
+            print("❌ Index tickers should not get the .NS suffix")
+            return False
+        
+        dates = pd.bdate_range(start='2023-01-02', periods=300)
+        rng = np.random.default_rng(22)
+        market = rng.normal(0.0004, 0.01, 300)
+        index_prices = pd.Series(1000 * np.cumprod(1 + market), index=dates)
+        
+        # Index misses one holdings day and has one extra day of its own
+        holdings_dates = dates.delete(150)
+        stored_index = index_prices.drop(dates[200])
+        aligned = align_index(stored_index, holdings_dates)
+        expected = index_prices.reindex(holdings_dates).copy()
+        expected[dates[200]] = index_prices[dates[199]]
+        if not np.allclose(aligned, expected.pct_change().iloc[1:]):
+            print("❌ Index not aligned to the holdings calendar")
+            return False
+        
+        cache = IndexCalendarCache()
+        for _ in range(3):
+            cache.get('NIFTY 50', holdings_dates, lambda: stored_index)
+        if cache.misses != 1 or cache.hits != 2:
+            print("❌ Aligned index was not cached")
+            return False
+        
+        revised = stored_index.copy()
+        revised.iloc[-1] *= 1.01
+        aligned = cache.get('NIFTY 50', holdings_dates, lambda: revised)
+        if cache.misses != 2 or not np.isclose(aligned.iloc[-1], revised.iloc[-1] / revised.iloc[-2] - 1):
+            print("❌ Revised index bar served from the cache")
+            return False
+        
+        m = pd.Series(market, index=dates)
+        returns = pd.DataFrame({
+            'HIGH_BETA': 1.5 * market + rng.normal(0, 0.005, 300),
+            'LOW_BETA': 0.5 * market + rng.normal(0.0002, 0.005, 300),
+        }, index=dates)
+        metrics = relative_metrics(returns, m, risk_free_rate=0.0)
+        
+        for column in returns.columns:
+            r = returns[column]
+            active = r - m
+            up, down = m > 0, m < 0
+            expected = {
+                'Beta': r.cov(m) / m.var(),
+                'Alpha': (r.mean() - r.cov(m) / m.var() * m.mean()) * 252,
+                'Correlation': r.corr(m),
+                'Tracking Error': active.std() * np.sqrt(252),
+                'Information Ratio': active.mean() * 252 / (active.std() * np.sqrt(252)),
+                'Up Capture': r[up].mean() / m[up].mean(),
+                'Down Capture': r[down].mean() / m[down].mean(),
+            }
+            for key, value in expected.items():
+                if not np.isclose(metrics.loc[column, key], value):
+                    print(f"❌ {column} {key} differs from pandas")
+                    return False
+        
+        betas = rolling_beta(returns, m, window=60)
+        if not np.isclose(betas['HIGH_BETA'].iloc[-1], returns['HIGH_BETA'].iloc[-60:].cov(m.iloc[-60:]) / m.iloc[-60:].var()):
+            print("❌ Rolling beta is wrong")
+            return False
+        
+        print("✅ Benchmark-relative analytics successful")
+        return True
+        
+    except Exception as e:
+        print(f"❌ Benchmark-relative analytics failed: {e}")
+        return False
+
+def test_trading_calendar():
+    """Test the trading calendar, dense price panels and mask-aware metrics"""
+    print("🧪 Testing trading calendar and price panels...")
+    
+    try:
+        import tempfile
+        from datetime import date
+        import engine
+        from covariance import sample_covariance
+        from price_store import PriceStore, SyntheticFetcher
+        from trading_calendar import TradingCalendar, parse_holidays
+        
+        holidays = parse_holidays("date,holiday\n# comment\n2024-01-26,Republic Day\n2024-03-25,Holi\n")
+        calendar = TradingCalendar(holidays)
+        sessions = calendar.sessions(date(2024, 1, 24), date(2024, 1, 30))
+        if [str(d) for d in sessions] != ['2024-01-24', '2024-01-25', '2024-01-29', '2024-01-30']:
+            print("❌ Sessions should skip the holiday and the weekend")
+            return False
+        if np.any(np.diff(calendar.position(sessions)) != 1):
+            print("❌ Consecutive sessions should have consecutive positions")
+            return False
+        
+        class GappyFetcher(SyntheticFetcher):
+            """LATE lists in 2024 and GAP misses one session"""
+            
+            def _generate(self, symbol, start, end):
+                df = super()._generate(symbol, start, end)
+                if symbol == 'LATE':
+                    return df[df.index >= pd.Timestamp('2024-03-01')]
+                if symbol == 'GAP':
+                    return df.drop(pd.Timestamp('2024-05-15'), errors='ignore')
+                return df
+        
+        with tempfile.TemporaryDirectory() as root:
+            store = PriceStore(root, fetcher=GappyFetcher(), calendar=calendar)
+            panel, failures = store.load_panel(['AAA', 'LATE', 'GAP'], period='1y', end=date(2024, 6, 28))
+            first = store.dense('AAA')
+            store.load_panel(['AAA', 'LATE', 'GAP'], period='1y', end=date(2024, 6, 28))
+            
+            if store.dense('AAA') is not first:
+                print("❌ Dense history was rebuilt without a write")
+                return False
+            
+            if failures or not panel.valid[:, 0].all() or panel.dates[0] > np.datetime64('2023-07-03'):
+                print("❌ A late listing truncated the other symbols' history")
+                return False
+            
+            prices = panel.frame()
+            listed = prices.index >= pd.Timestamp('2024-03-01')
+            if prices['LATE'][~listed].notna().any() or prices['LATE'][listed].isna().any():
+                print("❌ Late listing not masked before its first bar")
+                return False
+            
+            returns = engine.calculate_returns(prices)
+            gap = returns.index.get_loc(pd.Timestamp('2024-05-16'))
+            if not np.isnan(returns['GAP'].iloc[gap]) or not np.isnan(panel.returns().values[gap, 2]):
+                print("❌ Return spans the missing session")
+                return False
+            
+            weights = np.array([0.5, 0.3, 0.2])
+            metrics = engine.calculate_portfolio_metrics(prices, weights)
+            valid = returns.notna().to_numpy()
+            expected = (returns.fillna(0) @ weights) / (valid @ weights)
+            if not np.allclose(metrics['portfolio_returns'], expected) or len(metrics['portfolio_returns']) != len(returns):
+                print("❌ Portfolio returns do not rescale over the holdings that traded")
+                return False
+            
+            if not np.allclose(sample_covariance(returns), returns.cov(), equal_nan=True):
+                print("❌ Covariance is not pairwise-complete")
+                return False
+            
+            stock = engine.calculate_stock_metrics(prices).set_index('Stock')
+            alone = engine.calculate_stock_metrics(prices[['LATE']].dropna()).set_index('Stock')
+            columns = ['Annual Return', 'Volatility', 'Skew', 'Kurtosis', 'Max Drawdown', 'Current Price']
+            if not np.allclose(stock.loc['LATE', columns].astype(float), alone.loc['LATE', columns].astype(float)):
+                print("❌ Stock metrics for a late listing differ from its own history")
+                return False
+        
+        print("✅ Trading calendar and price panels successful")
+        print(f"   {panel.shape[0]} sessions x {panel.shape[1]} symbols, coverage {panel.coverage().round(2).to_dict()}")
+        return True
+        
+    except Exception as e:
+        print(f"❌ Trading calendar failed: {e}")
+        return False
+
+def test_charts():
+    """Test chart decimation, clustered heatmaps and the figure cache"""
+    print("🧪 Testing chart render preparation...")
+    
+    try:
+        from charts import (FigureCache, correlation_heatmap, decimate, line_chart, lttb_indices,
+                            minmax_indices, payload_stats)
+        
+        rng = np.random.default_rng(24)
+        dates = pd.bdate_range(start='2005-01-03', periods=5000)
+        series = pd.Series(100 * np.cumprod(1 + rng.normal(0.0004, 0.015, 5000)), index=dates)
+        y = series.to_numpy()
+        
+        kept = lttb_indices(y, 500)
+        if len(kept) != 500 or kept[0] != 0 or kept[-1] != 4999 or np.any(np.diff(kept) <= 0):
+            print("❌ LTTB should keep the end points and exactly the budget")
+            return False
+        
+        # Textbook LTTB on a short series
+        small = rng.normal(size=50)
+        every, a, expected = 48 / 8, 0, [0]
+        for i in range(8):
+            lo, hi = int(i * every) + 1, int((i + 1) * every) + 1
+            nlo, nhi = (hi, int((i + 2) * every) + 1) if i < 7 else (49, 50)
+            avg_x, avg_y = np.arange(nlo, nhi).mean(), small[nlo:nhi].mean()
+            area = np.abs((a - avg_x) * (small[lo:hi] - small[a]) - (a - np.arange(lo, hi)) * (avg_y - small[a]))
+            a = lo + int(np.argmax(area))
+            expected.append(a)
+        if list(lttb_indices(small, 10)) != expected + [49]:
+            print("❌ LTTB picks differ from the reference algorithm")
+            return False
+        
+        extremes = minmax_indices(y, 400)
+        if len(extremes) > 400 or y[extremes].max() != y.max() or y[extremes].min() != y.min():
+            print("❌ Min-max decimation lost the extremes")
+            return False
+        
+        if len(decimate(series.iloc[:100], 500)) != 100:
+            print("❌ Short series should not be decimated")
+            return False
+        
+        full = payload_stats(line_chart({'A': series}, max_points=len(series)))
+        prepared = payload_stats(line_chart({'A': series, 'B': series * 1.1}))
+        if prepared['points'] > 3000 or prepared['bytes'] >= full['bytes']:
+            print("❌ Prepared chart payload is not smaller")
+            return False
+        
+        # Two blocks of correlated symbols, shuffled; clustering should bring each block together
+        factors = rng.normal(size=(300, 2))
+        block = np.repeat([0, 1], 20)
+        returns = pd.DataFrame(factors[:, block] + 0.3 * rng.normal(size=(300, 40)),
+                               columns=[f"S{i}" for i in range(40)])
+        shuffled = returns.iloc[:, rng.permutation(40)].corr()
+        
+        if correlation_heatmap(shuffled.iloc[:10, :10]).data[0].type != 'heatmap':
+            print("❌ Small heatmaps should stay annotated")
+            return False
+        
+        heatmap = correlation_heatmap(shuffled, title="Stock Correlations")
+        order = [int(name[1:]) // 20 for name in heatmap.data[0].x]
+        if heatmap.data[0].type != 'heatmapgl' or heatmap.data[0].text is not None or \
+                np.count_nonzero(np.diff(order)) != 1:
+            print("❌ Large heatmaps should be clustered WebGL without cell text")
+            return False
+        
+        cache = FigureCache()
+        builds = []
+        build = lambda: builds.append(1) or line_chart({'A': series})
+        cache.get('performance', {'A': series}, build)
+        cache.get('performance', {'A': series}, build)
+        cache.get('performance', {'A': series * 1.01}, build)
+        if len(builds) != 2 or cache.hits != 1:
+            print("❌ Figure cache did not reuse unchanged data")
+            return False
+        
+        print("✅ Chart render preparation successful")
+        print(f"   {full['points']} points / {full['bytes'] / 1024:.0f} KB -> "
+              f"{prepared['points'] // 2} points / {prepared['bytes'] / 2048:.0f} KB per line")
+        return True
+        
+    except Exception as e:
+        print(f"❌ Chart render preparation failed: {e}")
+        return False
+
+def test_correlation_structure():
+    """Test seriation, the threshold graph, the minimum spanning tree and flagged pairs"""
+    print("🧪 Testing correlation structure...")
+    
+    try:
+        from scipy.sparse.csgraph import minimum_spanning_tree as dense_mst
+        from correlation_structure import (CorrelationStructure, condensed_distances, correlation_distance,
+                                           pair_indices)
+        from screener import correlation_clusters
+        
+        # Three blocks of correlated symbols, shuffled
+        rng = np.random.default_rng(25)
+        factors = rng.normal(size=(500, 3))
+        block = np.repeat([0, 1, 2], 15)
+        returns = pd.DataFrame(factors[:, block] + 0.4 * rng.normal(size=(500, 45)),
+                               columns=[f"S{i}" for i in range(45)])
+        corr = returns.iloc[:, rng.permutation(45)].corr()
+        n = len(corr)
+        
+        k = np.arange(n * (n - 1) // 2)
+        i, j = pair_indices(k, n)
+        rows, cols = np.triu_indices(n, 1)
+        if not (np.array_equal(i, rows) and np.array_equal(j, cols)):
+            print("❌ Condensed indices do not map back to the upper triangle")
+            return False
+        
+        distances = condensed_distances(corr)
+        if not np.allclose(distances, correlation_distance(corr.to_numpy()[rows, cols])):
+            print("❌ Condensed distances differ from the matrix")
+            return False
+        
+        structure = CorrelationStructure(corr, threshold=0.7)
+        mst = structure.mst_frame()
+        expected = dense_mst(correlation_distance(corr.to_numpy().clip(-1, 1)) + 1e-9).sum() - 1e-9 * (n - 1)
+        if len(mst) != n - 1 or not np.isclose(structure.mst[2].sum(), expected):
+            print("❌ Minimum spanning tree differs from scipy's")
+            return False
+        
+        pairs = structure.pairs()
+        above = corr.to_numpy()[rows, cols] >= 0.7
+        if len(pairs) != above.sum() or not pairs['Correlation'].is_monotonic_decreasing:
+            print("❌ Threshold pairs do not match the matrix")
+            return False
+        
+        groups = [int(name[1:]) // 15 for name in corr.columns[structure.order]]
+        if np.count_nonzero(np.diff(groups)) != 2 or structure.summary()['linked_groups'] != 3:
+            print("❌ Seriation should keep each block together")
+            return False
+        
+        weights = np.where(np.isin(corr.columns, ['S0', 'S1', 'S20']), 1 / 3, 0.0)
+        flagged = structure.pairs(weights)
+        if len(flagged) != 1 or set(flagged.iloc[0][['Stock A', 'Stock B']]) != {'S0', 'S1'} or \
+                not np.isclose(flagged['Combined Weight'].iloc[0], 2 / 3):
+            print("❌ Flagged holdings should only pair held, correlated stocks")
+            return False
+        
+        labels = correlation_clusters(returns, 3)
+        if pd.Series(labels).groupby(block).nunique().max() != 1:
+            print("❌ Screener clusters changed")
+            return False
+        
+        print("✅ Correlation structure successful")
+        print(f"   {structure.summary()['edges']} pairs above 0.70, "
+              f"mean MST correlation {structure.summary()['mst_mean_correlation']:.2f}")
+        return True
+        
+    except Exception as e:
+        print(f"❌ Correlation structure failed: {e}")
+        return False
+
 def run_all_tests():
     """Run all tests"""
     print("🚀 NSE Portfolio Analytics - Basic Tests")
@@ -188,7 +1529,29 @@ def run_all_tests():
         test_data_fetch,
         test_portfolio_calculations,
         test_database_operations,
-        test_chart_creation
+        test_chart_creation,
+        test_price_store,
+        test_batch_metrics,
+        test_incremental_metrics,
+        test_chunked_downloader,
+        test_var_engine,
+        test_optimizer,
+        test_rolling_stats,
+        test_covariance_estimators,
+        test_portfolio_repository,
+        test_engine_api,
+        test_stock_metrics,
+        test_exporter,
+        test_backtest,
+        test_refresh,
+        test_screener,
+        test_sectors,
+        test_stress,
+        test_benchmark_history,
+        test_relative,
+        test_trading_calendar,
+        test_charts,
+        test_correlation_structure
     ]
     
     passed = 0
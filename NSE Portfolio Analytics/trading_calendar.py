@@ -0,0 +1,148 @@
+"""
+NSE trading calendar for NSE Portfolio Analytics
+
+A session is a weekday that is not an exchange holiday; holidays are read
+from a local CSV (HOLIDAYS_FILE). Every session has an integer position
+counted from ORIGIN, so a symbol's history can be kept as a dense array
+over positions and any date range of it is a slice.
+
+``PricePanel`` holds several symbols on one shared run of sessions as a
+(T x N) value matrix plus a validity mask. A symbol that listed late or
+missed a day is invalid on those rows instead of truncating everyone
+else's history, and returns are only valid where both closes are, so a
+gap is never spanned.
+"""
+
+import os
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+ORIGIN = np.datetime64("1990-01-01", "D")
+HOLIDAYS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "nse_holidays.csv")
+
+
+def _days(dates):
+    """Dates (scalars, DatetimeIndex, date objects or day numbers) as datetime64[D]"""
+    if isinstance(dates, (pd.DatetimeIndex, pd.Series)):
+        return pd.DatetimeIndex(dates).values.astype("datetime64[D]")
+    if isinstance(dates, pd.Timestamp):
+        return np.datetime64(dates.date(), "D")
+    return np.asarray(dates).astype("datetime64[D]")
+
+
+def parse_holidays(text):
+    """Holiday dates from CSV text whose first column is an ISO date.
+
+    A header row and ``#`` comment lines are skipped.
+    """
+    days = []
+    for line in text.splitlines():
+        field = line.split('#')[0].split(',')[0].strip()
+        if not field or field.lower() == 'date':
+            continue
+        days.append(np.datetime64(field, "D"))
+    return np.unique(np.array(days, dtype="datetime64[D]"))
+
+
+def load_holidays(path=HOLIDAYS_FILE):
+    """Holidays from ``path``; none (weekends only) if the file does not exist"""
+    if not os.path.exists(path):
+        return np.array([], dtype="datetime64[D]")
+    with open(path) as f:
+        return parse_holidays(f.read())
+
+
+class TradingCalendar:
+    """Weekday sessions minus holidays, with integer session positions"""
+
+    def __init__(self, holidays=()):
+        self.holidays = np.unique(np.asarray(holidays, dtype="datetime64[D]"))
+        self._busdays = np.busdaycalendar(weekmask="1111100", holidays=self.holidays)
+
+    @classmethod
+    def from_file(cls, path=HOLIDAYS_FILE):
+        return cls(load_holidays(path))
+
+    def is_session(self, dates):
+        return np.is_busday(_days(dates), busdaycal=self._busdays)
+
+    def position(self, dates):
+        """Session position of each date; a non-session maps to the next session's position"""
+        return np.busday_count(ORIGIN, _days(dates), busdaycal=self._busdays)
+
+    def session(self, positions):
+        """Date of each session position"""
+        return np.busday_offset(ORIGIN, positions, roll="forward", busdaycal=self._busdays)
+
+    def sessions(self, start, end):
+        """Sessions from ``start`` to ``end`` inclusive"""
+        end = _days(end)
+        return self.session(np.arange(self.position(start), self.position(end + 1)))
+
+
+@lru_cache(maxsize=1)
+def nse_calendar():
+    """Shared calendar built from HOLIDAYS_FILE"""
+    return TradingCalendar.from_file()
+
+
+class PricePanel:
+    """Several symbols on one run of sessions: a (T x N) matrix plus its validity mask.
+
+    Invalid cells hold NaN. Slicing by date and selecting symbols return
+    views, not copies.
+    """
+
+    def __init__(self, dates, symbols, values, valid=None):
+        self.dates = np.asarray(dates, dtype="datetime64[D]")
+        self.symbols = list(symbols)
+        self.values = np.asarray(values, dtype=np.float64).reshape(len(self.dates), len(self.symbols))
+        self.valid = ~np.isnan(self.values) if valid is None else valid
+        self._column = {symbol: j for j, symbol in enumerate(self.symbols)}
+
+    def __len__(self):
+        return len(self.dates)
+
+    @property
+    def shape(self):
+        return self.values.shape
+
+    @property
+    def empty(self):
+        return self.values.size == 0
+
+    def slice(self, start=None, end=None):
+        """Rows with ``start <= date <= end``"""
+        lo = 0 if start is None else np.searchsorted(self.dates, _days(start), side="left")
+        hi = len(self.dates) if end is None else np.searchsorted(self.dates, _days(end), side="right")
+        return PricePanel(self.dates[lo:hi], self.symbols, self.values[lo:hi], self.valid[lo:hi])
+
+    def select(self, symbols):
+        """Columns for ``symbols``, in that order"""
+        columns = [self._column[symbol] for symbol in symbols]
+        return PricePanel(self.dates, symbols, self.values[:, columns], self.valid[:, columns])
+
+    def compact(self):
+        """Drop sessions where no symbol has a value (e.g. a holiday missing from the file)"""
+        keep = self.valid.any(axis=1)
+        if keep.all():
+            return self
+        return PricePanel(self.dates[keep], self.symbols, self.values[keep], self.valid[keep])
+
+    def coverage(self):
+        """Fraction of sessions each symbol has a value for"""
+        return pd.Series(self.valid.mean(axis=0) if len(self) else 0.0, index=self.symbols)
+
+    def returns(self):
+        """Daily returns, valid only where both closes are"""
+        valid = self.valid[1:] & self.valid[:-1]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            returns = self.values[1:] / self.values[:-1] - 1
+        returns[~valid] = np.nan
+        return PricePanel(self.dates[1:], self.symbols, returns, valid)
+
+    def frame(self):
+        """The panel as a DataFrame, NaN where a symbol has no value"""
+        return pd.DataFrame(self.values, index=pd.DatetimeIndex(self.dates), columns=self.symbols)
@@ -0,0 +1,189 @@
+"""
+Value at Risk engine for NSE Portfolio Analytics
+
+Historical, parametric and Monte Carlo VaR plus CVaR (expected shortfall)
+for every level in RISK_CONFIG['VAR_CONFIDENCE_LEVELS']. VaR and CVaR are
+reported as daily returns, negative for losses, like ``calculate_var``.
+
+Monte Carlo scenarios are drawn from a Cholesky-correlated normal or
+Student-t distribution in chunks sized to a memory budget. Each chunk is
+reduced to its smallest portfolio returns (enough order statistics for
+the widest tail) and merged into one bounded tail buffer, so the memory
+held does not grow with the number of paths. Chunks can be spread over a
+process pool; results depend on the seed and chunk size, not on the
+number of processes.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+from config import RISK_CONFIG
+from covariance import sample_covariance
+from risk_engine import masked_portfolio_returns
+
+METHODS = ["historical", "parametric", "monte_carlo"]
+
+
+def _tail(returns, confidence):
+    """VaR and CVaR of a 1-D sample at ``confidence``"""
+    var = np.percentile(returns, (1 - confidence) * 100)
+    tail = returns[returns <= var]
+    cvar = tail.mean() if len(tail) else var
+    return var, cvar
+
+
+def historical_var(portfolio_returns, confidence_levels=None):
+    """Historical-simulation VaR/CVaR: {confidence: (var, cvar)}"""
+    levels = confidence_levels or RISK_CONFIG['VAR_CONFIDENCE_LEVELS']
+    returns = np.asarray(portfolio_returns, dtype=np.float64)
+    return {level: _tail(returns, level) for level in levels}
+
+
+def parametric_var(portfolio_returns, confidence_levels=None, distribution="normal", dof=5):
+    """Variance-covariance VaR/CVaR from the sample mean and volatility"""
+    levels = confidence_levels or RISK_CONFIG['VAR_CONFIDENCE_LEVELS']
+    returns = np.asarray(portfolio_returns, dtype=np.float64)
+    mu, sigma = returns.mean(), returns.std(ddof=1)
+
+    results = {}
+    for level in levels:
+        alpha = 1 - level
+        if distribution == "t":
+            # Student-t rescaled to unit variance
+            scale = np.sqrt((dof - 2) / dof)
+            z = stats.t.ppf(alpha, dof)
+            es = -stats.t.pdf(z, dof) / alpha * (dof + z ** 2) / (dof - 1)
+            var, cvar = mu + sigma * scale * z, mu + sigma * scale * es
+        else:
+            z = stats.norm.ppf(alpha)
+            var, cvar = mu + sigma * z, mu - sigma * stats.norm.pdf(z) / alpha
+        results[level] = (var, cvar)
+    return results
+
+
+def _cholesky(cov):
+    """Cholesky factor, nudging the diagonal if the matrix is not positive definite"""
+    jitter = 0.0
+    for _ in range(6):
+        try:
+            return np.linalg.cholesky(cov + jitter * np.eye(len(cov)))
+        except np.linalg.LinAlgError:
+            jitter = max(jitter * 10, 1e-10 * np.trace(cov) / len(cov))
+    raise np.linalg.LinAlgError("covariance matrix is not positive definite")
+
+
+def _tail_size(n_paths, levels):
+    """Order statistics needed for VaR/CVaR at every level: the values up to the widest percentile"""
+    alpha = 1 - min(levels)
+    return min(n_paths, int(np.floor((n_paths - 1) * alpha)) + 2)
+
+
+def _smallest(values, k):
+    """The ``k`` smallest of ``values``, unsorted"""
+    if len(values) <= k:
+        return values
+    return np.partition(values, k - 1)[:k]
+
+
+def _tail_from_smallest(smallest, n_paths, confidence):
+    """VaR and CVaR at ``confidence`` of ``n_paths`` returns, given their smallest values sorted.
+
+    Same interpolation as ``np.percentile`` over the full sample.
+    """
+    position = (n_paths - 1) * (1 - confidence)
+    lower = int(np.floor(position))
+    upper = min(lower + 1, n_paths - 1)
+    var = smallest[lower] + (smallest[upper] - smallest[lower]) * (position - lower)
+    tail = smallest[:upper + 1]
+    tail = tail[tail <= var]
+    cvar = tail.mean() if len(tail) else var
+    return var, cvar
+
+
+def _simulate_chunk(args):
+    """Smallest ``keep`` portfolio returns of one chunk of Monte Carlo paths"""
+    seed, n_paths, mu, chol, weights, horizon, distribution, dof, keep = args
+    rng = np.random.default_rng(seed)
+
+    portfolio = np.zeros(n_paths)
+    for _ in range(horizon):
+        z = rng.standard_normal((n_paths, len(mu)))
+        if distribution == "t":
+            # Multivariate t: shared chi-square mixing, rescaled to unit variance
+            mixing = np.sqrt((dof - 2) / rng.chisquare(dof, n_paths))
+            z *= mixing[:, None]
+        portfolio += (mu + z @ chol.T) @ weights
+    return _smallest(portfolio, keep)
+
+
+def monte_carlo_var(returns, weights, confidence_levels=None, n_paths=100_000, horizon=1,
+                    distribution="normal", dof=5, memory_budget_mb=64, seed=42, processes=None):
+    """Monte Carlo VaR/CVaR from correlated simulated asset returns.
+
+    ``returns`` is a (T x N) matrix of daily asset returns (NaN where a
+    symbol did not trade; moments are pairwise-complete). The tail buffer
+    plus one chunk of scenario draws fit in ``memory_budget_mb``; with
+    ``processes`` set, chunks are generated on a process pool (each worker
+    holds one chunk).
+    """
+    levels = confidence_levels or RISK_CONFIG['VAR_CONFIDENCE_LEVELS']
+    R = np.asarray(returns, dtype=np.float64)
+    weights = np.asarray(weights, dtype=np.float64)
+
+    mu = np.nanmean(R, axis=0)
+    chol = _cholesky(sample_covariance(R).reshape(len(mu), len(mu)))
+
+    # The tail buffer is merged with each chunk's tail (twice its size at
+    # the merge); each path holds N standard normals, N correlated draws,
+    # N returns and three portfolio values (total, step, partition copy)
+    keep = _tail_size(n_paths, levels)
+    budget = memory_budget_mb * 2 ** 20 - 3 * keep * 8
+    bytes_per_path = (3 * len(mu) + 3) * 8
+    chunk_size = max(1, min(n_paths, int(budget // bytes_per_path)))
+
+    seeds = np.random.SeedSequence(seed).spawn((n_paths + chunk_size - 1) // chunk_size)
+    tasks = (
+        (s, min(chunk_size, n_paths - i * chunk_size), mu, chol, weights, horizon, distribution, dof, keep)
+        for i, s in enumerate(seeds)
+    )
+
+    smallest = np.empty(0)
+    if processes and len(seeds) > 1:
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            for chunk in pool.map(_simulate_chunk, tasks):
+                smallest = _smallest(np.concatenate([smallest, chunk]), keep)
+    else:
+        for task in tasks:
+            smallest = _smallest(np.concatenate([smallest, _simulate_chunk(task)]), keep)
+
+    smallest.sort()
+    return {level: _tail_from_smallest(smallest, n_paths, level) for level in levels}
+
+
+def var_report(returns, weights, confidence_levels=None, methods=None, **mc_kwargs):
+    """VaR and CVaR for every method and confidence level as a DataFrame"""
+    levels = confidence_levels or RISK_CONFIG['VAR_CONFIDENCE_LEVELS']
+    methods = methods or METHODS
+
+    R = returns.to_numpy(dtype=np.float64) if isinstance(returns, pd.DataFrame) else np.asarray(returns)
+    portfolio_returns = masked_portfolio_returns(R, weights)
+    portfolio_returns = portfolio_returns[~np.isnan(portfolio_returns)]
+
+    rows = []
+    for method in methods:
+        if method == "historical":
+            results = historical_var(portfolio_returns, levels)
+        elif method == "parametric":
+            results = parametric_var(portfolio_returns, levels)
+        elif method == "monte_carlo":
+            results = monte_carlo_var(R, weights, levels, **mc_kwargs)
+        else:
+            raise ValueError(f"Unknown VaR method: {method}")
+
+        for level, (var, cvar) in results.items():
+            rows.append({'Method': method, 'Confidence': level, 'VaR': var, 'CVaR': cvar})
+
+    return pd.DataFrame(rows)
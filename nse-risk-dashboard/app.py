@@ -1,12 +1,19 @@
+import os
+
 import streamlit as st
 import pandas as pd
-import numpy as np
-import plotly.express as px
+import plotly.graph_objects as go
+from plotly.subplots import make_subplots
+
+from bars import INTERVALS, BarAggregator, downsample, save_bars
+from ledger import DEFAULT_TICK_FILE, HoldingsLedger, RefreshThrottle, load_ticks, replay
+from risk_contribution import DEFAULT_PRICE_FILE, RiskModel, load_prices
+from sample_data import sample_ticks
 
 st.set_page_config(page_title="NSE Portfolio Risk Analyzer", layout="wide", page_icon="💹")
 
 # Portfolio sample data
-portfolio = pd.DataFrame([
+holdings = pd.DataFrame([
     {"Symbol": "TCS", "Quantity": 100, "Avg Price": 3574.25, "Sector": "IT Services"},
     {"Symbol": "RELIANCE", "Quantity": 50, "Avg Price": 2456.80, "Sector": "Oil & Gas"},
     {"Symbol": "INFY", "Quantity": 150, "Avg Price": 1432.50, "Sector": "IT Services"},
@@ -14,49 +21,137 @@ portfolio = pd.DataFrame([
     {"Symbol": "HDFC", "Quantity": 75, "Avg Price": 2678.90, "Sector": "Banking"},
 ])
 
-current_prices = {
-    "TCS": 3600.50,
-    "RELIANCE": 2480.10,
-    "INFY": 1448.30,
-    "WIPRO": 438.50,
-    "HDFC": 2701.85
-}
+price_file = st.sidebar.text_input("Price file (CSV)", os.environ.get("NSE_PRICES_FILE", DEFAULT_PRICE_FILE))
+confidence = st.sidebar.select_slider("VaR confidence", options=[0.90, 0.95, 0.99], value=0.95)
+tick_file = st.sidebar.text_input("Tick replay file (CSV, blank for the sample day)",
+                                  os.environ.get("NSE_TICKS_FILE", DEFAULT_TICK_FILE if os.path.exists(DEFAULT_TICK_FILE) else ""))
+
+
+@st.cache_data
+def get_ticks(path):
+    """Trades from the replay file, or the generated sample day"""
+    return load_ticks(path) if path else sample_ticks()
+
+
+@st.cache_resource
+def get_bar_aggregator(path):
+    """OHLCV bars for every symbol in the replay file"""
+    aggregator = BarAggregator()
+    aggregator.add_ticks(get_ticks(path))
+    return aggregator
 
-portfolio["Current Price"] = portfolio["Symbol"].map(current_prices)
-portfolio["Market Value"] = portfolio["Quantity"] * portfolio["Current Price"]
-portfolio["PnL"] = (portfolio["Current Price"] - portfolio["Avg Price"]) * portfolio["Quantity"]
-portfolio["Weight (%)"] = portfolio["Market Value"] / portfolio["Market Value"].sum() * 100
+
+@st.cache_resource
+def get_risk_model(path, symbols, confidence):
+    """Covariance model for the holdings, built once per price file"""
+    return RiskModel(load_prices(path), list(symbols), confidence)
+
+
+try:
+    model = get_risk_model(price_file, tuple(holdings["Symbol"]), confidence)
+except (OSError, ValueError) as e:
+    st.error(f"Could not load prices from {price_file}: {e}")
+    st.stop()
 
 st.title("NSE Portfolio Risk Analyzer Dashboard")
-st.dataframe(portfolio.style.applymap(lambda v: "color: red" if v < 0 else "color: green", subset=["PnL"]), use_container_width=True)
 
-st.metric("Total Portfolio Value", f"₹{portfolio['Market Value'].sum():,.2f}")
-st.metric("Total P&L", f"₹{portfolio['PnL'].sum():,.2f}", delta=f"{portfolio['PnL'].sum()/portfolio['Market Value'].sum()*100:.2f}%")
+# Quantities can be edited in place; risk is recomputed from the cached covariance
+holdings = st.data_editor(holdings, disabled=["Symbol", "Avg Price", "Sector"], use_container_width=True)
+
+# Trades recorded this session are applied on top of the holdings table
+if "trades" not in st.session_state:
+    st.session_state.trades = []
+
+with st.sidebar.form("trade"):
+    st.write("**Record Trade**")
+    trade_symbol = st.selectbox("Symbol", holdings["Symbol"])
+    trade_quantity = st.number_input("Quantity (negative to sell)", value=0, step=1)
+    trade_price = st.number_input("Price", min_value=0.0, value=0.0, step=0.05)
+    if st.form_submit_button("Add Trade") and trade_quantity and trade_price:
+        st.session_state.trades.append((trade_symbol, trade_quantity, trade_price))
+
+ledger = HoldingsLedger(holdings["Symbol"], holdings["Quantity"], holdings["Avg Price"], model.last_prices)
+for symbol, quantity, price in st.session_state.trades:
+    ledger.on_trade(symbol, quantity, price)
+
+sectors = dict(zip(holdings["Symbol"], holdings["Sector"]))
+
+
+def render_portfolio(ledger, table, totals):
+    portfolio = ledger.snapshot()
+    portfolio.insert(1, "Sector", portfolio["Symbol"].map(sectors))
+    table.dataframe(portfolio.style.applymap(lambda v: "color: red" if v < 0 else "color: green", subset=["PnL"]), use_container_width=True)
+
+    with totals.container():
+        pnl = ledger.total_unrealized + ledger.total_realized
+        st.metric("Total Portfolio Value", f"₹{ledger.total_value:,.2f}")
+        # All quantities set to 0 is a valid (empty) portfolio with no base for a percentage
+        delta = f"{pnl / ledger.total_value * 100:.2f}%" if ledger.total_value else None
+        st.metric("Total P&L", f"₹{pnl:,.2f}", delta=delta)
+    return portfolio
+
+
+portfolio_table, portfolio_totals = st.empty(), st.empty()
+portfolio = render_portfolio(ledger, portfolio_table, portfolio_totals)
+
+with st.expander("Tick Replay"):
+    speed = st.select_slider("Replay speed", options=["60x", "600x", "3600x", "Max"], value="600x")
+    if st.button("▶️ Replay Ticks"):
+        ticks = get_ticks(tick_file)
+        status = st.empty()
+        # The table refreshes at most 4 times a second however fast ticks arrive
+        count = replay(ledger, ticks, speed=None if speed == "Max" else float(speed[:-1]),
+                       throttle=RefreshThrottle(max_hz=4),
+                       on_refresh=lambda l: (render_portfolio(l, portfolio_table, portfolio_totals),
+                                             status.caption(f"{l.ticks:,} ticks applied")))
+        portfolio = ledger.snapshot()
+        status.caption(f"Replayed {count:,} ticks")
 
 st.header("Pareto Analysis: Risk Contribution by Symbol")
-risk_contributions = np.random.dirichlet(np.ones(len(portfolio)),size=1)[0]
-pareto_df = pd.DataFrame({"Symbol": portfolio["Symbol"], "Risk Contribution %": risk_contributions*100})
-pareto_df = pareto_df.sort_values("Risk Contribution %", ascending=False)
-fig = px.bar(pareto_df, x="Symbol", y="Risk Contribution %", title="Pareto Chart")
+pareto_df = model.contribution_frame(portfolio["Market Value"].to_numpy())
+fig = go.Figure()
+fig.add_trace(go.Bar(x=pareto_df["Symbol"], y=pareto_df["Risk Contribution %"], name="Risk Contribution %"))
+fig.add_trace(go.Scatter(x=pareto_df["Symbol"], y=pareto_df["Cumulative %"], name="Cumulative %",
+                         mode="lines+markers", yaxis="y2"))
+fig.update_layout(title="Pareto Chart", yaxis=dict(title="Risk Contribution %"),
+                  yaxis2=dict(title="Cumulative %", overlaying="y", side="right", range=[0, 105]))
 st.plotly_chart(fig, use_container_width=True)
+st.dataframe(pareto_df.style.format({
+    "Exposure": "₹{:,.0f}", "Marginal VaR": "{:.4f}", "Component VaR": "₹{:,.0f}",
+    "Risk Contribution %": "{:.1f}%", "Cumulative %": "{:.1f}%",
+}), use_container_width=True)
+
+st.header("Risk Metrics")
+risk = model.portfolio_metrics(portfolio["Market Value"].to_numpy())
+st.write(f"Portfolio Volatility (annualized): {risk['annual_volatility']:.1%}")
+st.write(f"Value at Risk (VaR, {confidence:.0%}, 1 day): ₹{risk['var']:,.0f}")
+st.write(f"Sharpe Ratio: {risk['sharpe_ratio']:.2f}")
+st.write(f"Maximum Drawdown: {-risk['max_drawdown']:.1%}")
+st.write(f"Beta: {risk['beta']:.2f}")
+
+st.header("Intraday OHLC Chart")
+aggregator = get_bar_aggregator(tick_file)
+col1, col2 = st.columns(2)
+chart_symbol = col1.selectbox("Symbol", aggregator.symbols())
+interval = col2.radio("Interval", list(INTERVALS), horizontal=True)
 
-st.header("Risk Metrics (Simulated)")
-st.write("Portfolio Volatility (annualized): 15.7%")
-st.write("Value at Risk (VaR, 95%): ₹18,740")
-st.write("Sharpe Ratio: 1.12")
-st.write("Maximum Drawdown: 5.2%")
-st.write("Beta: 0.84")
-
-st.header("Sample OHLC Chart (TCS)")
-ohlc = pd.DataFrame({
-    "Time": pd.date_range(start="09:30", periods=30, freq="5min"),
-    "Open": np.linspace(3574, 3600, 30) + np.random.randn(30) * 10,
-    "High": np.linspace(3575, 3605, 30) + np.random.rand(30) * 15,
-    "Low": np.linspace(3570, 3592, 30) - np.random.rand(30) * 13,
-    "Close": np.linspace(3574, 3590, 30) + np.random.randn(30) * 8,
-    "Volume": np.random.randint(8000, 13000, 30)
-})
-fig = px.line(ohlc, x="Time", y="Close", title="TCS OHLC (Close)")
+ohlc = aggregator.bars(chart_symbol, INTERVALS[interval])
+# Long histories are merged into at most 400 candles before plotting
+chart_bars = downsample(ohlc, max_bars=400)
+
+fig = make_subplots(rows=2, cols=1, shared_xaxes=True, row_heights=[0.75, 0.25], vertical_spacing=0.03)
+fig.add_trace(go.Candlestick(x=chart_bars.index, open=chart_bars["Open"], high=chart_bars["High"],
+                             low=chart_bars["Low"], close=chart_bars["Close"], name=chart_symbol), row=1, col=1)
+fig.add_trace(go.Bar(x=chart_bars.index, y=chart_bars["Volume"], name="Volume"), row=2, col=1)
+fig.update_layout(title=f"{chart_symbol} OHLC ({interval})", xaxis_rangeslider_visible=False, showlegend=False)
 st.plotly_chart(fig, use_container_width=True)
+st.caption(f"{aggregator.trades:,} trades -> {len(ohlc)} bars, {len(chart_bars)} plotted")
+
+db_path = st.text_input("Save bars to database", "portfolio_data.db",
+                        help="SQLite file with the price_data table used by NSE Portfolio Analytics")
+if st.button("💾 Save Bars"):
+    saved = sum(save_bars(db_path, symbol, aggregator.bars(symbol, INTERVALS[interval]))
+                for symbol in aggregator.symbols())
+    st.success(f"Saved {saved:,} {interval} bars to {db_path}")
 
 st.write("More features and metrics can be added in a full version.")
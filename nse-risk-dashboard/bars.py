@@ -0,0 +1,166 @@
+"""
+Intraday OHLCV bars for the NSE Portfolio Risk Analyzer
+
+``BarAggregator`` turns a stream of trades into 1/5/15-minute bars per
+symbol. Each (symbol, interval) series is a fixed-size ring buffer of
+parallel arrays, so a trade is O(1): it either updates the open bar in
+place or starts the next slot, overwriting the oldest bar once the buffer
+is full. ``aggregate`` builds the same bars from a whole tick frame in one
+vectorized pass, ``downsample`` merges neighbouring bars so charts stay
+light, and ``save_bars`` writes bars into the ``price_data`` table used by
+NSE Portfolio Analytics.
+"""
+
+import sqlite3
+
+import numpy as np
+import pandas as pd
+
+INTERVALS = {"1 min": 60, "5 min": 300, "15 min": 900}
+
+PRICE_DATA_SCHEMA = """
+CREATE TABLE IF NOT EXISTS price_data (
+    symbol TEXT,
+    date TEXT,
+    open REAL,
+    high REAL,
+    low REAL,
+    close REAL,
+    volume INTEGER,
+    PRIMARY KEY (symbol, date)
+)
+"""
+
+COLUMNS = ["Open", "High", "Low", "Close", "Volume"]
+
+
+class BarSeries:
+    """Ring buffer of OHLCV bars for one symbol at one interval"""
+
+    def __init__(self, seconds, capacity=1024):
+        self.width = seconds * 1_000_000_000
+        self.capacity = capacity
+        self.start = np.zeros(capacity, dtype=np.int64)
+        self.ohlc = np.zeros((capacity, 4))
+        self.volume = np.zeros(capacity, dtype=np.int64)
+        self.count = 0
+        self.bucket = None
+
+    def __len__(self):
+        return min(self.count, self.capacity)
+
+    def add(self, time_ns, price, size):
+        """Add one trade (nanosecond timestamp); late trades for closed bars are dropped"""
+        bucket = time_ns // self.width
+        if bucket == self.bucket:
+            bar = self.ohlc[(self.count - 1) % self.capacity]
+            if price > bar[1]:
+                bar[1] = price
+            elif price < bar[2]:
+                bar[2] = price
+            bar[3] = price
+            self.volume[(self.count - 1) % self.capacity] += size
+        elif self.bucket is None or bucket > self.bucket:
+            slot = self.count % self.capacity
+            self.start[slot] = bucket * self.width
+            self.ohlc[slot] = price
+            self.volume[slot] = size
+            self.bucket = bucket
+            self.count += 1
+
+    def frame(self):
+        """Bars oldest first, indexed by bar start time"""
+        n = len(self)
+        order = (np.arange(n) + self.count - n) % self.capacity
+        frame = pd.DataFrame(self.ohlc[order], columns=COLUMNS[:4],
+                             index=pd.DatetimeIndex(self.start[order], name="Time"))
+        frame["Volume"] = self.volume[order]
+        return frame
+
+
+class BarAggregator:
+    """OHLCV bars at several intervals for every symbol seen"""
+
+    def __init__(self, intervals=tuple(INTERVALS.values()), capacity=1024):
+        self.intervals = list(intervals)
+        self.capacity = capacity
+        self.series = {}
+        self.trades = 0
+
+    def on_trade(self, symbol, time_ns, price, size):
+        series = self.series.get(symbol)
+        if series is None:
+            series = self.series[symbol] = [BarSeries(s, self.capacity) for s in self.intervals]
+        for bars in series:
+            bars.add(time_ns, price, size)
+        self.trades += 1
+
+    def add_ticks(self, ticks):
+        """Feed a tick frame (``Time``, ``Symbol``, ``Price``, ``Size``) in order"""
+        times = ticks["Time"].to_numpy(dtype="datetime64[ns]").astype(np.int64).tolist()
+        for args in zip(ticks["Symbol"].tolist(), times, ticks["Price"].tolist(), ticks["Size"].tolist()):
+            self.on_trade(*args)
+
+    def bars(self, symbol, seconds):
+        return self.series[symbol][self.intervals.index(seconds)].frame()
+
+    def symbols(self):
+        return sorted(self.series)
+
+
+def aggregate(ticks, seconds):
+    """Bars for one symbol's ticks in a single vectorized pass"""
+    width = seconds * 1_000_000_000
+    times = ticks["Time"].to_numpy(dtype="datetime64[ns]").astype(np.int64)
+    prices = ticks["Price"].to_numpy(dtype=np.float64)
+    if len(times) == 0:
+        return pd.DataFrame(columns=COLUMNS, index=pd.DatetimeIndex([], name="Time"))
+
+    buckets = times // width
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    ends = np.r_[starts[1:], len(prices)] - 1
+
+    frame = pd.DataFrame({
+        "Open": prices[starts],
+        "High": np.maximum.reduceat(prices, starts),
+        "Low": np.minimum.reduceat(prices, starts),
+        "Close": prices[ends],
+        "Volume": np.add.reduceat(ticks["Size"].to_numpy(dtype=np.int64), starts),
+    }, index=pd.DatetimeIndex(buckets[starts] * width, name="Time"))
+    return frame
+
+
+def downsample(bars, max_bars=400):
+    """Merge runs of consecutive bars so at most ``max_bars`` remain"""
+    if len(bars) <= max_bars:
+        return bars
+    step = -(-len(bars) // max_bars)
+    starts = np.arange(0, len(bars), step)
+    ends = np.r_[starts[1:], len(bars)] - 1
+    values = bars[COLUMNS].to_numpy(dtype=np.float64)
+    return pd.DataFrame({
+        "Open": values[starts, 0],
+        "High": np.maximum.reduceat(values[:, 1], starts),
+        "Low": np.minimum.reduceat(values[:, 2], starts),
+        "Close": values[ends, 3],
+        "Volume": np.add.reduceat(values[:, 4], starts).astype(np.int64),
+    }, index=bars.index[starts])
+
+
+def save_bars(path, symbol, bars):
+    """Upsert bars into the ``price_data`` table of the SQLite database at ``path``"""
+    conn = sqlite3.connect(path)
+    try:
+        with conn:
+            conn.execute(PRICE_DATA_SCHEMA)
+            conn.executemany(
+                "INSERT OR REPLACE INTO price_data (symbol, date, open, high, low, close, volume) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (symbol, time.strftime("%Y-%m-%d %H:%M:%S"), o, h, l, c, int(v))
+                    for time, (o, h, l, c, v) in zip(bars.index, bars[COLUMNS].itertuples(index=False))
+                ]
+            )
+    finally:
+        conn.close()
+    return len(bars)
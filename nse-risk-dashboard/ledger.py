@@ -0,0 +1,192 @@
+"""
+Holdings ledger for the NSE Portfolio Risk Analyzer
+
+Positions live in flat NumPy arrays indexed by a symbol -> slot map. A price
+tick touches one slot and adjusts the running portfolio totals by the
+change in that position's value, so each tick is O(1) regardless of the
+number of holdings; a transaction updates quantity, average cost and
+realized P&L for its slot the same way. Weights and the per-row table are
+only materialized when the dashboard asks for a snapshot, which
+``RefreshThrottle`` limits to a fixed rate.
+"""
+
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_TICK_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "ticks.csv.gz")
+
+
+class HoldingsLedger:
+    """Quantity-based positions with incremental P&L"""
+
+    def __init__(self, symbols=(), quantities=(), avg_prices=(), prices=None, capacity=16):
+        capacity = max(capacity, len(symbols))
+        self.symbols = []
+        self.slots = {}
+        self.quantity = np.zeros(capacity)
+        self.avg_cost = np.zeros(capacity)
+        self.price = np.zeros(capacity)
+        self.realized = np.zeros(capacity)
+
+        self.total_value = 0.0
+        self.total_unrealized = 0.0
+        self.total_realized = 0.0
+        self.ticks = 0
+
+        prices = avg_prices if prices is None else prices
+        for symbol, qty, avg, price in zip(symbols, quantities, avg_prices, prices):
+            i = self._slot(symbol)
+            self.quantity[i], self.avg_cost[i], self.price[i] = qty, avg, price
+        self.resync()
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def _slot(self, symbol):
+        i = self.slots.get(symbol)
+        if i is None:
+            i = len(self.symbols)
+            if i == len(self.quantity):
+                for name in ('quantity', 'avg_cost', 'price', 'realized'):
+                    array = getattr(self, name)
+                    setattr(self, name, np.concatenate([array, np.zeros(len(array))]))
+            self.symbols.append(symbol)
+            self.slots[symbol] = i
+        return i
+
+    def resync(self):
+        """Recompute the running totals from the arrays (clears rounding drift)"""
+        n = len(self.symbols)
+        q, p = self.quantity[:n], self.price[:n]
+        self.total_value = float(q @ p)
+        self.total_unrealized = float(q @ (p - self.avg_cost[:n]))
+        self.total_realized = float(self.realized[:n].sum())
+
+    # Updates
+    def on_tick(self, symbol, price):
+        """Apply a last-traded price; ticks for symbols not held are ignored"""
+        i = self.slots.get(symbol)
+        if i is None:
+            return
+        change = self.quantity[i] * (price - self.price[i])
+        self.price[i] = price
+        self.total_value += change
+        self.total_unrealized += change
+        self.ticks += 1
+
+    def on_trade(self, symbol, quantity, price):
+        """Apply a fill of ``quantity`` shares (negative to sell) at ``price``"""
+        i = self._slot(symbol)
+        q, avg = self.quantity[i], self.avg_cost[i]
+        old_value = q * self.price[i]
+        old_unrealized = q * (self.price[i] - avg)
+
+        new_q = q + quantity
+        realized = 0.0
+        if q == 0 or (q > 0) == (quantity > 0):
+            # Opening or adding: blend the average cost
+            avg = (q * avg + quantity * price) / new_q if new_q else 0.0
+        else:
+            # Reducing, closing or flipping the position
+            closed = min(abs(quantity), abs(q))
+            realized = closed * np.sign(q) * (price - avg)
+            if new_q == 0:
+                avg = 0.0
+            elif (new_q > 0) != (q > 0):
+                avg = price
+
+        self.quantity[i], self.avg_cost[i], self.price[i] = new_q, avg, price
+        self.realized[i] += realized
+        self.total_value += new_q * price - old_value
+        self.total_unrealized += new_q * (price - avg) - old_unrealized
+        self.total_realized += realized
+
+    def apply_ticks(self, symbols, prices):
+        """Apply a batch of ticks in arrival order (only the last per symbol counts)"""
+        symbols = np.asarray(symbols)
+        prices = np.asarray(prices, dtype=np.float64)
+        # Last occurrence of each symbol in the batch
+        reversed_symbols = symbols[::-1]
+        unique, first = np.unique(reversed_symbols, return_index=True)
+        last = len(symbols) - 1 - first
+        for symbol, price in zip(unique, prices[last]):
+            i = self.slots.get(symbol)
+            if i is not None:
+                self.price[i] = price
+        self.ticks += len(symbols)
+        self.resync()
+
+    # Views
+    def weight(self, symbol):
+        """Weight of one holding in O(1)"""
+        i = self.slots[symbol]
+        return self.quantity[i] * self.price[i] / self.total_value if self.total_value else 0.0
+
+    def snapshot(self):
+        """Per-holding table for display"""
+        n = len(self.symbols)
+        q, p, avg = self.quantity[:n], self.price[:n], self.avg_cost[:n]
+        value = q * p
+        return pd.DataFrame({
+            'Symbol': self.symbols,
+            'Quantity': q,
+            'Avg Price': avg,
+            'Current Price': p,
+            'Market Value': value,
+            'PnL': q * (p - avg),
+            'Realized PnL': self.realized[:n],
+            'Weight (%)': value / self.total_value * 100 if self.total_value else np.zeros(n),
+        })
+
+
+class RefreshThrottle:
+    """Allows at most ``max_hz`` refreshes per second"""
+
+    def __init__(self, max_hz=4.0, clock=time.monotonic):
+        self.interval = 1.0 / max_hz
+        self.clock = clock
+        self._next = 0.0
+
+    def due(self):
+        """True (and starts a new interval) if a refresh is allowed now"""
+        now = self.clock()
+        if now >= self._next:
+            self._next = now + self.interval
+            return True
+        return False
+
+
+def replay(ledger, ticks, on_refresh=None, throttle=None, speed=None, sleep=time.sleep):
+    """Feed ``ticks`` (as from ``load_ticks``) through ``ledger`` in order.
+
+    ``on_refresh(ledger)`` is called whenever ``throttle`` allows and once at
+    the end. With ``speed`` set, ticks are paced at that multiple of their
+    recorded timing; otherwise they are applied as fast as possible.
+    Returns the number of ticks applied.
+    """
+    throttle = throttle or RefreshThrottle()
+    times = ticks['Time'].to_numpy(dtype='datetime64[ns]').astype(np.int64) / 1e9
+    offsets = (times - times[0]) / speed if speed and len(times) else None
+    start = throttle.clock()
+
+    for n, (symbol, price) in enumerate(zip(ticks['Symbol'].tolist(), ticks['Price'].tolist())):
+        if offsets is not None:
+            # Sleep in slices of at least 10ms rather than once per tick
+            wait = offsets[n] - (throttle.clock() - start)
+            if wait > 0.01:
+                sleep(wait)
+        ledger.on_tick(symbol, price)
+        if on_refresh is not None and throttle.due():
+            on_refresh(ledger)
+
+    if on_refresh is not None:
+        on_refresh(ledger)
+    return len(ticks)
+
+
+def load_ticks(path):
+    """Trade ticks from a CSV with ``Time``, ``Symbol``, ``Price`` and ``Size`` columns"""
+    return pd.read_csv(path, parse_dates=['Time'])
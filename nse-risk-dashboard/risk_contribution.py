@@ -0,0 +1,127 @@
+"""
+Risk contribution engine for the NSE Portfolio Risk Analyzer
+
+Euler decomposition of portfolio volatility and parametric VaR into
+per-holding contributions. The covariance matrix of daily returns is built
+once from a price file; after that, a new set of quantities costs one
+matrix-vector product (cov @ exposures), and the component contributions
+sum exactly to the portfolio figure.
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+from scipy.stats import norm
+
+TRADING_DAYS = 252
+BENCHMARK = "NIFTY"
+DEFAULT_PRICE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "prices.csv")
+
+
+def load_prices(path=DEFAULT_PRICE_FILE):
+    """Daily closes from a CSV with a ``Date`` column and one column per symbol"""
+    prices = pd.read_csv(path, index_col="Date", parse_dates=True)
+    return prices.sort_index()
+
+
+class RiskModel:
+    """Covariance model over the holdings' daily returns.
+
+    ``prices`` holds one column per symbol (plus an optional ``NIFTY``
+    benchmark column). Exposures are rupee market values.
+    """
+
+    def __init__(self, prices, symbols, confidence=0.95, risk_free_rate=0.07):
+        missing = [s for s in symbols if s not in prices.columns]
+        if missing:
+            raise ValueError(f"No price history for: {', '.join(missing)}")
+
+        self.symbols = list(symbols)
+        self.confidence = confidence
+        self.risk_free_rate = risk_free_rate
+        self.z = norm.ppf(confidence)
+
+        returns = prices[self.symbols].pct_change().dropna()
+        self.returns = returns.to_numpy(dtype=np.float64)
+        self.index = returns.index
+        self.mean = self.returns.mean(axis=0)
+        self.cov = np.cov(self.returns, rowvar=False)
+        self.last_prices = prices[self.symbols].iloc[-1].to_numpy(dtype=np.float64)
+
+        self.benchmark = None
+        if BENCHMARK in prices.columns:
+            self.benchmark = prices[BENCHMARK].pct_change().reindex(returns.index).to_numpy(dtype=np.float64)
+
+    def exposures(self, quantities, prices=None):
+        """Rupee exposure of each holding"""
+        prices = self.last_prices if prices is None else np.asarray(prices, dtype=np.float64)
+        return np.asarray(quantities, dtype=np.float64) * prices
+
+    def decompose(self, exposures):
+        """Euler decomposition of daily volatility and VaR for rupee ``exposures``.
+
+        Returns a dict with the portfolio ``volatility`` and ``var`` (both in
+        rupees per day) and per-holding ``marginal``, ``component`` and
+        ``percent`` arrays. ``component`` sums to ``volatility`` and
+        ``component * z`` to ``var``.
+        """
+        x = np.asarray(exposures, dtype=np.float64)
+        cov_x = self.cov @ x
+        volatility = float(np.sqrt(x @ cov_x))
+
+        if volatility > 0:
+            marginal = cov_x / volatility
+        else:
+            marginal = np.zeros_like(x)
+        component = x * marginal
+
+        return {
+            'volatility': volatility,
+            'var': self.z * volatility,
+            'marginal': marginal,
+            'component': component,
+            'component_var': self.z * component,
+            'percent': component / volatility if volatility > 0 else np.zeros_like(x),
+        }
+
+    def contribution_frame(self, exposures):
+        """Per-holding contributions sorted for a Pareto chart"""
+        result = self.decompose(exposures)
+        frame = pd.DataFrame({
+            'Symbol': self.symbols,
+            'Exposure': exposures,
+            'Marginal VaR': self.z * result['marginal'],
+            'Component VaR': result['component_var'],
+            'Risk Contribution %': result['percent'] * 100,
+        }).sort_values('Risk Contribution %', ascending=False, ignore_index=True)
+        frame['Cumulative %'] = frame['Risk Contribution %'].cumsum()
+        return frame
+
+    def portfolio_metrics(self, exposures):
+        """Volatility, VaR, Sharpe, drawdown and beta for the current holdings"""
+        x = np.asarray(exposures, dtype=np.float64)
+        total = x.sum()
+        weights = x / total if total else np.zeros_like(x)
+        result = self.decompose(x)
+
+        portfolio_returns = self.returns @ weights
+        annual_return = portfolio_returns.mean() * TRADING_DAYS
+        annual_vol = result['volatility'] / total * np.sqrt(TRADING_DAYS) if total else 0.0
+
+        cumulative = np.cumprod(1 + portfolio_returns)
+        max_drawdown = (cumulative / np.maximum.accumulate(cumulative) - 1).min()
+
+        beta = np.nan
+        if self.benchmark is not None:
+            valid = ~np.isnan(self.benchmark)
+            m = self.benchmark[valid] - self.benchmark[valid].mean()
+            beta = float(m @ (portfolio_returns[valid] - portfolio_returns[valid].mean()) / (m @ m))
+
+        return {
+            'annual_volatility': annual_vol,
+            'var': result['var'],
+            'sharpe_ratio': (annual_return - self.risk_free_rate) / annual_vol if annual_vol > 0 else 0.0,
+            'max_drawdown': max_drawdown,
+            'beta': beta,
+        }
@@ -0,0 +1,87 @@
+"""
+Deterministic sample data for the dashboard: daily closes (data/prices.csv)
+and a day of intraday trade ticks for replay (data/ticks.csv.gz)
+
+The closes cover two years for the sample holdings and the NIFTY index,
+from a one-factor model with a shared IT-sector factor, each scaled so its
+last close equals the holding's current price.
+Run with: python sample_data.py
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+from ledger import DEFAULT_TICK_FILE
+from risk_contribution import BENCHMARK, DEFAULT_PRICE_FILE
+
+LAST_PRICES = {
+    "TCS": 3600.50,
+    "RELIANCE": 2480.10,
+    "INFY": 1448.30,
+    "WIPRO": 438.50,
+    "HDFC": 2701.85,
+    BENCHMARK: 22000.00,
+}
+
+BETAS = {"TCS": 0.75, "RELIANCE": 1.05, "INFY": 0.85, "WIPRO": 0.80, "HDFC": 1.10}
+IT_SECTOR = {"TCS", "INFY", "WIPRO"}
+
+
+def sample_prices(end="2024-12-31", days=504, seed=7):
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range(end=end, periods=days + 1, name="Date")
+
+    market = rng.normal(0.0008, 0.010, days)
+    sector = rng.normal(0.0, 0.006, days)
+    returns = {BENCHMARK: market}
+    for symbol, beta in BETAS.items():
+        idiosyncratic = rng.normal(0.0004, 0.012, days)
+        returns[symbol] = beta * market + (sector if symbol in IT_SECTOR else 0) + idiosyncratic
+
+    prices = {}
+    for symbol, r in returns.items():
+        path = np.concatenate([[1.0], np.cumprod(1 + r)])
+        prices[symbol] = np.round(path / path[-1] * LAST_PRICES[symbol], 2)
+
+    columns = [s for s in LAST_PRICES if s != BENCHMARK] + [BENCHMARK]
+    return pd.DataFrame(prices, index=dates)[columns]
+
+
+def sample_ticks(date="2025-01-01", seconds_per_tick=2.0, seed=11):
+    """A trading day (09:15-15:30) of trades for the sample holdings.
+
+    Arrivals are Poisson per symbol and prices a random walk from the last
+    close, rounded to the 0.05 tick size. Returns a frame with ``Time``,
+    ``Symbol``, ``Price`` and ``Size`` sorted by time.
+    """
+    rng = np.random.default_rng(seed)
+    session = 375 * 60
+    start = pd.Timestamp(f"{date} 09:15")
+
+    frames = []
+    for symbol, last in LAST_PRICES.items():
+        if symbol == BENCHMARK:
+            continue
+        n = rng.poisson(session / seconds_per_tick)
+        offsets = np.sort(rng.uniform(0, session, n))
+        steps = rng.normal(0, 0.012 / np.sqrt(session / seconds_per_tick), n)
+        frames.append(pd.DataFrame({
+            'Time': start + pd.to_timedelta(offsets, unit='s'),
+            'Symbol': symbol,
+            'Price': np.round(last * np.exp(np.cumsum(steps)) / 0.05) * 0.05,
+            'Size': rng.integers(1, 500, n),
+        }))
+
+    ticks = pd.concat(frames).sort_values('Time', kind='stable', ignore_index=True)
+    ticks['Price'] = ticks['Price'].round(2)
+    return ticks
+
+
+if __name__ == "__main__":
+    os.makedirs(os.path.dirname(DEFAULT_PRICE_FILE), exist_ok=True)
+    sample_prices().to_csv(DEFAULT_PRICE_FILE)
+    print(f"Wrote {DEFAULT_PRICE_FILE}")
+    sample_ticks().to_csv(DEFAULT_TICK_FILE, index=False)
+    print(f"Wrote {DEFAULT_TICK_FILE}")
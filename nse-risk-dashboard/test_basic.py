@@ -0,0 +1,199 @@
+"""
+Simple tests for the NSE Portfolio Risk Analyzer
+Run with: python test_basic.py
+"""
+
+import sys
+import numpy as np
+
+from risk_contribution import RiskModel, load_prices
+from sample_data import sample_prices
+
+SYMBOLS = ["TCS", "RELIANCE", "INFY", "WIPRO", "HDFC"]
+QUANTITIES = [100, 50, 150, 200, 75]
+
+
+def test_price_file():
+    """Test that the bundled price file matches the sample generator"""
+    print("🧪 Testing price file...")
+
+    prices = load_prices()
+    expected = sample_prices()
+    if list(prices.columns) != list(expected.columns) or not np.allclose(prices.to_numpy(), expected.to_numpy()):
+        print("❌ data/prices.csv is out of date; run python sample_data.py")
+        return False
+
+    print(f"✅ Price file successful ({len(prices)} days)")
+    return True
+
+
+def test_risk_contributions():
+    """Test the Euler decomposition against direct calculations"""
+    print("🧪 Testing risk contributions...")
+
+    model = RiskModel(sample_prices(), SYMBOLS)
+    x = model.exposures(QUANTITIES)
+    result = model.decompose(x)
+
+    pnl = model.returns @ x
+    if not np.isclose(result['volatility'], pnl.std(ddof=1)):
+        print("❌ Portfolio volatility differs from the P&L history")
+        return False
+    if not np.isclose(result['component'].sum(), result['volatility']):
+        print("❌ Component contributions do not add up")
+        return False
+    if not np.isclose(result['component_var'].sum(), result['var']):
+        print("❌ Component VaR does not add up")
+        return False
+
+    # Marginal contribution is the derivative of volatility w.r.t. each exposure
+    step = 1e-3
+    for i in range(len(x)):
+        bumped = x.copy()
+        bumped[i] += step
+        numeric = (model.decompose(bumped)['volatility'] - result['volatility']) / step
+        if not np.isclose(numeric, result['marginal'][i], rtol=1e-4):
+            print(f"❌ Marginal contribution for {SYMBOLS[i]} is wrong")
+            return False
+
+    frame = model.contribution_frame(x)
+    if not np.isclose(frame['Cumulative %'].iloc[-1], 100):
+        print("❌ Pareto percentages do not reach 100%")
+        return False
+
+    print("✅ Risk contributions successful")
+    return True
+
+
+def test_ledger():
+    """Test incremental ledger totals against a full recomputation"""
+    print("🧪 Testing holdings ledger...")
+
+    from ledger import HoldingsLedger, RefreshThrottle, replay
+    from sample_data import sample_ticks
+
+    ledger = HoldingsLedger(SYMBOLS, QUANTITIES, [3574.25, 2456.80, 1432.50, 445.30, 2678.90])
+    ticks = sample_ticks().head(5000)
+    replay(ledger, ticks)
+    ledger.on_trade("TCS", -40, 3610.0)
+    ledger.on_trade("WIPRO", 100, 440.0)
+    ledger.on_trade("SBIN", 10, 800.0)
+
+    table = ledger.snapshot()
+    incremental = (ledger.total_value, ledger.total_unrealized, ledger.total_realized)
+    ledger.resync()
+    if not np.allclose(incremental, (ledger.total_value, ledger.total_unrealized, ledger.total_realized)):
+        print("❌ Incremental totals drifted from the arrays")
+        return False
+    if not np.isclose(table['Market Value'].sum(), ledger.total_value) or not np.isclose(table['Weight (%)'].sum(), 100):
+        print("❌ Snapshot does not match the totals")
+        return False
+
+    last = ticks.groupby('Symbol')['Price'].last()
+    tcs = table.set_index('Symbol').loc['TCS']
+    if tcs['Quantity'] != 60 or not np.isclose(tcs['Realized PnL'], 40 * (3610.0 - 3574.25)):
+        print("❌ Sale was not booked correctly")
+        return False
+    if not np.isclose(table.set_index('Symbol').loc['INFY', 'Current Price'], last['INFY']):
+        print("❌ Last tick price not applied")
+        return False
+
+    # Refreshes are capped by the throttle, not by the tick rate
+    now = [0.0]
+    throttle = RefreshThrottle(max_hz=2, clock=lambda: now[0])
+    allowed = 0
+    for _ in range(100):
+        now[0] += 0.05
+        allowed += throttle.due()
+    if allowed != 10:
+        print(f"❌ Throttle allowed {allowed} refreshes in 5s at 2 Hz")
+        return False
+
+    print("✅ Holdings ledger successful")
+    return True
+
+
+def test_bars():
+    """Test tick-to-bar aggregation against pandas resampling"""
+    print("🧪 Testing OHLC bars...")
+
+    import os
+    import sqlite3
+    import tempfile
+    from bars import BarAggregator, BarSeries, aggregate, downsample, save_bars
+    from sample_data import sample_ticks
+
+    ticks = sample_ticks().head(20000)
+    aggregator = BarAggregator()
+    aggregator.add_ticks(ticks)
+
+    for symbol in aggregator.symbols():
+        trades = ticks[ticks['Symbol'] == symbol]
+        for seconds in aggregator.intervals:
+            bars = aggregator.bars(symbol, seconds)
+            expected = trades.set_index('Time')['Price'].resample(f"{seconds}s").ohlc().dropna()
+            if not np.allclose(bars[['Open', 'High', 'Low', 'Close']].to_numpy(), expected.to_numpy()):
+                print(f"❌ {symbol} {seconds}s bars differ from pandas")
+                return False
+            if not np.allclose(aggregate(trades, seconds).to_numpy(), bars.to_numpy()):
+                print(f"❌ Vectorized {symbol} {seconds}s bars differ from incremental")
+                return False
+
+    # A full ring keeps only the newest bars
+    series = BarSeries(60, capacity=10)
+    trades = ticks[ticks['Symbol'] == 'TCS']
+    for t, price, size in zip(trades['Time'].astype('int64'), trades['Price'], trades['Size']):
+        series.add(t, price, size)
+    full = aggregator.bars('TCS', 60)
+    if len(series) != 10 or not np.allclose(series.frame().to_numpy(), full.tail(10).to_numpy()):
+        print("❌ Ring buffer did not keep the newest bars")
+        return False
+
+    merged = downsample(full, max_bars=20)
+    if len(merged) > 20 or merged['Volume'].sum() != full['Volume'].sum() or merged['High'].max() != full['High'].max():
+        print("❌ Downsampled bars lost data")
+        return False
+
+    with tempfile.TemporaryDirectory() as root:
+        path = os.path.join(root, 'portfolio_data.db')
+        save_bars(path, 'TCS', full)
+        save_bars(path, 'TCS', full)
+        rows = sqlite3.connect(path).execute("SELECT COUNT(*), SUM(volume) FROM price_data").fetchone()
+        if rows != (len(full), full['Volume'].sum()):
+            print("❌ Saved bars do not match")
+            return False
+
+    print("✅ OHLC bars successful")
+    return True
+
+
+def run_all_tests():
+    """Run all tests"""
+    print("🚀 NSE Portfolio Risk Analyzer - Basic Tests")
+    print("=" * 50)
+
+    tests = [
+        test_price_file,
+        test_risk_contributions,
+        test_ledger,
+        test_bars
+    ]
+
+    failed = 0
+    for test in tests:
+        try:
+            if not test():
+                failed += 1
+        except Exception as e:
+            print(f"❌ Test {test.__name__} crashed: {e}")
+            failed += 1
+        print()
+
+    print("=" * 50)
+    print(f"📊 Test Results: {len(tests) - failed} passed, {failed} failed")
+    return failed == 0
+
+
+if __name__ == "__main__":
+    success = run_all_tests()
+    sys.exit(0 if success else 1)